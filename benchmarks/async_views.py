@@ -0,0 +1,108 @@
+"""
+Compare requests/sec of the sync (WSGI) and async (ASGI) set-password views.
+
+Both are driven in-process with the same concurrency: WSGI requests are sent
+from a thread pool with `Client` and ASGI requests are sent from one event
+loop with `AsyncClient`. Use a Postgres database for realistic numbers.
+
+Usage:
+    python -m benchmarks.async_views --requests 64 --concurrency 8
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from benchmarks.utils import Timer, setup_django, test_database
+
+setup_django()
+
+from django.test import AsyncClient, Client  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from core.models import User  # noqa: E402
+
+PASSWORD = 'Test@4321'
+DATA = {
+    'current_password': PASSWORD,
+    'new_password': PASSWORD,
+    're_new_password': PASSWORD,
+}
+
+
+def run_wsgi(users, requests):
+    clients = [
+        Client(headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'})
+        for user in users
+    ]
+
+    # Each thread sends the requests of its own user one by one, like the
+    # ASGI workers, because concurrent password changes of a user conflict
+    def worker(client, count):
+        for _ in range(count):
+            response = client.post(
+                '/api/v1/users/set-password/', DATA, content_type='application/json'
+            )
+            assert response.status_code == 204, response.content
+
+    count = requests // len(clients)
+    with ThreadPoolExecutor(len(clients)) as executor, Timer() as timer:
+        futures = [executor.submit(worker, client, count) for client in clients]
+        for future in futures:
+            future.result()
+    return timer.elapsed
+
+
+def run_asgi(users, requests):
+    # AsyncClient ignores default headers, so they are sent with each request
+    headers = [
+        {'Authorization': f'Bearer {AccessToken.for_user(user)}'} for user in users
+    ]
+
+    async def worker(client, headers, count):
+        for _ in range(count):
+            response = await client.post(
+                '/api/v1/async/users/set-password/',
+                DATA,
+                content_type='application/json',
+                headers=headers,
+            )
+            assert response.status_code == 204, response.content
+
+    async def main():
+        count = requests // len(users)
+        await asyncio.gather(
+            *(worker(AsyncClient(), user_headers, count) for user_headers in headers)
+        )
+
+    with Timer() as timer:
+        asyncio.run(main())
+    return timer.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    requests = args.requests - args.requests % args.concurrency
+
+    # Changing password revokes older tokens of user, but the same tokens are
+    # sent again, so revocation is disabled.
+    with test_database(), mock.patch(
+        'core.views.revoke_user_tokens'
+    ), mock.patch('core.async_views.revoke_user_tokens'):
+        users = [
+            User.objects.create_user(f'user{i}', f'user{i}@example.com', PASSWORD)
+            for i in range(args.concurrency)
+        ]
+        for name, run in [('WSGI', run_wsgi), ('ASGI', run_asgi)]:
+            elapsed = run(users, requests)
+            print(
+                f'{name}: {requests} requests in {elapsed:.3f}s '
+                f'({requests / elapsed:.1f} req/s)'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare throughput of Django's SMTP backend with `core.mail.PooledEmailBackend`
+against a local stand-in SMTP server.
+
+Each message is sent with its own `send_messages` call, the same way celery
+email tasks send them.
+
+Usage:
+    python -m benchmarks.email_backend --messages 500 --connect-delay 0.005
+"""
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+django.setup()
+
+from django.core.mail import EmailMessage  # noqa: E402
+from django.core.mail.backends.smtp import EmailBackend  # noqa: E402
+
+from core.mail import PooledEmailBackend  # noqa: E402
+from benchmarks.smtp_server import SMTPServer  # noqa: E402
+
+
+def run(backend_class, server, messages, **kwargs):
+    backend = backend_class(
+        host='127.0.0.1', port=server.port, use_tls=False, use_ssl=False, **kwargs
+    )
+    message = EmailMessage(
+        'Subject', 'Body', 'info@localhost', ['user@localhost']
+    )
+
+    started = time.perf_counter()
+    for _ in range(messages):
+        backend.send_messages([message])
+    elapsed = time.perf_counter() - started
+
+    if isinstance(backend, PooledEmailBackend):
+        for connection in backend.pool.drain():
+            connection.quit()
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument(
+        '--connect-delay',
+        type=float,
+        default=0.0,
+        help='seconds the server waits before greeting every new connection',
+    )
+    args = parser.parse_args()
+
+    server = SMTPServer(connect_delay=args.connect_delay).start()
+    try:
+        for name, backend_class in [
+            ('smtp.EmailBackend', EmailBackend),
+            ('PooledEmailBackend', PooledEmailBackend),
+        ]:
+            elapsed = run(backend_class, server, args.messages)
+            print(
+                f'{name:20} {args.messages} messages in {elapsed:.3f}s '
+                f'({args.messages / elapsed:.1f} msg/s)'
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Benchmark the auth API endpoints in-process with Django's test client.
+
+Each scenario sends --requests requests one after another and reports
+latency percentiles, queries per request and throughput. Everything a
+request needs (users, tokens) is made before the timed part. Results are
+written as JSON, so runs of two commits can be compared with --compare.
+
+It uses benchmarks.settings: SQLite by default, or a local Postgres with
+BENCHMARK_DATABASE_URL, and locmem email backend.
+
+Usage:
+    python -m benchmarks.endpoints --requests 200 --output results.json
+    python -m benchmarks.endpoints --compare results.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import time
+
+from benchmarks.utils import setup_django, test_database
+
+setup_django('benchmarks.settings')
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from core.models import User  # noqa: E402
+from core.tokens import (  # noqa: E402
+    email_verification_token_generator,
+    one_time_token_generator,
+)
+from core.utils import encode_uid  # noqa: E402
+
+PASSWORD = 'Test@4321'
+NEW_PASSWORD = 'New@Pass4321'
+
+
+def create_users(prefix, count, **extra_fields):
+    password = make_password(PASSWORD)
+    return User.objects.bulk_create(
+        User(
+            username=f'{prefix}{i}',
+            email=f'{prefix}{i}@example.com',
+            password=password,
+            **extra_fields,
+        )
+        for i in range(count)
+    )
+
+
+def bearer(user):
+    token = RefreshToken.for_user(user).access_token
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+# Every scenario gets the number of requests and returns a list of functions
+# which send one request with given client and return the response.
+
+
+def signup(count):
+    return [
+        lambda client, i=i: client.post(
+            '/api/v1/users/',
+            {
+                'username': f'signup{i}',
+                'email': f'signup{i}@example.com',
+                'password': PASSWORD,
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def token_obtain(count):
+    create_users('obtain', 1)
+    data = {'username': 'obtain0', 'password': PASSWORD}
+    return [lambda client: client.post('/api/v1/token/', data)] * count
+
+
+def token_refresh(count):
+    (user,) = create_users('refresh', 1)
+    data = {'refresh': str(RefreshToken.for_user(user))}
+    return [lambda client: client.post('/api/v1/token/refresh/', data)] * count
+
+
+def activation(count):
+    return [
+        lambda client, url=(
+            f'/api/v1/users/activate/{encode_uid(user.pk)}/'
+            f'{email_verification_token_generator.make_token(user)}'
+        ): client.get(url)
+        for user in create_users('activate', count)
+    ]
+
+
+def reset_password(count):
+    # Each user can get one email every interval, so every request has a user
+    return [
+        lambda client, email=user.email: client.post(
+            '/api/v1/users/reset-password/', {'email': email}
+        )
+        for user in create_users('reset', count)
+    ]
+
+
+def reset_password_confirm(count):
+    return [
+        lambda client, data={
+            'uid': encode_uid(user.pk),
+            'token': one_time_token_generator.make_token(user),
+            'new_password': NEW_PASSWORD,
+            're_new_password': NEW_PASSWORD,
+        }: client.post('/api/v1/users/reset-password-confirm/', data)
+        for user in create_users('confirm', count)
+    ]
+
+
+def user_list(count):
+    (admin,) = create_users('listadmin', 1, is_staff=True)
+    headers = bearer(admin)
+    return [lambda client: client.get('/api/v1/users/', **headers)] * count
+
+
+def user_retrieve(count):
+    (admin,) = create_users('retrieveadmin', 1, is_staff=True)
+    headers = bearer(admin)
+    return [
+        lambda client: client.get('/api/v1/users/retrieveadmin0/', **headers)
+    ] * count
+
+
+SCENARIOS = {
+    'signup': signup,
+    'token_obtain': token_obtain,
+    'token_refresh': token_refresh,
+    'activation': activation,
+    'reset_password': reset_password,
+    'reset_password_confirm': reset_password_confirm,
+    'user_list': user_list,
+    'user_retrieve': user_retrieve,
+}
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+class QueryCounter:
+    """Database execute wrapper which counts queries.
+
+    CaptureQueriesContext cannot be used, since queries log is reset when a
+    request starts.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run(scenario, count):
+    requests = scenario(count)
+    client = Client()
+    latencies = []
+    queries = []
+
+    started = time.perf_counter()
+    for send in requests:
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            request_started = time.perf_counter()
+            response = send(client)
+            latencies.append(time.perf_counter() - request_started)
+        queries.append(counter.count)
+        assert response.status_code < 400, (response.status_code, response.content)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': count,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p90_ms': percentile(latencies, 90) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'queries_per_request': statistics.mean(queries),
+        'max_queries': max(queries),
+        'requests_per_second': count / elapsed,
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(
+        f'{"scenario":<24}{"p50 ms":>9}{"p90 ms":>9}{"p99 ms":>9}'
+        f'{"queries":>9}{"req/s":>9}'
+    )
+    for name, result in results.items():
+        line = (
+            f'{name:<24}{result["p50_ms"]:>9.2f}{result["p90_ms"]:>9.2f}'
+            f'{result["p99_ms"]:>9.2f}{result["queries_per_request"]:>9.1f}'
+            f'{result["requests_per_second"]:>9.1f}'
+        )
+        if baseline and name in baseline:
+            change = result['p50_ms'] / baseline[name]['p50_ms'] - 1
+            line += f'  p50 {change:+.0%} vs baseline'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument(
+        '--scenarios',
+        nargs='+',
+        choices=list(SCENARIOS),
+        default=list(SCENARIOS),
+    )
+    parser.add_argument('--output', help='Write results to this JSON file.')
+    parser.add_argument('--compare', help='Compare p50 with results of this file.')
+    args = parser.parse_args()
+
+    with test_database():
+        results = {
+            name: run(SCENARIOS[name], args.requests) for name in args.scenarios
+        }
+        vendor = connection.vendor
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(
+                {'commit': get_commit(), 'database': vendor, 'results': results},
+                output_file,
+                indent=2,
+            )
+
+
+if __name__ == '__main__':
+    main()
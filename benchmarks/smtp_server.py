@@ -0,0 +1,61 @@
+"""
+A minimal SMTP server which accepts and drops every message. It is used as a
+local stand-in for the real SMTP server in benchmarks.
+"""
+import socketserver
+import threading
+import time
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        # Simulate the cost of accepting a new connection (greeting, TLS, ...)
+        time.sleep(self.server.connect_delay)
+        self.reply('220 localhost stand-in SMTP')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+
+            if command in {b'EHLO', b'HELO'}:
+                self.reply('250 localhost')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in {b'.\r\n', b''}:
+                    pass
+                self.server.message_count += 1
+                self.reply('250 OK')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self.reply('250 OK')
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, connect_delay=0.0):
+        super().__init__((host, port), SMTPHandler)
+        self.connect_delay = connect_delay
+        self.message_count = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
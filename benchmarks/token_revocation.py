@@ -0,0 +1,62 @@
+"""
+Measure memory, false positive rate and lookup time of the in-memory token
+revocation filter (see core.revocation) with N revoked tokens.
+
+No database is needed; the filter is filled with random jtis.
+
+Usage:
+    python -m benchmarks.token_revocation --entries 10000000
+"""
+import argparse
+import uuid
+
+from benchmarks.utils import Timer, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from core.revocation import BloomFilter, Watermarks  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--entries', type=int, default=10_000_000)
+    parser.add_argument('--lookups', type=int, default=100_000)
+    parser.add_argument(
+        '--error-rate', type=float, default=settings.TOKEN_REVOCATION_ERROR_RATE
+    )
+    args = parser.parse_args()
+
+    bloom_filter = BloomFilter(args.entries, args.error_rate)
+    with Timer() as timer:
+        for _ in range(args.entries):
+            bloom_filter.add(uuid.uuid4().hex)
+    print(
+        f'Inserted {args.entries} jtis in {timer.elapsed:.1f}s, '
+        f'filter size: {bloom_filter.nbytes / 2**20:.1f} MiB, '
+        f'hash functions: {bloom_filter.hash_count}'
+    )
+
+    jtis = [uuid.uuid4().hex for _ in range(args.lookups)]
+    with Timer() as timer:
+        false_positives = sum(jti in bloom_filter for jti in jtis)
+    print(
+        f'Lookup: {timer.elapsed / args.lookups * 1e6:.2f}us, '
+        f'false positive rate: {false_positives / args.lookups:.5f} '
+        f'(expected {args.error_rate})'
+    )
+
+    watermarks = Watermarks((pk, 0.0) for pk in range(args.entries))
+    pks = range(0, args.entries, max(1, args.entries // args.lookups))
+    with Timer() as timer:
+        for pk in pks:
+            watermarks.get(pk)
+    print(
+        f'Watermarks of {args.entries} users: {watermarks.nbytes / 2**20:.1f} MiB, '
+        f'lookup: {timer.elapsed / len(pks) * 1e6:.2f}us'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+"""URLs of project without the debug toolbar"""
+from project.urls import urlpatterns as project_urlpatterns
+
+urlpatterns = [
+    pattern
+    for pattern in project_urlpatterns
+    if not str(pattern.pattern).startswith('__debug__')
+]
@@ -0,0 +1,63 @@
+"""
+Compare per-row cost of serializing users with UserDetailSerializer from model
+instances and from queryset.values() rows, with all fields and with a sparse
+fieldset. Query time is included, so use a Postgres database for realistic
+numbers.
+
+Usage:
+    python -m benchmarks.user_serialization --users 10000
+"""
+import argparse
+
+from benchmarks.utils import Timer, setup_django, test_database
+
+setup_django()
+
+from core.models import User  # noqa: E402
+from core.serializers import UserDetailSerializer  # noqa: E402
+
+
+def serialize_instances(fields):
+    queryset = User.objects.all()
+    if fields is not None:
+        queryset = queryset.only(*fields)
+    return UserDetailSerializer(queryset, many=True, fields=fields).data
+
+
+def serialize_values(fields):
+    serializer = UserDetailSerializer(fields=fields)
+    rows = User.objects.values(*serializer.fields)
+    return serializer.to_representation_values(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with test_database():
+        User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@example.com')
+            for i in range(args.users)
+        )
+
+        for fields in [None, ['id', 'username']]:
+            for name, serialize in [
+                ('instances', serialize_instances),
+                ('values', serialize_values),
+            ]:
+                elapsed = []
+                for _ in range(args.repeat):
+                    with Timer() as timer:
+                        serialize(fields)
+                    elapsed.append(timer.elapsed)
+
+                print(
+                    f'{name:<9} fields={",".join(fields or ["all"]):<11} '
+                    f'{min(elapsed) / args.users * 1e6:.2f}us/row'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -7,5 +7,9 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         from . import signals
+        from .password_policy import password_policy
+
+        # Loaded before workers are forked, so they share the dictionaries
+        password_policy.load()
         
         return super().ready()
@@ -0,0 +1,252 @@
+"""
+Async versions of the password and activation views for ASGI deployments.
+
+DRF views are sync only, so these are plain Django views. Requests are
+validated with the same serializers and return the same responses as the
+views in `core.views`. Database queries use Django's async ORM, JWT
+authentication (shared with DRF views) runs in a thread and password hashing
+runs in a bounded thread pool, so the event loop is never blocked.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+
+from .authentication import CachedJWTAuthentication
+from .models import User
+from .ratelimit import EmailRateLimitExceeded
+from .revocation import revoke_user_tokens
+from .serializers import (
+    PasswordChangeSerializer,
+    EmailSerializer,
+    ResetPasswordConfirmSerializer,
+)
+from .tasks import request_activation_email, request_password_reset_email
+from .tokens import one_time_token_generator
+from .transitions import activate_email_with_token, save_password
+from .views import (
+    ACTIVATION_EMAIL_LIMIT_ERROR,
+    PASSWORD_CHANGED_ERROR,
+    PASSWORD_RESET_EMAIL_LIMIT_ERROR,
+    rate_limit_errors,
+)
+from . import utils
+
+password_hashing_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASHING_THREADS,
+    thread_name_prefix='password-hashing',
+)
+
+
+async def run_in_hashing_pool(func, *args, **kwargs):
+    """Run a CPU-bound function (e.g. password hashing) in the thread pool.
+
+    It runs in a copy of the current context, so timings and database routing
+    of the request apply to it.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        password_hashing_executor,
+        functools.partial(context.run, func, *args, **kwargs),
+    )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    Base class of async views. It authenticates the request with JWT, parses
+    JSON or form body into `request.data` and checks `authentication_required`.
+    """
+
+    authentication_required = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authenticate(request)
+        except exceptions.APIException as e:
+            return JsonResponse(
+                {'detail': e.detail}, status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        if self.authentication_required and not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        try:
+            request.data = self.parse_body(request)
+        except ValueError:
+            return JsonResponse(
+                {'detail': 'Malformed request.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = super().dispatch(request, *args, **kwargs)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return response
+
+    async def authenticate(self, request):
+        """Return the user of the JWT access token or AnonymousUser.
+
+        Tokens are authenticated like in DRF views (revocations, user cache
+        and metrics), in a thread because it may query the database.
+        """
+        result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+        return AnonymousUser() if result is None else result[0]
+
+    def parse_body(self, request):
+        if request.method not in {'POST', 'PUT', 'PATCH'}:
+            return {}
+        if request.content_type == 'application/json':
+            return json.loads(request.body or b'{}')
+        return request.POST
+
+
+class AsyncUserSetPasswordView(AsyncAPIView):
+    authentication_required = True
+
+    async def post(self, request):
+        """Change current user password."""
+        serializer = PasswordChangeSerializer(
+            data=request.data, context={'request': request}
+        )
+        # Cached users don't have their password
+        await request.user.arefresh_from_db(fields=['password'])
+        # Validation checks current password, so it is run in the pool
+        if await run_in_hashing_pool(serializer.is_valid):
+            user = request.user
+            current_password = user.password
+            await run_in_hashing_pool(
+                user.set_password, serializer.validated_data['new_password']
+            )
+            if not await sync_to_async(save_password)(
+                user, expected_password=current_password
+            ):
+                return JsonResponse(
+                    {'error': PASSWORD_CHANGED_ERROR}, status=status.HTTP_409_CONFLICT
+                )
+            await sync_to_async(revoke_user_tokens)(user)
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncUserActivateView(AsyncAPIView):
+    async def get(self, request, uid, token):
+        user = await utils.aget_user_from_uid(uid)
+        if user is not None and await sync_to_async(activate_email_with_token)(
+            user, token
+        ):
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+        errors = {'error': 'Token is invalid.'}
+        return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncUserRequestActivationEmailView(AsyncAPIView):
+    """Send user an activation email
+
+    Same limits as UserRequestActivationEmailView are applied.
+    """
+
+    authentication_required = True
+
+    async def get(self, request, username):
+        if not request.user.is_superuser and request.user.username != username:
+            # users cannot request activation email for others
+            return JsonResponse(
+                {
+                    'error': 'Requesting activation email for other users is not allowed.'
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        try:
+            user = await User.objects.aget(username=username)
+        except User.DoesNotExist:
+            return JsonResponse(
+                {'error': 'User does not exist.'}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        if user.is_email_activated:
+            return JsonResponse(
+                {'error': 'Email is already activated.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            await sync_to_async(request_activation_email)(user)
+        except EmailRateLimitExceeded as e:
+            return JsonResponse(
+                rate_limit_errors(e, ACTIVATION_EMAIL_LIMIT_ERROR),
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncResetPasswordView(AsyncAPIView):
+    """Send user a password reset email
+
+    Same limits as ResetPasswordView are applied.
+    """
+
+    async def post(self, request):
+        """Send a password reset email if user exists with given email."""
+        serializer = EmailSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user = await User.objects.aget(email=serializer.validated_data['email'])
+        except User.DoesNotExist:
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+        try:
+            await sync_to_async(request_password_reset_email)(user)
+        except EmailRateLimitExceeded as e:
+            return JsonResponse(
+                rate_limit_errors(e, PASSWORD_RESET_EMAIL_LIMIT_ERROR),
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncResetPasswordConfirmView(AsyncAPIView):
+    async def post(self, request):
+        """Validate uid, token, and new password and change the password."""
+        serializer = ResetPasswordConfirmSerializer(
+            data=request.data, context={'request': request}
+        )
+        if not await run_in_hashing_pool(serializer.is_valid):
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user = await utils.aget_user_from_token(
+            serializer.validated_data['uid'],
+            serializer.validated_data['token'],
+            one_time_token_generator,
+        )
+
+        if user:
+            await run_in_hashing_pool(
+                user.set_password, serializer.validated_data['new_password']
+            )
+            await sync_to_async(save_password)(user)
+            await sync_to_async(revoke_user_tokens)(user)
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+        errors = {'error': 'Token is invalid.'}
+        return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST)
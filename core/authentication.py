@@ -0,0 +1,93 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from . import metrics, routers
+from .cache import user_cache
+from .revocation import token_revocations
+from .tokens import USER_TOKEN_CLAIMS
+
+
+class ClaimsUser(TokenUser):
+    """User object which is backed by the claims of a validated token."""
+
+    @cached_property
+    def is_email_activated(self):
+        return self.token.get('is_email_activated', False)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication which rejects revoked tokens (see core.revocation) and
+    loads user through core.cache.user_cache.
+    """
+
+    def get_validated_token(self, raw_token):
+        with metrics.token_duration.time(token='jwt', operation='verify'):
+            validated_token = super().get_validated_token(raw_token)
+        if token_revocations.is_revoked(validated_token):
+            raise InvalidToken('Token is revoked')
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            # Recently changed users read their own writes
+            routers.use_primary_for_user(user_id)
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        try:
+            user = user_cache.get(user_id)
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        return user
+
+
+class StatelessJWTAuthentication(CachedJWTAuthentication):
+    """
+    JWT authentication which builds `request.user` from token claims instead of
+    loading the user from database.
+
+    Views which need the real user (e.g. to change it) set
+    `requires_db_user = True`. Tokens without user claims (issued before
+    claims were added) are authenticated by loading the user as well.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        if self.requires_db_user(request) or not self.has_user_claims(validated_token):
+            return self.get_user(validated_token), validated_token
+
+        return self.get_token_user(validated_token), validated_token
+
+    def requires_db_user(self, request):
+        view = getattr(request, 'parser_context', {}).get('view')
+        return getattr(view, 'requires_db_user', False)
+
+    def has_user_claims(self, validated_token):
+        return all(claim in validated_token for claim in USER_TOKEN_CLAIMS)
+
+    def get_token_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        return api_settings.TOKEN_USER_CLASS(validated_token)
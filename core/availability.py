@@ -0,0 +1,132 @@
+"""
+Username and email availability checks (see UserAvailabilityView).
+
+Every process keeps the taken usernames and emails (case-insensitive) in a
+Bloom filter, so most available identifiers are answered without a query.
+Filter hits are confirmed with an exact lookup on the UPPER() indexes of
+User, so a false positive never reports a free identifier as taken.
+
+Saved users are added right away (see core.signals); rows inserted without
+post_save (bulk creation, imports, seed_scale) or by other processes are
+loaded every USER_AVAILABILITY_REFRESH_INTERVAL seconds by id, and the
+filter is rebuilt every USER_AVAILABILITY_REBUILD_INTERVAL seconds, which
+also drops renamed and deleted users.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Upper
+from django.db.models.lookups import Exact
+
+from .models import User
+from .revocation import BloomFilter
+
+FIELDS = ['username', 'email']
+
+
+def make_key(field, value):
+    return f'{field}:{value.upper()}'
+
+
+class TakenIdentifiers:
+    """In-memory view of taken usernames and emails of this process."""
+
+    # Rows committed late may have lower ids than the last loaded one, so
+    # refresh also reads this many ids before it.
+    refresh_overlap = 1000
+
+    def __init__(self):
+        self._filter = None
+        self._last_pk = 0
+        self._refreshed_at = None
+        self._rebuilt_at = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Drop loaded identifiers, so they are rebuilt on the next check."""
+        with self._lock:
+            self._filter = None
+            self._last_pk = 0
+            self._refreshed_at = None
+            self._rebuilt_at = None
+
+    def needs_refresh(self):
+        return (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at
+            > settings.USER_AVAILABILITY_REFRESH_INTERVAL
+        )
+
+    def refresh(self, rebuild=False):
+        """Load new users, or all of them if rebuild is True."""
+        if not self._lock.acquire(blocking=self._filter is None):
+            # Another thread is refreshing, the current filter is used meanwhile
+            return
+
+        try:
+            if not rebuild and not self.needs_refresh():
+                # Refreshed by another thread while waiting for the lock
+                return
+
+            rebuild = (
+                rebuild
+                or self._rebuilt_at is None
+                or time.monotonic() - self._rebuilt_at
+                > settings.USER_AVAILABILITY_REBUILD_INTERVAL
+            )
+            if rebuild:
+                self._rebuild()
+            else:
+                users = User.objects.filter(
+                    pk__gt=self._last_pk - self.refresh_overlap
+                )
+                self._last_pk = self._load(users, self._filter, self._last_pk)
+            self._refreshed_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def _rebuild(self):
+        users = User.objects.all()
+        # Each user has two identifiers
+        bloom_filter = BloomFilter(
+            2 * max(settings.USER_AVAILABILITY_CAPACITY, 2 * users.count()),
+            settings.USER_AVAILABILITY_ERROR_RATE,
+        )
+        # The new filter is only used once it is complete
+        last_pk = self._load(users, bloom_filter, 0)
+        self._filter, self._last_pk = bloom_filter, last_pk
+        self._rebuilt_at = time.monotonic()
+
+    def _load(self, users, bloom_filter, last_pk):
+        """Add identifiers of users to filter and return the last loaded pk"""
+        for pk, *values in users.values_list('pk', *FIELDS).iterator():
+            for field, value in zip(FIELDS, values):
+                bloom_filter.add(make_key(field, value))
+            last_pk = max(last_pk, pk)
+        return last_pk
+
+    def add_user(self, user):
+        if self._filter is not None:
+            for field in FIELDS:
+                self._filter.add(make_key(field, getattr(user, field)))
+
+    def add_users(self, users):
+        for user in users:
+            self.add_user(user)
+
+    def is_taken(self, field, value):
+        """Check if a user has value (case-insensitive) as field.
+
+        Database is queried only on filter hits.
+        """
+        if self.needs_refresh():
+            self.refresh()
+
+        if make_key(field, value) not in self._filter:
+            return False
+        return User.objects.filter(Exact(Upper(field), Upper(Value(value)))).exists()
+
+
+taken_identifiers = TakenIdentifiers()
@@ -1,6 +1,12 @@
+import time
+
 from django.contrib.auth import backends, get_user_model
-from django.db.models import Q
-from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Value
+from django.db.models.functions import Upper
+from django.db.models.lookups import Exact
+
+from . import metrics, routers
 
 
 class AuthenticationBackend(backends.ModelBackend):
@@ -9,14 +15,52 @@ class AuthenticationBackend(backends.ModelBackend):
     with password
     """
 
+    def get_user_by_identifier(self, identifier):
+        """Get user by username or email (case-insensitive)
+
+        Usernames cannot contain '@', so only one column is looked up. The
+        lookup is written as UPPER(column) = UPPER(value) to match the
+        functional indexes of User model.
+
+        Users read from a replica are read again from primary if they are
+        missing (e.g. just created) or were changed recently.
+
+        Raises:
+            User.DoesNotExist: if there is no user with given identifier
+        """
+        UserModel = get_user_model()
+        field = (
+            UserModel.get_email_field_name()
+            if '@' in identifier
+            else UserModel.USERNAME_FIELD
+        )
+        users = UserModel.objects.filter(Exact(Upper(field), Upper(Value(identifier))))
+        try:
+            user = users.get()
+        except UserModel.DoesNotExist:
+            if users.db == DEFAULT_DB_ALIAS:
+                raise
+            return users.using(DEFAULT_DB_ALIAS).get()
+
+        if user._state.db != DEFAULT_DB_ALIAS and routers.is_user_pinned(user.pk):
+            user = users.using(DEFAULT_DB_ALIAS).get()
+        return user
+
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None or password is None:
             return
+        started = time.perf_counter()
+        user = self._authenticate(username, password)
+        metrics.authenticate_duration.observe(
+            time.perf_counter() - started,
+            result='failure' if user is None else 'success',
+        )
+        return user
+
+    def _authenticate(self, username, password):
+        UserModel = get_user_model()
         try:
-            UserModel = get_user_model()
-            user = UserModel.objects.get(
-                Q(username__iexact=username) | Q(email__iexact=username)
-            )
+            user = self.get_user_by_identifier(username)
         except UserModel.DoesNotExist:
             # Run the default password hasher once to reduce the timing
             # difference between an existing and a nonexistent user (#20760).
@@ -0,0 +1,129 @@
+"""
+Offline check of breached passwords (see BreachedPasswordValidator).
+
+The breached passwords file holds sorted, unique SHA-1 digests of 20 bytes
+each, with nothing else in it. It is memory-mapped and binary searched, so
+a lookup reads about log2(n) records and the file stays in the shared page
+cache instead of the memory of each worker.
+
+The file is built from a text dump of hex SHA-1 hashes (one per line, an
+optional `:count` suffix like in Have I Been Pwned downloads is ignored)
+by the build_breached_passwords command. Dumps bigger than memory are
+sorted in chunks which are merged at the end.
+"""
+import hashlib
+import heapq
+import mmap
+import os
+import tempfile
+
+RECORD_SIZE = hashlib.sha1().digest_size
+
+
+def hash_password(password):
+    return hashlib.sha1(password.encode()).digest()
+
+
+def parse_hash(line):
+    """Digest of a dump line, e.g. '5BAA61E4C9B93F3F0682250B6CF8331B7EE68FD8:3'
+
+    Raises:
+        ValueError: if line doesn't start with a hex SHA-1 hash
+    """
+    value = line.split(':', 1)[0].strip()
+    digest = bytes.fromhex(value)
+    if len(digest) != RECORD_SIZE:
+        raise ValueError(f'{value!r} is not a SHA-1 hash')
+    return digest
+
+
+class BreachedPasswords:
+    """Memory-mapped breached passwords file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size % RECORD_SIZE:
+                raise ValueError(f'{path} is not a breached passwords file')
+            # An empty file cannot be mapped
+            self._map = (
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+            )
+        self._count = size // RECORD_SIZE
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, password):
+        return self.contains_hash(hash_password(password))
+
+    def contains_hash(self, digest):
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = middle * RECORD_SIZE
+            record = self._map[offset:offset + RECORD_SIZE]
+            if record < digest:
+                low = middle + 1
+            elif record > digest:
+                high = middle
+            else:
+                return True
+        return False
+
+
+def _write_chunk(digests, directory):
+    digests.sort()
+    file = tempfile.TemporaryFile(dir=directory)
+    file.write(b''.join(digests))
+    file.seek(0)
+    return file
+
+
+def _read_records(file):
+    while record := file.read(RECORD_SIZE):
+        yield record
+
+
+def build(digests, path, chunk_size=10_000_000):
+    """Write sorted unique digests to a breached passwords file.
+
+    Args:
+        digests: iterable of SHA-1 digests in any order
+        path: file to write, which is replaced only once it is complete
+        chunk_size: number of digests sorted in memory at once
+
+    Returns:
+        int: number of written digests
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    chunks = []
+    try:
+        chunk = []
+        for digest in digests:
+            chunk.append(digest)
+            if len(chunk) >= chunk_size:
+                chunks.append(_write_chunk(chunk, directory))
+                chunk = []
+        if chunk or not chunks:
+            chunks.append(_write_chunk(chunk, directory))
+
+        count = 0
+        previous = None
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as output:
+            try:
+                for digest in heapq.merge(*(_read_records(chunk) for chunk in chunks)):
+                    if digest != previous:
+                        output.write(digest)
+                        count += 1
+                        previous = digest
+            except BaseException:
+                os.unlink(output.name)
+                raise
+        # Temporary files are only readable by their owner
+        os.chmod(output.name, 0o644)
+        os.replace(output.name, path)
+        return count
+    finally:
+        for chunk in chunks:
+            chunk.close()
@@ -0,0 +1,198 @@
+"""
+Creating users in bulk (see BulkUserCreateView and core.imports).
+
+Items are validated with the rules of UserCreateSerializer, but uniqueness is
+checked (case-insensitively, like login) with one `IN` query per unique field
+for the whole batch. Passwords are hashed in a process pool and users are
+inserted with bulk_create.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Upper
+from rest_framework.validators import UniqueValidator
+
+from .availability import taken_identifiers
+from .models import User
+from .serializers import UserCreateSerializer
+from .tasks import queue_activation_emails
+
+UNIQUE_FIELDS = ['username', 'email']
+
+_hashing_pool = None
+
+
+def get_hashing_pool():
+    """Get the process pool of password hashing, which is created once.
+
+    Workers are spawned instead of forked, since forking a multithreaded web
+    worker could copy locks held by its other threads.
+    """
+    global _hashing_pool
+    if _hashing_pool is None:
+        _hashing_pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASHING_PROCESSES,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _hashing_pool
+
+
+def hash_passwords(passwords):
+    """Hash raw passwords with make_password across PASSWORD_HASHING_PROCESSES
+
+    Small batches are hashed in this process, since sending them to workers
+    costs more than hashing.
+    """
+    workers = settings.PASSWORD_HASHING_PROCESSES
+    if workers <= 1 or len(passwords) < 2 * workers:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(get_hashing_pool().map(make_password, passwords, chunksize=chunksize))
+
+
+class BulkUserItemSerializer(UserCreateSerializer):
+    """
+    UserCreateSerializer without unique validators, since uniqueness of a
+    batch is checked at once by check_unique().
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for field in fields.values():
+            field.validators = [
+                validator
+                for validator in field.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+        return fields
+
+
+def validate_users(items, serializer_class=BulkUserItemSerializer):
+    """Validate items (dicts of username, email and password) in one pass
+
+    Returns:
+        list: (validated_data, errors) of each item, one of them is None
+    """
+    results = []
+    for item in items:
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            data = dict(serializer.validated_data)
+            data['email'] = User.objects.normalize_email(data['email'])
+            results.append((data, None))
+        else:
+            results.append((None, serializer.errors))
+
+    return check_unique(results)
+
+
+def check_unique(results):
+    """Mark valid results whose unique fields are taken as invalid
+
+    A value is taken if it is already in database (one query per field) or it
+    is used by an earlier item of the batch. Values are compared in upper case,
+    same as the lookups of login and the UPPER() indexes of User.
+    """
+    for field_name in UNIQUE_FIELDS:
+        values = {
+            data[field_name].upper() for data, _ in results if data is not None
+        }
+        taken = set(
+            User.objects.annotate(value=Upper(field_name))
+            .filter(value__in=values)
+            .values_list('value', flat=True)
+            if values
+            else []
+        )
+        message = User._meta.get_field(field_name).error_messages['unique']
+
+        for index, (data, _) in enumerate(results):
+            if data is None:
+                continue
+            value = data[field_name].upper()
+            if value in taken:
+                results[index] = (None, {field_name: [message]})
+            else:
+                taken.add(value)
+
+    return results
+
+
+def insert_users(results, passwords, send_activation_emails=True):
+    """Insert users of valid results with bulk_create in one transaction
+
+    A concurrent signup may take a username or email after check_unique(), so
+    on IntegrityError uniqueness is checked again and the insert is retried
+    once. Results of taken items are changed to errors in place.
+
+    Args:
+        results (list): (validated_data, errors) of each item
+        passwords (dict): encoded password of each valid item by its index
+        send_activation_emails (bool): queue activation emails of new users
+
+    Returns:
+        dict: created users by index of their item
+    """
+    for retry in range(2):
+        users = {
+            index: User(
+                username=data['username'],
+                email=data['email'],
+                password=passwords[index],
+            )
+            for index, (data, _) in enumerate(results)
+            if data is not None
+        }
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    users.values(), batch_size=settings.BULK_USER_CREATE_CHUNK_SIZE
+                )
+                if send_activation_emails:
+                    queue_activation_emails(users.values())
+            # bulk_create() doesn't send post_save
+            taken_identifiers.add_users(users.values())
+            return users
+        except IntegrityError:
+            if retry:
+                raise
+            check_unique(results)
+
+
+def create_users(items):
+    """Validate and create users and queue their activation emails at once
+
+    Returns:
+        list: result of each item, which is either
+            {'status': 'created', 'user': {'id', 'username', 'email'}} or
+            {'status': 'invalid', 'errors': {...}}
+    """
+    results = validate_users(items)
+    valid_indexes = [index for index, (data, _) in enumerate(results) if data]
+    passwords = dict(
+        zip(
+            valid_indexes,
+            hash_passwords([results[index][0]['password'] for index in valid_indexes]),
+        )
+    )
+    users = insert_users(results, passwords)
+
+    return [
+        {
+            'status': 'created',
+            'user': {
+                'id': users[index].pk,
+                'username': users[index].username,
+                'email': users[index].email,
+            },
+        }
+        if index in users
+        else {'status': 'invalid', 'errors': errors}
+        for index, (_, errors) in enumerate(results)
+    ]
@@ -0,0 +1,208 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from . import routers
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRUCache:
+    """A thread-safe in-process LRU cache whose entries expire after ttl."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class UserCache:
+    """
+    Two-tier cache of User objects: an in-process LRU in front of Django's
+    cache framework.
+
+    Saving or deleting a user (see core.signals) removes it from the shared
+    cache and publishes its pk on `USER_CACHE_INVALIDATION_URL` redis channel,
+    which every process listens to and removes it from its local cache. If
+    redis is not available, local entries expire after USER_CACHE_LOCAL_TTL.
+
+    Only values of `fields` are cached, so password hashes are never stored
+    in the shared cache. Password of a returned user is a deferred field,
+    which is loaded from database when it is accessed.
+    """
+
+    key_prefix = 'core:user:v2:'
+    fields = [
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname != 'password'
+    ]
+    channel = 'core:user-cache:invalidate'
+
+    def __init__(self):
+        self._local = None
+        self._redis = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def local(self):
+        if self._local is None:
+            self._local = LocalLRUCache(
+                settings.USER_CACHE_LOCAL_SIZE, settings.USER_CACHE_LOCAL_TTL
+            )
+        return self._local
+
+    def make_key(self, pk):
+        return f'{self.key_prefix}{pk}'
+
+    def get(self, pk):
+        """Get user by pk from local cache, shared cache or database
+
+        Raises:
+            User.DoesNotExist: if there is no user with given pk
+        """
+        self._start_listener()
+        key = self.make_key(pk)
+
+        values = self.local.get(key)
+        if values is not None:
+            self._count('local_hits')
+            return self._make_user(values)
+
+        values = cache.get(key)
+        if values is not None:
+            self._count('shared_hits')
+        else:
+            self._count('misses')
+            # Replicas may still have the old row of a changed user
+            routers.use_primary_for_user(pk)
+            values = User.objects.values_list(*self.fields).get(pk=pk)
+            cache.set(key, values, timeout=settings.USER_CACHE_SHARED_TTL)
+
+        self.local.set(key, values)
+        return self._make_user(values)
+
+    def _make_user(self, values):
+        # A new instance is built on every get, so callers may change it
+        return User.from_db(DEFAULT_DB_ALIAS, self.fields, values)
+
+    def invalidate(self, pk):
+        key = self.make_key(pk)
+        self.local.delete(key)
+        cache.delete(key)
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                client.publish(self.channel, str(pk))
+            except redis.RedisError as e:
+                logger.warning('Publishing user cache invalidation failed: %s', e)
+
+    def invalidate_changed(self, pk):
+        """Invalidate a user changed in current transaction.
+
+        It is done once right away and once more after commit, since another
+        request may cache the old row before the transaction is committed.
+        """
+        self.invalidate(pk)
+        transaction.on_commit(lambda: self.invalidate(pk))
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['local_size'] = len(self.local)
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _get_redis(self):
+        url = settings.USER_CACHE_INVALIDATION_URL
+        if url is None:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(url)
+        return self._redis
+
+    def _start_listener(self):
+        """Start invalidation listener once in every (forked) process."""
+        if settings.USER_CACHE_INVALIDATION_URL is None or self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # Connections of the parent process cannot be used after fork
+            self._redis = None
+            thread = threading.Thread(
+                target=self._listen, name='user-cache-invalidation', daemon=True
+            )
+            thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = redis.Redis.from_url(
+                    settings.USER_CACHE_INVALIDATION_URL
+                ).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Invalidations may be missed while disconnected
+                self.local.clear()
+                for message in pubsub.listen():
+                    self.local.delete(self.make_key(message['data'].decode()))
+            except redis.RedisError as e:
+                logger.warning('User cache invalidation listener failed: %s', e)
+                time.sleep(5)
+
+
+user_cache = UserCache()
@@ -1,42 +1,89 @@
+import functools
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template.context import make_context
+from django.template.loader import get_template
 from django.urls import reverse
+from django.utils.autoreload import file_changed
 from templated_mail.mail import BaseEmailMessage
 
-from .models import User
 from .tokens import email_verification_token_generator
 from . import utils
 
 
-class ActivationEmail(BaseEmailMessage):
+@functools.lru_cache(maxsize=None)
+def get_email_template(template_name):
+    """Get compiled template and its (message attribute, block node) pairs
+
+    Templates are compiled once per process, and only the subject and body
+    blocks are rendered instead of walking every node of template.
     """
-    This class is used to send an activation email to given user_pk. user_pk
-    should be supplied with context object.
+    template = get_template(template_name)
+    nodes = []
+    for node in template.template.nodelist:
+        attr = BaseEmailMessage._node_map.get(getattr(node, 'name', ''))
+        if attr is not None:
+            nodes.append((attr, node))
+    return template, nodes
+
+
+@receiver(setting_changed)
+@receiver(file_changed)
+def clear_email_templates(**kwargs):
+    # Changed templates (e.g. in development) are compiled again
+    get_email_template.cache_clear()
+
+
+class UserEmailMessage(BaseEmailMessage):
+    """
+    Base class of emails sent to a user. The user instance should be supplied
+    as `user` in context, so no query is made. Values which are already in
+    context (e.g. `username`) are not computed again, so a pre-resolved context
+    doesn't need a user.
     """
-    template_name = 'email/activation.html'
 
     def get_context_data(self):
-        """Generate a token and encode it and return activation_url in context
+        context = super().get_context_data()
+        if 'username' not in context:
+            context['username'] = context['user'].username
+        return context
+
+    def render(self):
+        template, nodes = get_email_template(self.template_name)
+        context = make_context(self.get_context_data(), request=self.request)
+        with context.bind_template(template.template):
+            for attr, node in nodes:
+                setattr(self, attr, node.render(context).strip())
+        self._attach_body()
+
+    @classmethod
+    def render_batch(cls, users, **context):
+        """Render a message to each of users, e.g. for sending them over one
+        connection.
+
+        Args:
+            users: user instances or a queryset, which is fetched with one query
+            context: context shared by all messages
 
         Returns:
-            dict: context object
+            list: rendered messages in order of users
         """
-        context = super().get_context_data()
-        user_pk = context['user_pk']
-        user = User.objects.get(pk=user_pk)
-        context['username'] = user.username
-        context['activation_url'] = reverse(
-            'user-activate',
-            kwargs={
-                'uid': utils.encode_uid(user.pk),
-                'token': email_verification_token_generator.make_token(user),
-            },
-        )
-        return context
+        messages = []
+        for user in users:
+            message = cls(context={**context, 'user': user})
+            message.render()
+            message.to = [user.email]
+            message.from_email = settings.DEFAULT_FROM_EMAIL
+            messages.append(message)
+        return messages
 
 
-class ActivationEmail(BaseEmailMessage):
+class ActivationEmail(UserEmailMessage):
     """
-    This class is used to send an activation email to given user_pk. user_pk
-    should be supplied with context object.
+    This class is used to send an activation email to given user, or with a
+    given `activation_url`.
     """
     template_name = 'email/activation.html'
 
@@ -47,28 +94,27 @@ class ActivationEmail(BaseEmailMessage):
             dict: context object
         """
         context = super().get_context_data()
-        user_pk = context['user_pk']
-        user = User.objects.get(pk=user_pk)
-        context['username'] = user.username
-        context['activation_url'] = reverse(
-            'user-activate',
-            kwargs={
-                'uid': utils.encode_uid(user.pk),
-                'token': email_verification_token_generator.make_token(user),
-            },
-        )
+        if 'activation_url' not in context:
+            user = context['user']
+            context['activation_url'] = reverse(
+                'user-activate',
+                kwargs={
+                    'uid': utils.encode_uid(user.pk),
+                    'token': email_verification_token_generator.make_token(user),
+                },
+            )
         return context
-    
 
-class PasswordResetEmail(BaseEmailMessage):
+
+class PasswordResetEmail(UserEmailMessage):
     """
-    This class is used to send a password reset email to given user_pk. user_pk
+    This class is used to send a password reset email to given user. Token
     should be supplied with context object.
     """
     template_name = 'email/password_reset.html'
 
     def get_context_data(self):
-        """Generate a token and encode it and return in context
+        """Encode uid of user and return it in context
 
         Token is not created here, since first we need it in PasswordResetView.
 
@@ -76,9 +122,6 @@ class PasswordResetEmail(BaseEmailMessage):
             dict: context object
         """
         context = super().get_context_data()
-        user_pk = context['user_pk']
-        user = User.objects.get(pk=user_pk)
-        context['username'] = user.username
-        context['uid'] = utils.encode_uid(user.pk)
-
+        if 'uid' not in context:
+            context['uid'] = utils.encode_uid(context['user'].pk)
         return context
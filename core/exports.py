@@ -0,0 +1,101 @@
+"""
+Exporting users as NDJSON or CSV (see UserExportView and export_users command).
+
+Rows are read with a server-side cursor (`iterator(chunk_size=...)`) and
+written one by one, so memory use doesn't depend on number of users.
+"""
+import csv
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import User, EmailLog, EmailLogRollup
+
+EXPORT_FIELDS = [
+    'id',
+    'username',
+    'email',
+    'is_staff',
+    'is_active',
+    'is_email_activated',
+    'date_joined',
+    'last_login',
+]
+
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def email_count(email_type):
+    """Expression of number of emails of a type sent to each user
+
+    Rolled up counters (see core.retention) are added to remaining logs.
+    """
+    logs = (
+        EmailLog.objects.filter(user=OuterRef('pk'), email_type=email_type)
+        .order_by()
+        .values('user')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    rollup = EmailLogRollup.objects.filter(
+        user=OuterRef('pk'), email_type=email_type
+    ).values('count')
+    zero = Value(0, output_field=IntegerField())
+    return Coalesce(Subquery(logs), zero) + Coalesce(Subquery(rollup), zero)
+
+
+def get_export_queryset(
+    is_email_activated=None,
+    date_joined_after=None,
+    date_joined_before=None,
+    email_stats=False,
+):
+    """Get values() queryset of exported users ordered by pk
+
+    Args:
+        is_email_activated (bool): if given, only users with this value
+        date_joined_after (datetime): if given, only users joined since then
+        date_joined_before (datetime): if given, only users joined before then
+        email_stats (bool): add number of sent emails of each type
+    """
+    queryset = User.objects.order_by('pk')
+    if is_email_activated is not None:
+        queryset = queryset.filter(is_email_activated=is_email_activated)
+    if date_joined_after is not None:
+        queryset = queryset.filter(date_joined__gte=date_joined_after)
+    if date_joined_before is not None:
+        queryset = queryset.filter(date_joined__lt=date_joined_before)
+
+    if email_stats:
+        return queryset.values(
+            *EXPORT_FIELDS,
+            activation_emails=email_count(EmailLog.EMAIL_VERIFICATION),
+            password_reset_emails=email_count(EmailLog.PASSWORD_RESET),
+        )
+    return queryset.values(*EXPORT_FIELDS)
+
+
+class Echo:
+    """File-like object which returns what is written, used by csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export(queryset, file_format, chunk_size=None):
+    """Yield lines of users of a values() queryset in NDJSON or CSV format."""
+    fields = [*queryset.query.values_select, *queryset.query.annotation_select]
+    rows = queryset.iterator(chunk_size=chunk_size or settings.USER_EXPORT_CHUNK_SIZE)
+
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([row[field] for field in fields])
+        return
+
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + '\n'
@@ -0,0 +1,23 @@
+"""
+Password hashers which add hashing time to request timings (see
+core.instrumentation). They have the same algorithms as Django's hashers,
+so existing password hashes stay valid.
+"""
+from django.contrib.auth import hashers
+
+from .instrumentation import measure
+
+
+class TimedHasherMixin:
+    # verify() and harden_runtime() call encode(), so they are timed too
+    def encode(self, password, salt, *args, **kwargs):
+        with measure('hash'):
+            return super().encode(password, salt, *args, **kwargs)
+
+
+class PBKDF2PasswordHasher(TimedHasherMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class PBKDF2SHA1PasswordHasher(TimedHasherMixin, hashers.PBKDF2SHA1PasswordHasher):
+    pass
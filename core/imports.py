@@ -0,0 +1,190 @@
+"""
+Importing users from CSV or JSON lines files (see import_users command).
+
+Input is streamed in chunks, so memory use doesn't depend on file size. Each
+chunk is validated and inserted like bulk user creation (see core.bulk) and
+committed in its own transaction. After each chunk the number of processed
+rows is written to a checkpoint file, so an interrupted import can resume.
+Rejected rows are written to a rejects file with their errors.
+"""
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import identify_hasher
+from rest_framework import serializers
+
+from .bulk import BulkUserItemSerializer, hash_passwords, insert_users, validate_users
+from .serializers import UserCreateSerializer
+
+
+class ImportUserSerializer(BulkUserItemSerializer):
+    """
+    Also accepts `password_hash`, a password already hashed by one of
+    PASSWORD_HASHERS, instead of a raw `password`.
+    """
+
+    password_hash = serializers.CharField(required=False, write_only=True)
+
+    class Meta(UserCreateSerializer.Meta):
+        fields = [*UserCreateSerializer.Meta.fields, 'password_hash']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields['password'].required = False
+        return fields
+
+    def validate_password_hash(self, value):
+        try:
+            identify_hasher(value)
+        except ValueError:
+            raise serializers.ValidationError('Unknown password hash format.')
+        return value
+
+    def validate(self, attrs):
+        if ('password' in attrs) == ('password_hash' in attrs):
+            raise serializers.ValidationError(
+                'Exactly one of password and password_hash is required.'
+            )
+        return attrs
+
+
+def read_rows(input_file, file_format):
+    """Yield (line number, row) of a CSV (with header) or JSON lines file
+
+    Rows which cannot be parsed are yielded as None.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(input_file)
+        for row in reader:
+            # Empty cells are missing values
+            yield reader.line_num, {key: value for key, value in row.items() if value}
+        return
+
+    for line_number, line in enumerate(input_file, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def read_checkpoint(path):
+    """Get number of input rows processed by an earlier run (0 if none)."""
+    try:
+        with open(path) as checkpoint_file:
+            return json.load(checkpoint_file)['rows']
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, rows):
+    # Written to a temporary file and renamed, so it is never half written
+    with open(f'{path}.tmp', 'w') as checkpoint_file:
+        json.dump({'rows': rows}, checkpoint_file)
+    os.replace(f'{path}.tmp', path)
+
+
+class UserImport:
+    """
+    Import users of input file in chunks of chunk_size rows.
+
+    `run()` reports progress after each chunk by calling `progress` (if given)
+    with the UserImport, so `rows`, `created`, `rejected` and `rows_per_second`
+    can be read.
+    """
+
+    def __init__(
+        self,
+        input_file,
+        file_format,
+        rejects_file,
+        checkpoint_path,
+        chunk_size=1000,
+        send_activation_emails=False,
+        progress=None,
+    ):
+        self.input_file = input_file
+        self.file_format = file_format
+        self.rejects_file = rejects_file
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = chunk_size
+        self.send_activation_emails = send_activation_emails
+        self.progress = progress
+
+        self.rows = 0
+        self.created = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return (self.rows - self.skipped) / self.elapsed if self.elapsed else 0.0
+
+    def run(self):
+        started = time.monotonic()
+        rows = read_rows(self.input_file, self.file_format)
+
+        # Rows of an earlier run are read again, but not processed
+        self.skipped = read_checkpoint(self.checkpoint_path)
+        self.rows = sum(1 for _ in islice(rows, self.skipped))
+
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+
+            self.import_chunk(chunk)
+            self.rows += len(chunk)
+            self.rejects_file.flush()
+            write_checkpoint(self.checkpoint_path, self.rows)
+
+            self.elapsed = time.monotonic() - started
+            if self.progress is not None:
+                self.progress(self)
+
+        self.elapsed = time.monotonic() - started
+
+    def import_chunk(self, chunk):
+        parsed = [(line, row) for line, row in chunk if row is not None]
+        for line, row in chunk:
+            if row is None:
+                self.reject(line, {}, {'non_field_errors': ['Malformed row.']})
+
+        results = validate_users([row for _, row in parsed], ImportUserSerializer)
+        passwords = {
+            index: data['password_hash']
+            for index, (data, _) in enumerate(results)
+            if data is not None and 'password_hash' in data
+        }
+        raw_indexes = [
+            index
+            for index, (data, _) in enumerate(results)
+            if data is not None and 'password_hash' not in data
+        ]
+        raw_passwords = [results[index][0]['password'] for index in raw_indexes]
+        passwords.update(zip(raw_indexes, hash_passwords(raw_passwords)))
+
+        users = insert_users(results, passwords, self.send_activation_emails)
+        self.created += len(users)
+        for index, (_, errors) in enumerate(results):
+            if index not in users:
+                line, row = parsed[index]
+                self.reject(line, row, errors)
+
+    def reject(self, line, row, errors):
+        self.rejected += 1
+        # Passwords are never written to the rejects file
+        row = {
+            key: value
+            for key, value in row.items()
+            if key not in {'password', 'password_hash'}
+        }
+        self.rejects_file.write(
+            json.dumps({'line': line, 'row': row, 'errors': errors}) + '\n'
+        )
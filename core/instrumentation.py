@@ -0,0 +1,203 @@
+"""
+Per-request instrumentation: database queries, database time and time spent
+in password hashing and email sending of each request.
+
+`RequestTimingMiddleware` records every request, which costs a clock read
+per query. Queries are recorded by an execute wrapper which every database
+connection gets when it is created; it finds timings of the current request
+in a context variable, which is also visible in threads of sync_to_async, so
+the middleware runs natively in both WSGI and ASGI. Timings of a sampled
+share of requests (`REQUEST_TIMING_SAMPLE_RATE`) are returned in a
+`Server-Timing` header, so they can be read in browser dev tools or by a load
+test. Streaming responses are recorded once their content is sent and have
+no `Server-Timing` header.
+
+Code which should be timed uses `measure(name)`; outside of a request (e.g.
+in celery workers) it does nothing.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import Signal, receiver
+
+# Sent with `request`, `response` and `timings` (RequestTimings) after every
+# request
+request_timed = Signal()
+
+_current_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Timings of one request; durations are in seconds."""
+
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.durations = {'db': 0.0}
+        self.started = time.perf_counter()
+        self.total = None
+
+    def add(self, name, duration):
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Database execute wrapper which counts and times queries."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.durations['db'] += time.perf_counter() - started
+
+    def server_timing(self):
+        """Value of Server-Timing header"""
+        metrics = [
+            f'db;dur={self.durations["db"] * 1000:.2f};desc="{self.queries} queries"'
+        ]
+        metrics.extend(
+            f'{name};dur={duration * 1000:.2f}'
+            for name, duration in self.durations.items()
+            if name != 'db'
+        )
+        metrics.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper which records queries of current request."""
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute_wrapper(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Connections are created again after they are closed, wrappers are kept
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def get_view_name(view_func, request):
+    """Name of a view, e.g. ResetPasswordView or UserViewSet.list"""
+    view_class = getattr(view_func, 'view_class', None) or getattr(
+        view_func, 'cls', None
+    )
+    if view_class is None:
+        return view_func.__name__
+    # Viewsets map request methods to actions
+    actions = getattr(view_func, 'actions', None)
+    if actions and request.method.lower() in actions:
+        return f'{view_class.__name__}.{actions[request.method.lower()]}'
+    return view_class.__name__
+
+
+@contextmanager
+def measure(name):
+    """Add time spent in the block to `name` timing of current request."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def iter_in_context(iterable):
+    """Iterate in the current context, e.g. content of a streaming response.
+
+    Streaming responses are iterated after middlewares have returned, so
+    without it their queries would not be recorded or routed (see
+    core.routers) like the rest of the request.
+    """
+    # Copied now, since the body of a generator runs at its first item
+    return _iter_in_context(contextvars.copy_context(), iter(iterable))
+
+
+def _iter_in_context(context, iterator):
+    try:
+        while True:
+            try:
+                item = context.run(next, iterator)
+            except StopIteration:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            context.run(close)
+
+
+class RequestTimingMiddleware:
+    """
+    Record timings of every request and add Server-Timing header to sampled
+    responses. It should be the first middleware, so all queries are counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        # Requests which didn't resolve to a view have no view name
+        if request.resolver_match is not None:
+            timings.view = get_view_name(request.resolver_match.func, request)
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.stream(
+                request, response, timings, response.streaming_content
+            )
+            return response
+
+        timings.total = time.perf_counter() - timings.started
+        if random.random() < settings.REQUEST_TIMING_SAMPLE_RATE:
+            response['Server-Timing'] = timings.server_timing()
+        self.record(request, response, timings)
+        return response
+
+    def stream(self, request, response, timings, content):
+        """Yield content and record timings once it is sent"""
+        try:
+            yield from content
+        finally:
+            timings.total = time.perf_counter() - timings.started
+            self.record(request, response, timings)
+
+    def record(self, request, response, timings):
+        request_timed.send(
+            sender=self.__class__, request=request, response=response, timings=timings
+        )
@@ -0,0 +1,217 @@
+import os
+import smtplib
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.mail.backends import smtp
+
+from . import metrics
+from .instrumentation import measure
+
+
+class SMTPConnectionPool:
+    """
+    A small pool of open SMTP connections which belongs to a single process.
+
+    Connections are never shared with forked children (e.g. celery prefork
+    workers); a child process starts with an empty pool.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._connections = deque()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+        # Counters used to measure how well the pool works
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _reset_after_fork(self):
+        if self._pid != os.getpid():
+            # Sockets belong to the parent process, so they are dropped here
+            # without sending QUIT.
+            self._connections.clear()
+            self._pid = os.getpid()
+
+    def get(self):
+        """Pop the most recently used connection.
+
+        Returns:
+            tuple: (connection, last_used) or (None, None) if pool is empty
+        """
+        with self._lock:
+            self._reset_after_fork()
+            if self._connections:
+                return self._connections.pop()
+        return None, None
+
+    def put(self, connection):
+        """Return a connection to pool. Returns False if pool is full."""
+        with self._lock:
+            self._reset_after_fork()
+            if len(self._connections) < self.max_size:
+                self._connections.append((connection, time.monotonic()))
+                return True
+        return False
+
+    def drain(self):
+        """Remove and return all pooled connections."""
+        with self._lock:
+            self._reset_after_fork()
+            connections = [connection for connection, _ in self._connections]
+            self._connections.clear()
+        return connections
+
+    def __len__(self):
+        return len(self._connections)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, max_size):
+    """Return the process-wide pool for given connection parameters."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SMTPConnectionPool(max_size)
+        return pool
+
+
+class PooledEmailBackend(smtp.EmailBackend):
+    """
+    SMTP email backend which keeps connections open between `send_messages`
+    calls instead of doing a handshake (and TLS negotiation) for every email.
+
+    Pooled connections which are idle for more than
+    `EMAIL_POOL_HEALTH_CHECK_INTERVAL` seconds are checked with NOOP before
+    being reused and the ones idle for more than `EMAIL_POOL_MAX_IDLE` seconds
+    are closed. Messages are sent in batches of `EMAIL_POOL_BATCH_SIZE` over
+    one connection.
+    """
+
+    def __init__(
+        self,
+        pool_size=None,
+        health_check_interval=None,
+        max_idle=None,
+        batch_size=None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.pool_size = settings.EMAIL_POOL_SIZE if pool_size is None else pool_size
+        self.health_check_interval = (
+            settings.EMAIL_POOL_HEALTH_CHECK_INTERVAL
+            if health_check_interval is None
+            else health_check_interval
+        )
+        self.max_idle = settings.EMAIL_POOL_MAX_IDLE if max_idle is None else max_idle
+        self.batch_size = (
+            settings.EMAIL_POOL_BATCH_SIZE if batch_size is None else batch_size
+        )
+        self.pool = get_pool(
+            (self.host, self.port, self.username, self.use_tls, self.use_ssl),
+            self.pool_size,
+        )
+
+    def open(self):
+        if self.connection:
+            return False
+
+        while True:
+            connection, last_used = self.pool.get()
+            if connection is None:
+                break
+            if self._is_usable(connection, last_used):
+                self.connection = connection
+                self.pool.reused += 1
+                return True
+            self._quit(connection)
+
+        opened = super().open()
+        if opened:
+            self.pool.created += 1
+        return opened
+
+    def close(self):
+        """Return the connection to pool, or close it if pool is full."""
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        if not self.pool.put(connection):
+            self._quit(connection)
+
+    def discard(self):
+        """Close current connection without returning it to pool."""
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        self._quit(connection)
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+
+        num_sent = 0
+        with measure('email'):
+            for start in range(0, len(email_messages), self.batch_size):
+                num_sent += self._send_batch(
+                    email_messages[start : start + self.batch_size]
+                )
+        return num_sent
+
+    def _send_batch(self, email_messages):
+        with self._lock:
+            new_conn_created = self.open()
+            if not self.connection or new_conn_created is None:
+                # We failed silently on open().
+                return 0
+
+            num_sent = 0
+            try:
+                for message in email_messages:
+                    if self._send_or_reconnect(message):
+                        num_sent += 1
+            except BaseException:
+                # The connection state is unknown, don't put it back in pool
+                self.discard()
+                raise
+            finally:
+                if new_conn_created:
+                    self.close()
+        return num_sent
+
+    def _send_or_reconnect(self, message):
+        """Send message and reconnect once if server has dropped connection."""
+        with metrics.smtp_send_duration.time():
+            try:
+                return self._send(message)
+            except smtplib.SMTPServerDisconnected:
+                self.discard()
+                if not smtp.EmailBackend.open(self):
+                    return False
+                self.pool.created += 1
+                return self._send(message)
+
+    def _is_usable(self, connection, last_used):
+        idle = time.monotonic() - last_used
+        if idle > self.max_idle:
+            return False
+        if idle < self.health_check_interval:
+            return True
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _quit(self, connection):
+        self.pool.discarded += 1
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import breached_passwords
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the breached passwords file from a text file of SHA-1 hashes '
+        '(one per line, optionally followed by :count).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file of hex SHA-1 hashes.')
+        parser.add_argument(
+            '--output',
+            help='File to write (default: BREACHED_PASSWORDS_FILE).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10_000_000,
+            help='Number of hashes sorted in memory at once (default: 10000000).',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output'] or settings.BREACHED_PASSWORDS_FILE
+        if not output:
+            raise CommandError('Set BREACHED_PASSWORDS_FILE or use --output.')
+
+        with open(options['path']) as input_file:
+            count = breached_passwords.build(
+                self.read_hashes(input_file), output, options['chunk_size']
+            )
+        self.stdout.write(f'Wrote {count} hashes to {output}.')
+
+    def read_hashes(self, input_file):
+        for line_number, line in enumerate(input_file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield breached_passwords.parse_hash(line)
+            except ValueError as e:
+                raise CommandError(f'Line {line_number}: {e}')
@@ -0,0 +1,80 @@
+import argparse
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+
+from core.exports import get_export_queryset, iter_export
+
+
+def parse_bool(value):
+    if value.lower() in {'true', '1', 'yes'}:
+        return True
+    if value.lower() in {'false', '0', 'no'}:
+        return False
+    raise argparse.ArgumentTypeError(f'{value!r} is not a boolean.')
+
+
+def parse_iso_datetime(value):
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise argparse.ArgumentTypeError(f'{value!r} is not an ISO 8601 datetime.')
+    return parsed
+
+
+class Command(BaseCommand):
+    help = 'Export users as NDJSON or CSV with constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            default='ndjson',
+            help='Output format (default: ndjson).',
+        )
+        parser.add_argument(
+            '--output', help='Write to this file instead of standard output.'
+        )
+        parser.add_argument(
+            '--is-email-activated',
+            type=parse_bool,
+            help='Only export users whose email is (true) or is not (false) activated.',
+        )
+        parser.add_argument(
+            '--date-joined-after',
+            type=parse_iso_datetime,
+            help='Only export users joined since this ISO 8601 datetime.',
+        )
+        parser.add_argument(
+            '--date-joined-before',
+            type=parse_iso_datetime,
+            help='Only export users joined before this ISO 8601 datetime.',
+        )
+        parser.add_argument(
+            '--email-stats',
+            action='store_true',
+            help='Add number of sent emails of each type.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Number of users fetched at once (default: USER_EXPORT_CHUNK_SIZE).',
+        )
+
+    def handle(self, *args, **options):
+        queryset = get_export_queryset(
+            is_email_activated=options['is_email_activated'],
+            date_joined_after=options['date_joined_after'],
+            date_joined_before=options['date_joined_before'],
+            email_stats=options['email_stats'],
+        )
+        lines = iter_export(queryset, options['format'], options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output_file:
+                output_file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,94 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import UserImport
+
+
+class Command(BaseCommand):
+    help = (
+        'Import users from a CSV (with header) or JSON lines file with username, '
+        'email and either password or password_hash of every user.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file.')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='Input format (default: guessed from file extension).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of rows imported in each transaction (default: 1000).',
+        )
+        parser.add_argument(
+            '--rejects',
+            help='Rejected rows are written to this file (default: <path>.rejects.jsonl).',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Progress is saved to this file (default: <path>.checkpoint).',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint of an earlier run and start from the first row.',
+        )
+        parser.add_argument(
+            '--send-activation-emails',
+            action='store_true',
+            help='Send activation emails to imported users.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if file_format == 'json':
+            file_format = 'jsonl'
+        if file_format not in {'csv', 'jsonl'}:
+            raise CommandError('Unknown input format, use --format.')
+
+        rejects_path = options['rejects'] or f'{path}.rejects.jsonl'
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        if options['restart'] and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        with open(path, newline='') as input_file, open(
+            rejects_path, 'w' if options['restart'] else 'a'
+        ) as rejects_file:
+            user_import = UserImport(
+                input_file,
+                file_format,
+                rejects_file,
+                checkpoint_path,
+                chunk_size=options['chunk_size'],
+                send_activation_emails=options['send_activation_emails'],
+                progress=self.write_progress,
+            )
+            user_import.run()
+
+        if user_import.skipped:
+            self.stdout.write(
+                f'Resumed after {user_import.skipped} rows of an earlier run.'
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {user_import.created} users and rejected '
+                f'{user_import.rejected} rows in {user_import.elapsed:.1f}s '
+                f'({user_import.rows_per_second:.0f} rows/s). '
+                f'Rejected rows are written to {rejects_path}.'
+            )
+        )
+
+    def write_progress(self, user_import):
+        self.stdout.write(
+            f'{user_import.rows} rows: {user_import.created} created, '
+            f'{user_import.rejected} rejected, '
+            f'{user_import.rows_per_second:.0f} rows/s'
+        )
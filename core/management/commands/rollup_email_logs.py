@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.retention import get_retention_cutoff, rollup_email_logs
+
+
+class Command(BaseCommand):
+    help = (
+        'Roll up email logs older than EMAIL_LOG_RETENTION_DAYS into per-user '
+        'counters and delete them in chunks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help=(
+                'Roll up logs older than this many days '
+                '(default: EMAIL_LOG_RETENTION_DAYS).'
+            ),
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help=(
+                'Number of logs rolled up in each transaction '
+                '(default: EMAIL_LOG_ROLLUP_CHUNK_SIZE).'
+            ),
+        )
+        parser.add_argument(
+            '--archive',
+            help='Append deleted logs to this file as JSON lines.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        if options['days'] is None:
+            cutoff = get_retention_cutoff()
+        else:
+            cutoff = timezone.now() - timezone.timedelta(days=options['days'])
+
+        if options['archive']:
+            with open(options['archive'], 'a') as archive_file:
+                total = rollup_email_logs(cutoff, options['chunk_size'], archive_file)
+        else:
+            total = rollup_email_logs(cutoff, options['chunk_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rolled up {total} email logs older than {cutoff}.')
+        )
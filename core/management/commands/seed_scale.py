@@ -0,0 +1,70 @@
+import os
+import time
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seeding import SeedOptions, seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic users and email logs for scale testing. The same '
+        '--seed always generates the same data.'
+    )
+
+    def add_arguments(self, parser):
+        # Every option of SeedOptions is a command option with the same default
+        for field in fields(SeedOptions):
+            parser.add_argument(
+                f'--{field.name.replace("_", "-")}',
+                type=field.type,
+                default=field.default,
+                help=f'(default: {field.default})',
+            )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help=(
+                'Number of processes inserting chunks, only used on PostgreSQL '
+                '(default: number of CPUs).'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        seed_options = SeedOptions(
+            **{field.name: options[field.name] for field in fields(SeedOptions)}
+        )
+        if seed_options.users < 0 or seed_options.chunk_size < 1:
+            raise CommandError('--users and --chunk-size must be positive.')
+        if not 0 <= seed_options.activation_ratio <= 1:
+            raise CommandError('--activation-ratio must be between 0 and 1.')
+        if not 0 <= seed_options.password_reset_ratio <= 1:
+            raise CommandError('--password-reset-ratio must be between 0 and 1.')
+        # Every user gets at least the activation email
+        if seed_options.emails_per_user <= 0 or seed_options.max_emails_per_user < 1:
+            raise CommandError(
+                '--emails-per-user and --max-emails-per-user must be positive.'
+            )
+        if options['workers'] < 1:
+            raise CommandError('--workers must be positive.')
+
+        self.started = time.monotonic()
+        users, email_logs = seed(
+            seed_options, workers=options['workers'], progress=self.write_progress
+        )
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Inserted {users} users and {email_logs} email logs in '
+                f'{elapsed:.1f}s ({(users + email_logs) / (elapsed or 1):.0f} rows/s).'
+            )
+        )
+
+    def write_progress(self, users, email_logs):
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f'{users} users, {email_logs} email logs: '
+            f'{(users + email_logs) / (elapsed or 1):.0f} rows/s'
+        )
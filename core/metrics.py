@@ -0,0 +1,278 @@
+"""
+In-process metrics (counters and histograms) exposed in Prometheus text
+format by the /metrics endpoint.
+
+Every process counts in memory. With several processes (e.g. gunicorn
+workers) `METRICS_DIR` must be a directory shared by them: each process
+writes its values to its own file in it at most every
+`METRICS_FLUSH_INTERVAL` seconds from a background thread, so requests only
+update memory, and /metrics adds up the files of all processes. Files of
+exited processes are kept, so counters never go down; the directory should
+be emptied when the server (re)starts.
+"""
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def get_key(self, labels):
+        """Key of values with given labels, which is a JSON list of label values"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} has labels {self.labelnames}, got {labels}')
+        return json.dumps([str(labels[name]) for name in self.labelnames])
+
+    def get_labels(self, key):
+        return dict(zip(self.labelnames, json.loads(key)))
+
+    def samples(self, key, row):
+        """Yield (name, labels, value) of each sample of one label set"""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self.name, self.get_key(labels), {0: amount}, 1)
+
+    def samples(self, key, row):
+        yield self.name, self.get_labels(key), row[0]
+
+
+class Histogram(Metric):
+    """
+    Values are stored as a row of bucket counts (not cumulative; the last
+    bucket is +Inf), sum and count.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, *args, buckets=DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = [*sorted(buckets), float('inf')]
+
+    def observe(self, value, **labels):
+        index = bisect.bisect_left(self.buckets, value)
+        size = len(self.buckets)
+        self.registry.add(
+            self.name,
+            self.get_key(labels),
+            {index: 1, size: value, size + 1: 1},
+            size + 2,
+        )
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe duration of the block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self, key, row):
+        labels = self.get_labels(key)
+        cumulative = 0
+        for bound, count in zip(self.buckets, row):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(float(bound))
+            yield f'{self.name}_bucket', {**labels, 'le': le}, cumulative
+        yield f'{self.name}_sum', labels, row[-2]
+        yield f'{self.name}_count', labels, row[-1]
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def merge(values, other):
+    """Add values of `other` to `values` (both are {name: {key: row}})."""
+    for name, rows in other.items():
+        merged_rows = values.setdefault(name, {})
+        for key, row in rows.items():
+            merged = merged_rows.setdefault(key, [0] * len(row))
+            for index, value in enumerate(row):
+                merged[index] += value
+    return values
+
+
+class Registry:
+    """
+    Metrics of this process. `directory` and `flush_interval` default to
+    METRICS_DIR and METRICS_FLUSH_INTERVAL settings.
+    """
+
+    def __init__(self, directory=None, flush_interval=None):
+        self._directory = directory
+        self._flush_interval = flush_interval
+        self.metrics = {}
+        self._values = {}
+        self._lock = threading.Lock()
+        # Only one thread writes the file at a time
+        self._flush_lock = threading.Lock()
+        self._reset_process()
+
+    @property
+    def directory(self):
+        return self._directory or settings.METRICS_DIR
+
+    @property
+    def flush_interval(self):
+        if self._flush_interval is None:
+            return settings.METRICS_FLUSH_INTERVAL
+        return self._flush_interval
+
+    def _reset_process(self):
+        # Pids can be reused, so file name is unique to this process
+        self._pid = os.getpid()
+        self._file_name = f'metrics-{self._pid}-{uuid.uuid4().hex}.json'
+        self._flusher_started = False
+        self._values.clear()
+
+    def _reset_after_fork(self):
+        if self._pid != os.getpid():
+            # Values of the parent process are counted by the parent
+            self._reset_process()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), **kwargs):
+        return self.register(Histogram(self, name, documentation, labelnames, **kwargs))
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered.')
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add(self, name, key, increments, size):
+        """Add increments ({index: amount}) to the row of `key` of metric."""
+        with self._lock:
+            self._reset_after_fork()
+            row = self._values.setdefault(name, {}).get(key)
+            if row is None:
+                row = self._values[name][key] = [0] * size
+            for index, amount in increments.items():
+                row[index] += amount
+
+            if not self._flusher_started and self.directory:
+                self._flusher_started = True
+                threading.Thread(
+                    target=self._flush_periodically, name='metrics-flush', daemon=True
+                ).start()
+
+    def _flush_periodically(self):
+        pid = os.getpid()
+        # A forked process starts its own thread
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write values of this process to its file in directory."""
+        with self._lock:
+            self._reset_after_fork()
+            if not self.directory:
+                return
+            # Values are serialized under the lock and written without it
+            content = json.dumps(self._values)
+            path = os.path.join(self.directory, self._file_name)
+
+        with self._flush_lock:
+            # Written to a temporary file and renamed, so it is never half read
+            with open(f'{path}.tmp', 'w') as metrics_file:
+                metrics_file.write(content)
+            os.replace(f'{path}.tmp', path)
+
+    def collect(self):
+        """Get values of all processes as {name: {key: row}}"""
+        with self._lock:
+            self._reset_after_fork()
+            values = merge({}, self._values)
+            own_file_name = self._file_name
+
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                if os.path.basename(path) == own_file_name:
+                    continue
+                try:
+                    with open(path) as metrics_file:
+                        merge(values, json.load(metrics_file))
+                except (OSError, ValueError):
+                    # Removed while being read
+                    continue
+        return values
+
+    def render(self):
+        """Get metrics of all processes in Prometheus text format."""
+        values = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for key, row in sorted(values.get(name, {}).items()):
+                for sample_name, labels, value in metric.samples(key, row):
+                    lines.append(f'{sample_name}{format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+# Values counted since the last flush would be lost otherwise
+atexit.register(registry.flush)
+
+view_duration = registry.histogram(
+    'auth_view_duration_seconds',
+    'Time spent handling requests of each view.',
+    ['view', 'method', 'status'],
+)
+authenticate_duration = registry.histogram(
+    'auth_authenticate_duration_seconds',
+    'Time spent by AuthenticationBackend.authenticate.',
+    ['result'],
+)
+token_duration = registry.histogram(
+    'auth_token_duration_seconds',
+    'Time spent generating and verifying tokens.',
+    ['token', 'operation'],
+)
+smtp_send_duration = registry.histogram(
+    'auth_smtp_send_duration_seconds',
+    'Time spent sending one email over SMTP.',
+)
+rate_limit_rejections = registry.counter(
+    'auth_rate_limit_rejections_total',
+    'Emails rejected by rate limits.',
+    ['email_type'],
+)
+password_validator_duration = registry.histogram(
+    'auth_password_validator_duration_seconds',
+    'Time spent by each password validator.',
+    ['validator'],
+    buckets=(0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+)
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_add_password_reset_token_field_to_user_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emaillog',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Attempts'),
+        ),
+        migrations.AddField(
+            model_name='emaillog',
+            name='error',
+            field=models.TextField(blank=True, default='', verbose_name='Error'),
+        ),
+        migrations.AddField(
+            model_name='emaillog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=16, verbose_name='Status'),
+        ),
+    ]
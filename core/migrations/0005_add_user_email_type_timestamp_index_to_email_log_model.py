@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_add_status_fields_to_email_log_model'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['user', 'email_type', 'timestamp'], name='core_emaillog_user_type_ts'),
+        ),
+    ]
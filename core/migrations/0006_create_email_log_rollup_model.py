@@ -0,0 +1,29 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_add_user_email_type_timestamp_index_to_email_log_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailLogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email_type', models.CharField(choices=[('email_verification', 'Email Verification'), ('password_reset', 'Password Rest')], max_length=32, verbose_name='Email Type')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Count')),
+                ('last_sent', models.DateTimeField(blank=True, null=True, verbose_name='Last Sent')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='email_log_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='emaillogrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'email_type'), name='core_emaillogrollup_user_type'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently, so login is not blocked while building
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_create_email_log_rollup_model'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('username'), name='core_user_username_upper'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='core_user_email_upper'),
+        ),
+    ]
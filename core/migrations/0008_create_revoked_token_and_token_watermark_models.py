@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_add_upper_username_and_email_indexes_to_user_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, unique=True, verbose_name='JWT ID')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expires At')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Created At')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TokenWatermark',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='token_watermark', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('not_before', models.DateTimeField(verbose_name='Not Before')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Updated At')),
+            ],
+        ),
+    ]
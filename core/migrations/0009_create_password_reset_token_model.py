@@ -0,0 +1,28 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_create_revoked_token_and_token_watermark_models'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='password_reset_token',
+        ),
+        migrations.CreateModel(
+            name='PasswordResetToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_hash', models.CharField(max_length=64, unique=True, verbose_name='Token Hash')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expires At')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='password_reset_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
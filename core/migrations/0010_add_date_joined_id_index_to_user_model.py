@@ -0,0 +1,21 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Index is built concurrently, so signup is not blocked while building
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_create_password_reset_token_model'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['date_joined', 'id'], name='core_user_date_joined_id'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_add_date_joined_id_index_to_user_model'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emaillog',
+            name='email_type',
+            field=models.CharField(choices=[('email_verification', 'Email Verification'), ('password_reset', 'Password Rest')], max_length=32, verbose_name='Email Type'),
+        ),
+    ]
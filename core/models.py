@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 
 from .managers import UserManager
@@ -28,8 +29,6 @@ class User(AbstractBaseUser, PermissionsMixin):
         error_messages={'unique': 'This email is used before.'},
     )
 
-    password_reset_token = models.CharField(max_length=255, null=True, blank=True)
-
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     is_email_activated = models.BooleanField(default=False)
@@ -40,6 +39,17 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # Used by AuthenticationBackend for case-insensitive lookups
+            models.Index(Upper('username'), name='core_user_username_upper'),
+            models.Index(Upper('email'), name='core_user_email_upper'),
+            # Used by UserCursorPagination for keyset pagination
+            models.Index(
+                fields=['date_joined', 'id'], name='core_user_date_joined_id'
+            ),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -54,6 +64,15 @@ class EmailLog(models.Model):
         (PASSWORD_RESET, 'Password Rest'),
     ]
 
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
     user = models.ForeignKey(
         User,
         blank=False,
@@ -63,10 +82,118 @@ class EmailLog(models.Model):
     )
 
     email_type = models.CharField(
-        'Email Type', blank=False, null=False, choices=EMAIL_TYPE_CHOICES
+        'Email Type',
+        max_length=32,
+        blank=False,
+        null=False,
+        choices=EMAIL_TYPE_CHOICES,
     )
 
     timestamp = models.DateTimeField(auto_now=True)
 
+    # Emails are sent by celery workers, so the log is created as pending and
+    # the task records the final result here.
+    status = models.CharField(
+        'Status', max_length=16, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Attempts', default=0)
+    error = models.TextField('Error', blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Used by rate limiter to get count and time of the last email
+            models.Index(
+                fields=['user', 'email_type', 'timestamp'],
+                name='core_emaillog_user_type_ts',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.email_type}"
+
+
+class EmailLogRollup(models.Model):
+    """
+    Number of emails of each type sent to a user whose logs are rolled up and
+    deleted by the retention job. Rate limiter adds these to remaining logs.
+    """
+
+    user = models.ForeignKey(
+        User,
+        blank=False,
+        null=False,
+        on_delete=models.CASCADE,
+        related_name='email_log_rollups',
+    )
+
+    email_type = models.CharField(
+        'Email Type',
+        max_length=32,
+        blank=False,
+        null=False,
+        choices=EmailLog.EMAIL_TYPE_CHOICES,
+    )
+
+    count = models.PositiveIntegerField('Count', default=0)
+    last_sent = models.DateTimeField('Last Sent', null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'email_type'], name='core_emaillogrollup_user_type'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.email_type} ({self.count})"
+
+
+class RevokedToken(models.Model):
+    """A single revoked JWT (access or refresh) identified by its jti claim"""
+
+    jti = models.CharField('JWT ID', max_length=255, unique=True)
+    # Revoked tokens are useless after they expire, so they can be deleted
+    expires_at = models.DateTimeField('Expires At', db_index=True)
+    created_at = models.DateTimeField('Created At', auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class TokenWatermark(models.Model):
+    """
+    Every JWT of the user which is issued before `not_before` is revoked. It
+    is moved forward when user's password is changed.
+    """
+
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='token_watermark',
+    )
+    not_before = models.DateTimeField('Not Before')
+    updated_at = models.DateTimeField('Updated At', auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.not_before}"
+
+
+class PasswordResetToken(models.Model):
+    """
+    A password reset token of user. Only SHA-256 hash of the token is stored,
+    and the row is deleted once the token is used.
+    """
+
+    user = models.ForeignKey(
+        User,
+        blank=False,
+        null=False,
+        on_delete=models.CASCADE,
+        related_name='password_reset_tokens',
+    )
+    token_hash = models.CharField('Token Hash', max_length=64, unique=True)
+    expires_at = models.DateTimeField('Expires At', db_index=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.expires_at}"
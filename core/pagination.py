@@ -1,5 +1,163 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Ids of cursors are clamped to the range of database integers (64-bit), so
+# huge ids don't overflow in queries and still compare the same
+MIN_ID = -(2**63)
+MAX_ID = 2**63 - 1
 
 
 class UserDefaultPagination(PageNumberPagination):
-    page_size = 10
\ No newline at end of file
+    page_size = 10
+
+
+class UserCursorPagination(BasePagination):
+    """
+    Keyset pagination of users ordered by (date_joined, id).
+
+    Each page is read with `WHERE (date_joined, id) > cursor position` on the
+    `core_user_date_joined_id` index, so latency doesn't grow with depth and
+    no COUNT(*) query is run. The cursor is opaque to clients.
+
+    Pass `?count=estimated` to get an estimated total count of users, read
+    from table statistics on PostgreSQL.
+    """
+
+    page_size = 10
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+    # Fields which must be loaded to build cursors (e.g. in queryset.values())
+    ordering_fields = ['date_joined', 'id']
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by('-date_joined', '-id')
+        else:
+            queryset = queryset.order_by('date_joined', 'id')
+
+        if position is not None:
+            date_joined, pk = position
+            lookup = 'lt' if reverse else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'date_joined__{lookup}': date_joined})
+                | Q(date_joined=date_joined, **{f'id__{lookup}': pk})
+            )
+
+        # One more row is read to know if there is another page
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = has_more if not reverse else position is not None
+        has_previous = has_more if reverse else position is not None
+        self.next_position = (
+            self.get_position(results[-1]) if results and has_next else None
+        )
+        self.previous_position = (
+            self.get_position(results[0]) if results and has_previous else None
+        )
+
+        self.count = (
+            self.get_estimated_count(queryset)
+            if request.query_params.get(self.count_query_param) == 'estimated'
+            else None
+        )
+        return results
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_position(self, user):
+        if isinstance(user, dict):
+            return user['date_joined'], user['id']
+        return user.date_joined, user.pk
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        date_joined, pk = position
+        data = json.dumps({'d': date_joined.isoformat(), 'i': pk, 'r': reverse})
+        cursor = base64.urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """Get (position, reverse) of cursor of request
+
+        Raises:
+            NotFound: if cursor is malformed
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            date_joined = parse_datetime(data['d'])
+            pk = int(data['i'])
+            reverse = bool(data['r'])
+        except (TypeError, ValueError, KeyError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if date_joined is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (date_joined, min(max(pk, MIN_ID), MAX_ID)), reverse
+
+    def get_estimated_count(self, queryset):
+        """Estimated number of rows of the table of queryset
+
+        On PostgreSQL it is read from planner statistics (updated by ANALYZE
+        and autovacuum). Filters of queryset are ignored. Other databases and
+        never analyzed tables fall back to an exact count.
+        """
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row is not None and row[0] >= 0:
+                return row[0]
+
+        return queryset.model._default_manager.using(queryset.db).count()
@@ -0,0 +1,121 @@
+"""
+Password policy: AUTH_PASSWORD_VALIDATORS, prepared once per process.
+
+`password_policy.load()` is called in CoreConfig.ready(), so the common
+passwords list is read at startup (before workers are forked when the app is
+preloaded) instead of in the first request of each worker, and it is kept
+as a frozenset.
+
+Validators run cheapest first. Once one of them fails, the password is
+rejected anyway, so validators costing more than SHORT_CIRCUIT_COST (e.g.
+UserAttributeSimilarityValidator) are skipped and only the errors of cheap
+validators are reported. The passwords which are accepted are the same as
+with Django's validate_password(), and errors are reported in the order of
+AUTH_PASSWORD_VALIDATORS.
+
+The time of each validator is recorded in metrics
+(`auth_password_validator_duration_seconds`); their total time is the
+`password` timing of the request.
+"""
+import threading
+import time
+
+from django.contrib.auth import password_validation
+from django.core.exceptions import ValidationError
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from . import metrics
+from .instrumentation import measure
+
+# Relative cost of Django's validators. Other validators can set a `cost`
+# attribute; the ones without it run last.
+VALIDATOR_COSTS = {
+    password_validation.MinimumLengthValidator: 0,
+    password_validation.NumericPasswordValidator: 0,
+    password_validation.CommonPasswordValidator: 1,
+    password_validation.UserAttributeSimilarityValidator: 2,
+}
+DEFAULT_COST = 3
+# Validators costing more are skipped once a validator failed
+SHORT_CIRCUIT_COST = 1
+
+
+def get_cost(validator):
+    return getattr(
+        validator, 'cost', VALIDATOR_COSTS.get(type(validator), DEFAULT_COST)
+    )
+
+
+class PasswordPolicy:
+    def __init__(self):
+        self._validators = None
+        self._lock = threading.Lock()
+
+    @property
+    def validators(self):
+        """Validators of AUTH_PASSWORD_VALIDATORS in their configured order"""
+        if self._validators is None:
+            self.load()
+        return self._validators
+
+    def load(self):
+        with self._lock:
+            validators = password_validation.get_default_password_validators()
+            for validator in validators:
+                if isinstance(validator, password_validation.CommonPasswordValidator):
+                    validator.passwords = frozenset(validator.passwords)
+
+            # Indexes of validators ordered by cost (sorting is stable)
+            self._order = sorted(
+                range(len(validators)), key=lambda i: get_cost(validators[i])
+            )
+            self._names = [type(validator).__name__ for validator in validators]
+            self._validators = validators
+
+    def clear(self):
+        with self._lock:
+            self._validators = None
+
+    def validate(self, password, user=None):
+        """Validate password like validate_password().
+
+        Raises:
+            django.core.exceptions.ValidationError: with errors of failed
+            validators
+        """
+        with measure('password'):
+            errors = self._validate(password, user)
+        if errors:
+            raise ValidationError([errors[index] for index in sorted(errors)])
+
+    def _validate(self, password, user):
+        """Errors of failed validators by their index"""
+        validators = self.validators
+        errors = {}
+        for index in self._order:
+            if errors and get_cost(validators[index]) > SHORT_CIRCUIT_COST:
+                break
+            started = time.perf_counter()
+            try:
+                validators[index].validate(password, user)
+            except ValidationError as error:
+                errors[index] = error
+            finally:
+                metrics.password_validator_duration.observe(
+                    time.perf_counter() - started, validator=self._names[index]
+                )
+        return errors
+
+    def __call__(self, password, user=None):
+        # Same signature as validate_password, so it can be a field validator
+        self.validate(password, user)
+
+
+password_policy = PasswordPolicy()
+
+
+@receiver(setting_changed)
+def reload_password_policy(setting, **kwargs):
+    if setting == 'AUTH_PASSWORD_VALIDATORS':
+        password_policy.clear()
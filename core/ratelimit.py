@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils import timezone
+
+from . import metrics
+from .models import User, EmailLog, EmailLogRollup
+
+
+class EmailRateLimitExceeded(Exception):
+    """Raised when user is not allowed to receive another email.
+
+    `wait_time` is a timedelta if user has to wait for the next email and None
+    if user has reached max number of allowed emails.
+    """
+
+    def __init__(self, wait_time=None):
+        super().__init__(wait_time)
+        self.wait_time = wait_time
+
+
+class EmailRateLimiter:
+    """
+    Rate limiter for emails of a single type. Limits are read from
+    `EMAIL_RATE_LIMITS` setting:
+
+        - `max_total`: number of emails each user can receive in total
+        - `interval`: seconds each user has to wait between two emails
+    """
+
+    def __init__(self, email_type):
+        self.email_type = email_type
+
+    @property
+    def max_total(self):
+        return settings.EMAIL_RATE_LIMITS[self.email_type]['max_total']
+
+    @property
+    def interval(self):
+        return timezone.timedelta(
+            seconds=settings.EMAIL_RATE_LIMITS[self.email_type]['interval']
+        )
+
+    def get_usage(self, user):
+        """Get number of sent emails and time of the last one in one query
+
+        Rolled up counters (see core.retention) are added to remaining logs,
+        so cost of this query doesn't grow with user's history.
+
+        Returns:
+            tuple: (total, last_sent) where last_sent is None if nothing is sent
+        """
+        logs = (
+            EmailLog.objects.filter(user=OuterRef('pk'), email_type=self.email_type)
+            .order_by()
+            .values('user')
+            .annotate(total=Count('pk'), last_sent=Max('timestamp'))
+        )
+        rollup = EmailLogRollup.objects.filter(
+            user=OuterRef('pk'), email_type=self.email_type
+        )
+        usage = (
+            User.objects.filter(pk=user.pk)
+            .values(
+                logs_total=Subquery(logs.values('total')),
+                logs_last_sent=Subquery(logs.values('last_sent')),
+                rollup_total=Subquery(rollup.values('count')),
+                rollup_last_sent=Subquery(rollup.values('last_sent')),
+            )
+            .get()
+        )
+
+        total = (usage['logs_total'] or 0) + (usage['rollup_total'] or 0)
+        last_sent = max(
+            [
+                value
+                for value in [usage['logs_last_sent'], usage['rollup_last_sent']]
+                if value is not None
+            ],
+            default=None,
+        )
+        return total, last_sent
+
+    def check(self, user):
+        """Raise EmailRateLimitExceeded if user cannot receive another email."""
+        total, last_sent = self.get_usage(user)
+
+        if total >= self.max_total:
+            raise EmailRateLimitExceeded()
+
+        if last_sent is not None:
+            delta = timezone.now() - last_sent
+            if delta < self.interval:
+                raise EmailRateLimitExceeded(wait_time=self.interval - delta)
+
+    @transaction.atomic
+    def reserve(self, user):
+        """Check the limits and take a slot for user by creating an email log.
+
+        User row is locked until the transaction is committed, so concurrent
+        requests of the same user cannot both pass the checks.
+
+        Returns:
+            core.models.EmailLog: the pending email log
+        """
+        User.objects.select_for_update().only('pk').get(pk=user.pk)
+        try:
+            self.check(user)
+        except EmailRateLimitExceeded:
+            metrics.rate_limit_rejections.inc(email_type=self.email_type)
+            raise
+        return EmailLog.objects.create(user=user, email_type=self.email_type)
+
+
+activation_email_rate_limiter = EmailRateLimiter(EmailLog.EMAIL_VERIFICATION)
+password_reset_email_rate_limiter = EmailRateLimiter(EmailLog.PASSWORD_RESET)
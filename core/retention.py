@@ -0,0 +1,132 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import User, EmailLog, EmailLogRollup
+
+
+def get_retention_cutoff():
+    """Email logs older than the returned datetime can be rolled up."""
+    return timezone.now() - timezone.timedelta(days=settings.EMAIL_LOG_RETENTION_DAYS)
+
+
+def lock_users(user_pks):
+    """Lock user rows in pk order until the end of current transaction"""
+    list(
+        User.objects.select_for_update()
+        .filter(pk__in=user_pks)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def rollup_email_log_chunk(cutoff, chunk_size, archive_file=None):
+    """Roll up one chunk of email logs older than cutoff and delete them.
+
+    Rows are added to per-user/per-type counters of EmailLogRollup, so total
+    limits are still enforced. Affected users are locked (in pk order) while
+    the chunk is moved, same as rate limiter does, so a rate limit check never
+    sees a row both in the counter and in the log table. Logs are read again
+    once users are locked, so logs which a concurrent rollup moved meanwhile
+    are not counted twice.
+
+    Args:
+        cutoff (datetime): only logs older than this are rolled up
+        chunk_size (int): max number of logs to roll up
+        archive_file (file): if given, deleted logs are written to it as JSON
+            lines before deletion
+
+    Returns:
+        int: number of rolled up logs, 0 means nothing is left
+    """
+    with transaction.atomic():
+        logs = list(
+            EmailLog.objects.filter(timestamp__lt=cutoff)
+            .order_by('pk')
+            .values('pk', 'user_id', 'email_type', 'timestamp', 'status')[
+                :chunk_size
+            ]
+        )
+        if not logs:
+            return 0
+
+        user_pks = sorted({log['user_id'] for log in logs})
+        lock_users(user_pks)
+        remaining = set(
+            EmailLog.objects.filter(pk__in=[log['pk'] for log in logs]).values_list(
+                'pk', flat=True
+            )
+        )
+        logs = [log for log in logs if log['pk'] in remaining]
+        if not logs:
+            return 0
+
+        groups = {}
+        for log in logs:
+            key = (log['user_id'], log['email_type'])
+            count, last_sent = groups.get(key, (0, log['timestamp']))
+            groups[key] = (count + 1, max(last_sent, log['timestamp']))
+
+        rollups = {
+            (rollup.user_id, rollup.email_type): rollup
+            for rollup in EmailLogRollup.objects.filter(user_id__in=user_pks)
+        }
+        new_rollups = []
+        for (user_pk, email_type), (count, last_sent) in groups.items():
+            rollup = rollups.get((user_pk, email_type))
+            if rollup is None:
+                new_rollups.append(
+                    EmailLogRollup(
+                        user_id=user_pk,
+                        email_type=email_type,
+                        count=count,
+                        last_sent=last_sent,
+                    )
+                )
+            else:
+                rollup.count += count
+                rollup.last_sent = max(rollup.last_sent or last_sent, last_sent)
+
+        EmailLogRollup.objects.bulk_create(new_rollups)
+        EmailLogRollup.objects.bulk_update(
+            [rollup for key, rollup in rollups.items() if key in groups],
+            ['count', 'last_sent'],
+        )
+
+        if archive_file is not None:
+            for log in logs:
+                archive_file.write(json.dumps(log, default=str) + '\n')
+
+        EmailLog.objects.filter(pk__in=[log['pk'] for log in logs]).delete()
+
+    return len(logs)
+
+
+def rollup_email_logs(cutoff=None, chunk_size=None, archive_file=None):
+    """Roll up all email logs older than cutoff in bounded chunks.
+
+    Each chunk is committed in its own transaction, so locks are short.
+
+    Returns:
+        int: total number of rolled up logs
+
+    Raises:
+        ValueError: if chunk_size is less than 1
+    """
+    cutoff = get_retention_cutoff() if cutoff is None else cutoff
+    chunk_size = (
+        settings.EMAIL_LOG_ROLLUP_CHUNK_SIZE if chunk_size is None else chunk_size
+    )
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be positive')
+
+    total = 0
+    while True:
+        rolled_up = rollup_email_log_chunk(cutoff, chunk_size, archive_file)
+        total += rolled_up
+        # A chunk can be short while older logs remain (e.g. when logs are
+        # deleted concurrently), so only an empty chunk means it is done
+        if not rolled_up:
+            return total
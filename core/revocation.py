@@ -0,0 +1,248 @@
+"""
+JWT revocation.
+
+Revoked tokens (by jti) and per-user watermarks (every token issued before is
+revoked) are stored in database. Every process keeps them in memory, so the
+check on each request needs no query:
+
+    - revoked jtis are kept in a Bloom filter; database is queried only when
+      the filter says a jti may be revoked
+    - watermarks are kept in sorted arrays and checked exactly
+
+Memory is refreshed with new rows every TOKEN_REVOCATION_REFRESH_INTERVAL
+seconds and rebuilt from scratch every TOKEN_REVOCATION_REBUILD_INTERVAL
+seconds, which also drops expired entries.
+"""
+import hashlib
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken, TokenWatermark
+
+
+class BloomFilter:
+    """A Bloom filter of strings which is sized for capacity and error_rate."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        bits = self.bits
+        for index in self._indexes(key):
+            bits[index >> 3] |= 1 << (index & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(
+            bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(key)
+        )
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+
+class Watermarks:
+    """
+    Map of user pk to a watermark timestamp. Loaded entries are kept in two
+    sorted arrays (16 bytes per user) and later ones in a small dict.
+    """
+
+    def __init__(self, items=()):
+        items = sorted(items)
+        self._users = array('q', (user_pk for user_pk, _ in items))
+        self._timestamps = array('d', (timestamp for _, timestamp in items))
+        self._recent = {}
+
+    def set(self, user_pk, timestamp):
+        self._recent[user_pk] = timestamp
+
+    def get(self, user_pk):
+        if user_pk in self._recent:
+            return self._recent[user_pk]
+
+        index = bisect_left(self._users, user_pk)
+        if index < len(self._users) and self._users[index] == user_pk:
+            return self._timestamps[index]
+        return None
+
+    @property
+    def nbytes(self):
+        return (
+            self._users.itemsize * len(self._users)
+            + self._timestamps.itemsize * len(self._timestamps)
+        )
+
+
+class TokenRevocations:
+    """In-memory view of revoked tokens of this process."""
+
+    # Rows committed late may have older timestamps than the last refresh, so
+    # refresh also reads rows this many seconds before that.
+    refresh_overlap = 60
+
+    def __init__(self):
+        self._jtis = None
+        self._watermarks = None
+        self._refreshed_at = None
+        self._rebuilt_at = None
+        self._last_seen = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Drop loaded revocations, so they are rebuilt on the next check."""
+        with self._lock:
+            self._jtis = None
+            self._watermarks = None
+            self._refreshed_at = None
+            self._rebuilt_at = None
+            self._last_seen = None
+
+    def needs_refresh(self):
+        return (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at
+            > settings.TOKEN_REVOCATION_REFRESH_INTERVAL
+        )
+
+    def refresh(self, rebuild=False):
+        """Load new revocations, or all of them if rebuild is True."""
+        if not self._lock.acquire(blocking=self._jtis is None):
+            # Another thread is refreshing, the current data is used meanwhile
+            return
+
+        try:
+            if not rebuild and not self.needs_refresh():
+                # Refreshed by another thread while waiting for the lock
+                return
+
+            rebuild = (
+                rebuild
+                or self._rebuilt_at is None
+                or time.monotonic() - self._rebuilt_at
+                > settings.TOKEN_REVOCATION_REBUILD_INTERVAL
+            )
+            now = timezone.now()
+            if rebuild:
+                self._rebuild(now)
+            else:
+                self._load_since(self._last_seen)
+
+            self._last_seen = now - timezone.timedelta(seconds=self.refresh_overlap)
+            self._refreshed_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def _rebuild(self, now):
+        revoked_tokens = RevokedToken.objects.filter(expires_at__gt=now)
+        jtis = BloomFilter(
+            max(settings.TOKEN_REVOCATION_CAPACITY, 2 * revoked_tokens.count()),
+            settings.TOKEN_REVOCATION_ERROR_RATE,
+        )
+        for jti in revoked_tokens.values_list('jti', flat=True).iterator():
+            jtis.add(jti)
+
+        # Tokens issued before older watermarks are already expired
+        watermarks = Watermarks(
+            (user_pk, not_before.timestamp())
+            for user_pk, not_before in TokenWatermark.objects.filter(
+                not_before__gt=now - api_settings.REFRESH_TOKEN_LIFETIME
+            )
+            .values_list('user_id', 'not_before')
+            .iterator()
+        )
+
+        self._jtis, self._watermarks = jtis, watermarks
+        self._rebuilt_at = time.monotonic()
+
+    def _load_since(self, since):
+        for jti in RevokedToken.objects.filter(created_at__gte=since).values_list(
+            'jti', flat=True
+        ):
+            self._jtis.add(jti)
+
+        for user_pk, not_before in TokenWatermark.objects.filter(
+            updated_at__gte=since
+        ).values_list('user_id', 'not_before'):
+            self._watermarks.set(user_pk, not_before.timestamp())
+
+    def is_revoked_by_watermark(self, token):
+        not_before = self._watermarks.get(token.get(api_settings.USER_ID_CLAIM))
+        return not_before is not None and token.get('iat', 0) < not_before
+
+    def might_be_revoked(self, token):
+        """Check revocation in memory only. True may be a false positive."""
+        return self.is_revoked_by_watermark(token) or (
+            token.get(api_settings.JTI_CLAIM) in self._jtis
+        )
+
+    def is_revoked(self, token):
+        """Check if token is revoked. Database is queried only on filter hits."""
+        if self.needs_refresh():
+            self.refresh()
+
+        if not self.might_be_revoked(token):
+            return False
+        if self.is_revoked_by_watermark(token):
+            return True
+        return RevokedToken.objects.filter(
+            jti=token.get(api_settings.JTI_CLAIM)
+        ).exists()
+
+    def add_token(self, jti):
+        if self._jtis is not None:
+            self._jtis.add(jti)
+
+    def add_watermark(self, user_pk, not_before):
+        if self._watermarks is not None:
+            self._watermarks.set(user_pk, not_before.timestamp())
+
+
+token_revocations = TokenRevocations()
+
+
+def revoke_token(token):
+    """Revoke a single validated access or refresh token."""
+    jti = token[api_settings.JTI_CLAIM]
+    expires_at = datetime_from_epoch(token['exp'])
+    RevokedToken.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at})
+    token_revocations.add_token(jti)
+
+
+def revoke_user_tokens(user):
+    """Revoke every token of user issued before now (e.g. on password change).
+
+    Token `iat` claims are in seconds, so tokens issued in the current second
+    are kept valid.
+    """
+    not_before = timezone.now().replace(microsecond=0)
+    TokenWatermark.objects.update_or_create(
+        user=user, defaults={'not_before': not_before}
+    )
+    token_revocations.add_watermark(user.pk, not_before)
+
+
+def prune_revocations():
+    """Delete revocations which cannot match any unexpired token."""
+    now = timezone.now()
+    RevokedToken.objects.filter(expires_at__lte=now).delete()
+    TokenWatermark.objects.filter(
+        not_before__lte=now - api_settings.REFRESH_TOKEN_LIFETIME
+    ).delete()
@@ -0,0 +1,129 @@
+"""
+Database router which sends reads of requests to read replicas
+(`DATABASE_REPLICAS`) and every write to the primary (`default`) database.
+
+Replicas lag behind the primary, so reads go to the primary:
+
+    - outside of requests (e.g. celery tasks and commands)
+    - in requests with unsafe methods, unless their view calls
+      `use_replicas()` because it only reads before writing (see
+      core.views.ReplicaReadsMixin)
+    - for the rest of a request after its first write
+    - inside transactions of the primary (e.g. select_for_update)
+    - in requests of users who were changed in the last
+      `DATABASE_PRIMARY_PIN_SECONDS`, so users read their own writes; changed
+      users are pinned in Django's cache, which is shared by processes
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_current_state = ContextVar('database_routing', default=None)
+
+
+class RoutingState:
+    """Routing of the current request"""
+
+    def __init__(self, use_primary):
+        self.use_primary = use_primary
+
+
+def make_pin_key(pk):
+    return f'core:database-pin:{pk}'
+
+
+def use_primary():
+    """Read from primary for the rest of current request."""
+    state = _current_state.get()
+    if state is not None:
+        state.use_primary = True
+
+
+def use_replicas():
+    """Read from replicas in current request although its method is unsafe.
+
+    Only for views which don't write before they are done reading.
+    """
+    state = _current_state.get()
+    if state is not None:
+        state.use_primary = False
+
+
+def pin_user(pk):
+    """Read from primary in requests of user pk for a while.
+
+    Called when user is changed.
+    """
+    use_primary()
+    if settings.DATABASE_REPLICAS:
+        cache.set(make_pin_key(pk), True, timeout=settings.DATABASE_PRIMARY_PIN_SECONDS)
+
+
+def is_user_pinned(pk):
+    return bool(settings.DATABASE_REPLICAS) and cache.get(make_pin_key(pk), False)
+
+
+def use_primary_for_user(pk):
+    """Read from primary in current request if user pk is pinned."""
+    state = _current_state.get()
+    if state is not None and not state.use_primary and is_user_pinned(pk):
+        state.use_primary = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current_state.get()
+        if (
+            state is None
+            or state.use_primary
+            or not settings.DATABASE_REPLICAS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        use_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas have the same rows as primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """Track routing state of each request (see ReplicaRouter)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_state.reset(token)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_state.reset(token)
+
+    def start(self, request):
+        return _current_state.set(
+            RoutingState(use_primary=request.method not in SAFE_METHODS)
+        )
@@ -0,0 +1,216 @@
+"""
+Generating synthetic users and email logs for scale testing (see seed_scale
+command).
+
+Users are generated in chunks and every chunk has its own random generator
+seeded by (seed, chunk index), so the same seed always generates the same
+data, whatever number of workers is used. Every user has the same password
+hash, which is computed once. Rows are written with COPY on PostgreSQL and
+with executemany() on other databases.
+"""
+import csv
+import io
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import User, EmailLog
+
+USER_COLUMNS = [
+    'id',
+    'username',
+    'email',
+    'password',
+    'is_superuser',
+    'is_staff',
+    'is_active',
+    'is_email_activated',
+    'date_joined',
+]
+EMAIL_LOG_COLUMNS = [
+    'user_id',
+    'email_type',
+    'timestamp',
+    'status',
+    'attempts',
+    'error',
+]
+
+
+@dataclass
+class SeedOptions:
+    """Distributions of generated data"""
+
+    seed: int = 0
+    users: int = 1000
+    username_prefix: str = 'seed'
+    password: str = 'Seed@4321'
+    # Share of users whose email is activated
+    activation_ratio: float = 0.7
+    # Mean number of emails per user (exponentially distributed)
+    emails_per_user: float = 2.0
+    max_emails_per_user: int = 50
+    # Share of emails which are password reset emails
+    password_reset_ratio: float = 0.3
+    # Users join uniformly in signup_days days before signup_end
+    signup_days: int = 730
+    signup_end: str = '2025-01-01T00:00:00+00:00'
+    chunk_size: int = 10000
+
+
+def copy_rows(table, columns, rows):
+    """Insert rows into table with COPY (PostgreSQL) or executemany()."""
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            data = io.StringIO()
+            # Strings are quoted, since an unquoted empty value is NULL
+            csv.writer(data, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+            data.seek(0)
+            cursor.copy_expert(
+                f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+                data,
+            )
+        else:
+            quote = connection.ops.quote_name
+            adapt = connection.ops.adapt_datetimefield_value
+            cursor.executemany(
+                f'INSERT INTO {quote(table)} ({", ".join(map(quote, columns))}) '
+                f'VALUES ({", ".join(["%s"] * len(columns))})',
+                [
+                    [
+                        adapt(value) if isinstance(value, timezone.datetime) else value
+                        for value in row
+                    ]
+                    for row in rows
+                ],
+            )
+
+
+def generate_chunk(options, password_hash, first_id, chunk_index):
+    """Generate user and email log rows of one chunk of users."""
+    rng = random.Random(f'{options.seed}:{chunk_index}')
+    signup_end = timezone.datetime.fromisoformat(options.signup_end)
+    signup_seconds = options.signup_days * 86400
+
+    start = chunk_index * options.chunk_size
+    end = min(start + options.chunk_size, options.users)
+    users = []
+    email_logs = []
+
+    for index in range(start, end):
+        user_id = first_id + index
+        date_joined = signup_end - timezone.timedelta(
+            seconds=rng.uniform(0, signup_seconds)
+        )
+        name = f'{options.username_prefix}{index}'
+        users.append(
+            [
+                user_id,
+                name,
+                f'{name}@example.com',
+                password_hash,
+                False,
+                False,
+                True,
+                rng.random() < options.activation_ratio,
+                date_joined,
+            ]
+        )
+
+        # Every user gets an activation email on signup
+        emails = 1 + min(
+            options.max_emails_per_user - 1,
+            int(rng.expovariate(1 / options.emails_per_user)),
+        )
+        for number in range(emails):
+            email_type = (
+                EmailLog.PASSWORD_RESET
+                if number and rng.random() < options.password_reset_ratio
+                else EmailLog.EMAIL_VERIFICATION
+            )
+            timestamp = date_joined + timezone.timedelta(
+                seconds=rng.uniform(0, (signup_end - date_joined).total_seconds())
+                if number
+                else 0
+            )
+            email_logs.append([user_id, email_type, timestamp, EmailLog.SENT, 1, ''])
+
+    return users, email_logs
+
+
+def seed_chunk(options, password_hash, first_id, chunk_index):
+    """Generate and insert one chunk in a transaction.
+
+    Returns:
+        tuple: number of inserted (users, email logs)
+    """
+    users, email_logs = generate_chunk(options, password_hash, first_id, chunk_index)
+    with transaction.atomic():
+        copy_rows(User._meta.db_table, USER_COLUMNS, users)
+        copy_rows(EmailLog._meta.db_table, EMAIL_LOG_COLUMNS, email_logs)
+    return len(users), len(email_logs)
+
+
+def reset_sequences():
+    """Move id sequences after the explicitly inserted ids."""
+    sql = connection.ops.sequence_reset_sql(no_style(), [User, EmailLog])
+    with connection.cursor() as cursor:
+        for statement in sql:
+            cursor.execute(statement)
+
+
+def seed(options, workers=1, progress=None):
+    """Insert options.users users and their email logs
+
+    Chunks are inserted in parallel by `workers` processes on PostgreSQL.
+    `progress` (if given) is called with (users, email logs) inserted so far.
+
+    Returns:
+        tuple: number of inserted (users, email logs)
+    """
+    # Salt is fixed, so the hash is the same for the same seed
+    password_hash = make_password(options.password, salt=f'seed{options.seed}')
+    last_id = User.objects.order_by('-id').values_list('id', flat=True).first()
+    first_id = (last_id or 0) + 1
+    chunks = range((options.users + options.chunk_size - 1) // options.chunk_size)
+
+    if connection.vendor != 'postgresql':
+        # Other databases (e.g. SQLite) don't handle concurrent writers well
+        workers = 1
+
+    total_users = total_email_logs = 0
+    if workers <= 1:
+        results = (
+            seed_chunk(options, password_hash, first_id, chunk) for chunk in chunks
+        )
+        for users, email_logs in results:
+            total_users += users
+            total_email_logs += email_logs
+            if progress is not None:
+                progress(total_users, total_email_logs)
+    else:
+        # Connections of this process cannot be shared with workers
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=django.setup) as executor:
+            futures = [
+                executor.submit(seed_chunk, options, password_hash, first_id, chunk)
+                for chunk in chunks
+            ]
+            for future in futures:
+                users, email_logs = future.result()
+                total_users += users
+                total_email_logs += email_logs
+                if progress is not None:
+                    progress(total_users, total_email_logs)
+
+    reset_sequences()
+    return total_users, total_email_logs
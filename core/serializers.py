@@ -1,9 +1,17 @@
 from django.core.exceptions import ValidationError
-from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.models import update_last_login
 from django.db import IntegrityError, transaction
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-from .models import User, EmailLog
+from . import metrics
+from .models import User, EmailLog, EmailLogRollup
+from .password_policy import password_policy
+from .revocation import token_revocations
+from .tokens import set_user_claims
 
 
 class UserCreateMixin:
@@ -32,7 +40,7 @@ class UserCreateSerializer(UserCreateMixin, serializers.ModelSerializer):
     # Since password field is not detected by default, some properties are changed
     password = serializers.CharField(
         style={'input_type': 'password'},
-        validators=[validate_password],
+        validators=[password_policy],
         write_only=True,
     )
 
@@ -44,7 +52,56 @@ class UserCreateSerializer(UserCreateMixin, serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class SparseFieldsetsMixin:
+    """
+    Serializer which accepts `fields` argument and only includes those fields.
+    It also serializes rows of `queryset.values()` without creating model
+    instances (see `to_representation_values`).
+    """
+
+    # Values of these fields are already JSON-ready, so they are not converted
+    values_passthrough_fields = (
+        serializers.BooleanField,
+        serializers.CharField,
+        serializers.IntegerField,
+    )
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def to_representation_values(self, rows):
+        """Serialize rows (dicts) of queryset.values() for read-only responses
+
+        Gives the same output as `to_representation` of model instances, but
+        skips DRF field machinery for every field which needs no conversion.
+        """
+        converters = [
+            (
+                name,
+                None
+                if isinstance(field, self.values_passthrough_fields)
+                else field.to_representation,
+            )
+            for name, field in self.fields.items()
+            if not field.write_only
+        ]
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, convert in converters:
+                value = row[name]
+                item[name] = (
+                    value if convert is None or value is None else convert(value)
+                )
+            data.append(item)
+        return data
+
+
+class UserDetailSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
@@ -77,6 +134,9 @@ class UserDetailSerializer(serializers.ModelSerializer):
                 .all()
                 .delete()
             )
+            EmailLogRollup.objects.filter(
+                user=instance, email_type=EmailLog.EMAIL_VERIFICATION
+            ).delete()
 
         for key, value in validated_data.items():
             setattr(instance, key, value)
@@ -86,6 +146,19 @@ class UserDetailSerializer(serializers.ModelSerializer):
         return instance
 
 
+class UserExportSerializer(serializers.Serializer):
+    """Query parameters of user export"""
+
+    # `format` query parameter is used by DRF for content negotiation
+    export_format = serializers.ChoiceField(
+        choices=['ndjson', 'csv'], default='ndjson'
+    )
+    is_email_activated = serializers.BooleanField(required=False)
+    date_joined_after = serializers.DateTimeField(required=False)
+    date_joined_before = serializers.DateTimeField(required=False)
+    email_stats = serializers.BooleanField(required=False, default=False)
+
+
 class CurrentPasswordSerializer(serializers.Serializer):
     current_password = serializers.CharField(style={'input_type': 'password'})
 
@@ -108,7 +181,7 @@ class PasswordSerializer(serializers.Serializer):
         assert user is not None
 
         try:
-            validate_password(attrs['new_password'], user)
+            password_policy.validate(attrs['new_password'], user)
         except ValidationError as e:
             raise serializers.ValidationError({'new_password': list(e.messages)})
         return super().validate(attrs)
@@ -137,6 +210,80 @@ class EmailSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
 
 
+class UserAvailabilitySerializer(serializers.Serializer):
+    username = serializers.CharField(required=False, max_length=150)
+    email = serializers.EmailField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError(
+                'At least one of username and email is required.'
+            )
+        return attrs
+
+
 class ResetPasswordConfirmSerializer(PasswordRetypeSerializer):
     uid = serializers.CharField(required=True, max_length=255)
     token = serializers.CharField(required=True, max_length=255)
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """Obtain JWT tokens which contain user claims (see USER_TOKEN_CLAIMS)."""
+
+    @classmethod
+    def get_token(cls, user):
+        return set_user_claims(super().get_token(user), user)
+
+    def validate(self, attrs):
+        # Same as TokenObtainPairSerializer.validate, with tokens timed apart
+        # from authentication
+        data = jwt_serializers.TokenObtainSerializer.validate(self, attrs)
+
+        with metrics.token_duration.time(token='jwt', operation='generate'):
+            refresh = self.get_token(self.user)
+            data['refresh'] = str(refresh)
+            data['access'] = str(refresh.access_token)
+
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+        return data
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Refresh access token and reload its user claims from database, so claims
+    are at most one access token lifetime old. Revoked tokens are rejected.
+    """
+
+    def validate(self, attrs):
+        with metrics.token_duration.time(token='jwt', operation='refresh'):
+            return self._validate(attrs)
+
+    def _validate(self, attrs):
+        if token_revocations.is_revoked(self.token_class(attrs['refresh'])):
+            raise InvalidToken('Token is revoked')
+
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+
+        user = User.objects.filter(
+            **{jwt_settings.USER_ID_FIELD: access[jwt_settings.USER_ID_CLAIM]}
+        ).first()
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                'No active account found with the given credentials',
+                'no_active_account',
+            )
+
+        data['access'] = str(set_user_claims(access, user))
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError as e:
+            raise serializers.ValidationError(e.args[0])
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import metrics, routers
+from .availability import taken_identifiers
+from .cache import user_cache
+from .instrumentation import request_timed
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Remove changed user from caches of every process."""
+    user_cache.invalidate_changed(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=User)
+def pin_changed_user(sender, instance, update_fields=None, **kwargs):
+    """Read changed user from primary database in their next requests."""
+    # Logins only update last_login, which users don't read back
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        routers.pin_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def add_taken_identifiers(sender, instance, **kwargs):
+    taken_identifiers.add_user(instance)
+
+
+@receiver(request_timed)
+def record_view_duration(sender, request, response, timings, **kwargs):
+    metrics.view_duration.observe(
+        timings.total,
+        # Unresolved URLs share one label, so labels stay bounded
+        view=timings.view or 'none',
+        method=request.method,
+        status=response.status_code,
+    )
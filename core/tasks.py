@@ -1 +1,206 @@
+from smtplib import SMTPException
+
 from celery import shared_task
+from celery.utils.log import get_task_logger
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+
+from .emails import ActivationEmail, PasswordResetEmail
+from .models import EmailLog
+from .ratelimit import (
+    activation_email_rate_limiter,
+    password_reset_email_rate_limiter,
+)
+from .retention import rollup_email_logs as _rollup_email_logs
+from .revocation import prune_revocations
+from .tokens import delete_expired_password_reset_tokens, one_time_token_generator
+
+logger = get_task_logger(__name__)
+
+# Errors that are worth retrying. Anything else is a bug and fails right away.
+RETRYABLE_ERRORS = (SMTPException, OSError)
+
+
+def _send_logged_email(task, email_log_pk, email_class, context):
+    """Send an email for the given log entry and record the result on it.
+
+    Transient SMTP errors are retried with exponential backoff until
+    `task.max_retries` is reached; after that the log is marked as failed.
+    """
+    try:
+        email_log = EmailLog.objects.select_related('user').get(pk=email_log_pk)
+    except EmailLog.DoesNotExist:
+        # Log (and therefore user) is deleted before the task is run
+        logger.warning('Email log %s does not exist.', email_log_pk)
+        return EmailLog.FAILED
+
+    user = email_log.user
+    # update() is used instead of save() since `timestamp` is auto_now and is
+    # used for rate limiting; it must keep the time the email was requested.
+    queryset = EmailLog.objects.filter(pk=email_log_pk)
+    attempts = task.request.retries + 1
+
+    try:
+        email_class(context={**context, 'user': user}).send(to=[user.email])
+    except RETRYABLE_ERRORS as exc:
+        if task.request.retries >= task.max_retries:
+            queryset.update(
+                status=EmailLog.FAILED, attempts=attempts, error=repr(exc)
+            )
+            logger.error('Sending email log %s failed: %r', email_log_pk, exc)
+            return EmailLog.FAILED
+
+        queryset.update(attempts=attempts, error=repr(exc))
+        countdown = get_exponential_backoff_interval(
+            factor=settings.EMAIL_TASK_RETRY_BACKOFF,
+            retries=task.request.retries,
+            maximum=settings.EMAIL_TASK_RETRY_BACKOFF_MAX,
+            full_jitter=True,
+        )
+        raise task.retry(exc=exc, countdown=countdown)
+
+    queryset.update(status=EmailLog.SENT, attempts=attempts, error='')
+    return EmailLog.SENT
+
+
+@shared_task(bind=True, max_retries=settings.EMAIL_TASK_MAX_RETRIES)
+def send_activation_email(self, email_log_pk):
+    return _send_logged_email(self, email_log_pk, ActivationEmail, {})
+
+
+@shared_task(bind=True, max_retries=settings.EMAIL_TASK_MAX_RETRIES)
+def send_password_reset_email(self, email_log_pk, token):
+    return _send_logged_email(
+        self, email_log_pk, PasswordResetEmail, {'token': token}
+    )
+
+
+@shared_task
+def send_activation_emails(email_log_pks):
+    """Send activation emails of many logs (e.g. bulk created users) at once.
+
+    Messages are sent over one connection. Each failed message is handed to
+    send_activation_email, which retries it on its own.
+    """
+    email_logs = list(
+        EmailLog.objects.select_related('user').filter(pk__in=email_log_pks)
+    )
+    messages = ActivationEmail.render_batch(
+        [email_log.user for email_log in email_logs]
+    )
+    connection = get_connection()
+    sent_pks = []
+
+    with connection:
+        for email_log, message in zip(email_logs, messages):
+            try:
+                connection.send_messages([message])
+            except RETRYABLE_ERRORS as exc:
+                logger.warning('Sending email log %s failed: %r', email_log.pk, exc)
+                send_activation_email.delay(email_log.pk)
+            else:
+                sent_pks.append(email_log.pk)
+
+    EmailLog.objects.filter(pk__in=sent_pks).update(
+        status=EmailLog.SENT, attempts=1, error=''
+    )
+    return len(sent_pks)
+
+
+@shared_task
+def rollup_email_logs():
+    """Periodic task which rolls up and deletes old email logs."""
+    return _rollup_email_logs()
+
+
+@shared_task
+def prune_token_revocations():
+    """Periodic task which deletes revocations of expired tokens."""
+    prune_revocations()
+
+
+@shared_task
+def prune_password_reset_tokens():
+    """Periodic task which deletes expired password reset tokens."""
+    delete_expired_password_reset_tokens()
+
+
+def queue_activation_email(user, email_log=None):
+    """Send an activation email to user once transaction commits.
+
+    A pending email log is created unless one is given (e.g. a slot reserved
+    by rate limiter).
+
+    Returns:
+        core.models.EmailLog: the pending email log
+    """
+    if email_log is None:
+        email_log = EmailLog.objects.create(
+            user=user, email_type=EmailLog.EMAIL_VERIFICATION
+        )
+    transaction.on_commit(lambda: send_activation_email.delay(email_log.pk))
+    return email_log
+
+
+def queue_activation_emails(users):
+    """Send activation emails to many users with one task once transaction
+    commits.
+
+    Returns:
+        list: the pending email logs
+    """
+    email_logs = EmailLog.objects.bulk_create(
+        EmailLog(user=user, email_type=EmailLog.EMAIL_VERIFICATION)
+        for user in users
+    )
+    email_log_pks = [email_log.pk for email_log in email_logs]
+    if email_log_pks:
+        transaction.on_commit(lambda: send_activation_emails.delay(email_log_pks))
+    return email_logs
+
+
+def queue_password_reset_email(user, token, email_log=None):
+    """Send a password reset email to user once transaction commits.
+
+    A pending email log is created unless one is given (e.g. a slot reserved
+    by rate limiter).
+
+    Returns:
+        core.models.EmailLog: the pending email log
+    """
+    if email_log is None:
+        email_log = EmailLog.objects.create(
+            user=user, email_type=EmailLog.PASSWORD_RESET
+        )
+    transaction.on_commit(
+        lambda: send_password_reset_email.delay(email_log.pk, token)
+    )
+    return email_log
+
+
+def request_activation_email(user):
+    """Reserve a rate limit slot and queue an activation email for user.
+
+    Raises:
+        core.ratelimit.EmailRateLimitExceeded: if user cannot get another email
+    """
+    email_log = activation_email_rate_limiter.reserve(user)
+    return queue_activation_email(user, email_log)
+
+
+@transaction.atomic
+def request_password_reset_email(user):
+    """Reserve a rate limit slot, make a reset token and queue the email.
+
+    Raises:
+        core.ratelimit.EmailRateLimitExceeded: if user cannot get another email
+    """
+    email_log = password_reset_email_rate_limiter.reserve(user)
+
+    # Here, everything is fine to generate a token and queue the email. The
+    # email is sent after commit.
+    token = one_time_token_generator.make_token(user)
+
+    return queue_password_reset_email(user, token, email_log)
@@ -0,0 +1,34 @@
+"""Test helpers"""
+from contextlib import contextmanager
+
+from .instrumentation import request_timed
+
+
+@contextmanager
+def query_budget(view, max_queries):
+    """Fail if a request to `view` in the block makes more than max_queries
+    queries, or if no request to `view` is made.
+
+    Args:
+        view (str): view name, e.g. 'ResetPasswordView' or 'UserViewSet.list'
+        max_queries (int): budget of queries per request
+
+    Yields:
+        list: number of queries of each request to view
+    """
+    counts = []
+
+    def record(sender, timings, **kwargs):
+        if timings.view == view:
+            counts.append(timings.queries)
+
+    request_timed.connect(record)
+    try:
+        yield counts
+    finally:
+        request_timed.disconnect(record)
+
+    assert counts, f'No request was made to {view}.'
+    assert max(counts) <= max_queries, (
+        f'{view} made {max(counts)} queries, its budget is {max_queries}.'
+    )
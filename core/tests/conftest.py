@@ -2,12 +2,43 @@ from django.contrib.auth import get_user_model as User
 from rest_framework.test import APIClient
 import pytest
 
+from core.availability import taken_identifiers
+from core.models import User as UserModel
+from core.revocation import token_revocations
+from project.celery import celery
+
+
+@pytest.fixture(autouse=True)
+def clear_token_revocations():
+    """Revocations loaded in memory must not leak between tests."""
+    token_revocations.clear()
+    yield
+    token_revocations.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_taken_identifiers():
+    """Taken identifiers loaded in memory must not leak between tests."""
+    taken_identifiers.clear()
+    yield
+    taken_identifiers.clear()
+
 
 @pytest.fixture
 def api_client():
     return APIClient()
 
 
+@pytest.fixture
+def admin_client(api_client):
+    """API client authenticated as a staff user named admin"""
+    admin = UserModel.objects.create_user(
+        'admin', 'admin@gmail.com', 'Test@4321', is_staff=True
+    )
+    api_client.force_authenticate(user=admin)
+    return api_client
+
+
 @pytest.fixture
 def authenticate(api_client):
     def do_authenticate(is_staff=False, is_active=True, is_email_activated=False):
@@ -20,3 +51,16 @@ def authenticate(api_client):
         )
 
     return do_authenticate
+
+
+@pytest.fixture
+def eager_celery():
+    """Run celery tasks in-process, same as CELERY_TASK_ALWAYS_EAGER=True"""
+    conf = celery.conf
+    old_values = {
+        'CELERY_TASK_ALWAYS_EAGER': conf.CELERY_TASK_ALWAYS_EAGER,
+        'CELERY_TASK_EAGER_PROPAGATES': conf.CELERY_TASK_EAGER_PROPAGATES,
+    }
+    conf.update(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+    yield
+    conf.update(old_values)
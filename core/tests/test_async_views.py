@@ -0,0 +1,75 @@
+from django.test import Client
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+import pytest
+
+from core.models import User, EmailLog
+from core.tokens import email_verification_token_generator
+from core import utils
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+@pytest.fixture
+def client(user):
+    return Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    def test_set_password_changes_password(self, client, user):
+        response = client.post(
+            '/api/v1/async/users/set-password/',
+            {
+                'current_password': 'Test@4321',
+                'new_password': 'New@Pass4321',
+                're_new_password': 'New@Pass4321',
+            },
+            content_type='application/json',
+        )
+
+        user.refresh_from_db()
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert user.check_password('New@Pass4321')
+
+    def test_set_password_with_wrong_password_returns_400(self, client):
+        response = client.post(
+            '/api/v1/async/users/set-password/',
+            {
+                'current_password': 'wrong',
+                'new_password': 'New@Pass4321',
+                're_new_password': 'New@Pass4321',
+            },
+            content_type='application/json',
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'current_password' in response.json()
+
+    def test_set_password_without_token_returns_401(self, user):
+        response = Client().post('/api/v1/async/users/set-password/', {})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_activate_activates_email(self, user):
+        uid = utils.encode_uid(user.pk)
+        token = email_verification_token_generator.make_token(user)
+
+        response = Client().get(f'/api/v1/async/users/activate/{uid}/{token}')
+
+        user.refresh_from_db()
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert user.is_email_activated
+
+    def test_reset_password_is_rate_limited(self, user):
+        url = '/api/v1/async/users/reset-password/'
+
+        first = Client().post(url, {'email': user.email})
+        second = Client().post(url, {'email': user.email})
+
+        assert first.status_code == status.HTTP_204_NO_CONTENT
+        assert second.status_code == status.HTTP_400_BAD_REQUEST
+        assert EmailLog.objects.filter(user=user).count() == 1
@@ -0,0 +1,93 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+import pytest
+
+from core.authentication import ClaimsUser, StatelessJWTAuthentication
+from core.models import User
+from core.revocation import token_revocations
+from core.views import UserViewSet, UserSetPasswordView
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+@pytest.fixture
+def tokens(api_client, user):
+    response = api_client.post(
+        '/api/v1/token/', {'username': 'ali', 'password': 'Test@4321'}
+    )
+    return response.data
+
+
+@pytest.fixture
+def stateless(monkeypatch):
+    for view in [UserViewSet, UserSetPasswordView]:
+        monkeypatch.setattr(
+            view, 'authentication_classes', [StatelessJWTAuthentication]
+        )
+
+
+@pytest.mark.django_db
+class TestStatelessJWTAuthentication:
+    def test_retrieve_does_not_load_request_user(
+        self, api_client, user, tokens, stateless
+    ):
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        token_revocations.refresh()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get('/api/v1/users/ali/')
+
+        # Only the retrieved user is queried
+        assert response.status_code == status.HTTP_200_OK
+        assert len(queries) == 1
+
+    def test_set_password_loads_user(self, api_client, user, tokens, stateless):
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+
+        response = api_client.post(
+            '/api/v1/users/set-password/',
+            {
+                'current_password': 'Test@4321',
+                'new_password': 'New@Pass4321',
+                're_new_password': 'New@Pass4321',
+            },
+        )
+
+        user.refresh_from_db()
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert user.check_password('New@Pass4321')
+
+    def test_refresh_reloads_claims(self, api_client, user, tokens):
+        User.objects.filter(pk=user.pk).update(is_email_activated=True)
+
+        response = api_client.post(
+            '/api/v1/token/refresh/', {'refresh': tokens['refresh']}
+        )
+
+        authentication = StatelessJWTAuthentication()
+        token = authentication.get_validated_token(response.data['access'])
+        token_user = authentication.get_token_user(token)
+        assert isinstance(token_user, ClaimsUser)
+        assert token_user.username == 'ali'
+        assert token_user.is_email_activated is True
+
+    def test_stale_username_claim_does_not_give_access_to_new_owner(
+        self, api_client, user, tokens, stateless
+    ):
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        response = api_client.patch('/api/v1/users/ali/', {'username': 'ali2'})
+        assert response.status_code == status.HTTP_200_OK
+        other = User.objects.create_user('ali', 'other@gmail.com', 'Test@4321')
+
+        # The token still has the username claim 'ali'
+        response = api_client.patch(
+            '/api/v1/users/ali/', {'email': 'attacker@gmail.com'}
+        )
+        other.refresh_from_db()
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert other.email == 'other@gmail.com'
+        assert api_client.get('/api/v1/users/ali2/').status_code == status.HTTP_200_OK
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.throttling import ScopedRateThrottle
+import pytest
+
+from core.availability import taken_identifiers
+from core.bulk import create_users
+from core.models import User
+
+URL = '/api/v1/users/availability/'
+
+
+@pytest.fixture(autouse=True)
+def clear_throttle_history():
+    cache.clear()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+@pytest.mark.django_db
+class TestUserAvailability:
+    def test_taken_and_free_identifiers(self, api_client, user):
+        response = api_client.get(URL, {'username': 'ALI', 'email': 'reza@gmail.com'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'username': False, 'email': True}
+
+    def test_free_identifier_needs_no_query(
+        self, api_client, user, django_assert_num_queries
+    ):
+        taken_identifiers.refresh()
+
+        with django_assert_num_queries(0):
+            response = api_client.get(URL, {'username': 'reza'})
+
+        assert response.data == {'username': True}
+
+    def test_saved_user_is_taken_right_away(self, api_client, user):
+        taken_identifiers.refresh()
+
+        User.objects.create_user('reza', 'reza@gmail.com', 'Test@4321')
+        response = api_client.get(URL, {'username': 'reza', 'email': 'REZA@gmail.com'})
+
+        assert response.data == {'username': False, 'email': False}
+
+    def test_bulk_created_user_is_taken_right_away(self, api_client, user):
+        taken_identifiers.refresh()
+
+        create_users(
+            [{'username': 'reza', 'email': 'reza@gmail.com', 'password': 'Test@4321'}]
+        )
+        response = api_client.get(URL, {'username': 'reza'})
+
+        assert response.data == {'username': False}
+
+    def test_deleted_user_is_free(self, api_client, user):
+        taken_identifiers.refresh()
+
+        user.delete()
+        response = api_client.get(URL, {'username': 'ali'})
+
+        assert response.data == {'username': True}
+
+    def test_rows_inserted_without_signals_are_loaded_on_refresh(
+        self, api_client, user, settings
+    ):
+        taken_identifiers.refresh()
+        settings.USER_AVAILABILITY_REFRESH_INTERVAL = 0
+
+        User.objects.bulk_create(
+            [User(username='reza', email='reza@gmail.com', password='-')]
+        )
+        response = api_client.get(URL, {'username': 'reza'})
+
+        assert response.data == {'username': False}
+
+    def test_identifier_is_required(self, api_client):
+        response = api_client.get(URL)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_requests_are_throttled(self, api_client, user, monkeypatch):
+        monkeypatch.setattr(
+            ScopedRateThrottle, 'THROTTLE_RATES', {'user_availability': '2/minute'}
+        )
+
+        codes = [
+            api_client.get(URL, {'username': 'ali'}).status_code for _ in range(3)
+        ]
+
+        assert codes == [200, 200, status.HTTP_429_TOO_MANY_REQUESTS]
@@ -0,0 +1,33 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import pytest
+
+from core.backends import AuthenticationBackend
+from core.models import User
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+@pytest.mark.django_db
+class TestAuthenticationBackend:
+    @pytest.mark.parametrize(
+        'identifier', ['ali', 'ALI', 'ali@gmail.com', 'Ali@Gmail.com']
+    )
+    def test_login_with_username_or_email_is_case_insensitive(self, user, identifier):
+        backend = AuthenticationBackend()
+
+        assert backend.authenticate(None, identifier, 'Test@4321') == user
+
+    def test_lookup_uses_single_column(self, user):
+        with CaptureQueriesContext(connection) as queries:
+            AuthenticationBackend().get_user_by_identifier('ali@gmail.com')
+
+        sql = queries[0]['sql']
+        assert 'UPPER("core_user"."email")' in sql
+        assert '"core_user"."username" =' not in sql
+
+    def test_wrong_password_returns_none(self, user):
+        assert AuthenticationBackend().authenticate(None, 'ali', 'wrong') is None
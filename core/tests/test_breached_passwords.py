@@ -0,0 +1,135 @@
+import hashlib
+
+from django.core.management import CommandError, call_command
+import pytest
+
+from core.breached_passwords import BreachedPasswords, build, hash_password
+from core.password_policy import password_policy
+from core.validators import BreachedPasswordValidator
+
+
+def sha1(password):
+    return hashlib.sha1(password.encode()).hexdigest()
+
+
+@pytest.fixture
+def breached_file(tmp_path):
+    """Build a breached passwords file of given passwords"""
+
+    def do_build(passwords, **options):
+        dump = tmp_path / 'dump.txt'
+        dump.write_text(
+            ''.join(f'{sha1(password).upper()}:{i}\n' for i, password in enumerate(passwords))
+        )
+        path = str(tmp_path / 'breached.bin')
+        call_command('build_breached_passwords', str(dump), output=path, **options)
+        return path
+
+    return do_build
+
+
+class TestBreachedPasswords:
+    def test_build_sorts_and_removes_duplicates(self, tmp_path):
+        passwords = ['Test@4321', 'hunter2', 'correct horse', 'hunter2', 'letmein']
+        path = str(tmp_path / 'breached.bin')
+
+        count = build(
+            [hash_password(password) for password in passwords], path, chunk_size=2
+        )
+
+        with open(path, 'rb') as file:
+            content = file.read()
+        records = [content[i:i + 20] for i in range(0, len(content), 20)]
+        assert count == 4
+        assert records == sorted({hash_password(password) for password in passwords})
+
+    def test_lookup(self, breached_file):
+        passwords = BreachedPasswords(breached_file(['hunter2', 'letmein', 'qwerty']))
+
+        assert len(passwords) == 3
+        assert 'hunter2' in passwords
+        assert 'qwerty' in passwords
+        assert 'Hunter2' not in passwords
+        assert '' not in passwords
+
+    def test_empty_file(self, breached_file):
+        assert 'hunter2' not in BreachedPasswords(breached_file([]))
+
+    def test_command_rejects_malformed_lines(self, tmp_path):
+        dump = tmp_path / 'dump.txt'
+        dump.write_text(f'{sha1("hunter2")}\nnot a hash\n')
+        path = tmp_path / 'breached.bin'
+
+        with pytest.raises(CommandError, match='Line 2'):
+            call_command('build_breached_passwords', str(dump), output=str(path))
+        assert not path.exists()
+
+
+@pytest.mark.django_db
+class TestBreachedPasswordValidator:
+    def test_breached_password_is_rejected_at_signup(
+        self, api_client, breached_file, settings
+    ):
+        settings.AUTH_PASSWORD_VALIDATORS = [
+            {
+                'NAME': 'core.validators.BreachedPasswordValidator',
+                'OPTIONS': {'path': breached_file(['Breached@4321'])},
+            }
+        ]
+
+        response = api_client.post(
+            '/api/v1/users/',
+            {'username': 'ali', 'email': 'ali@gmail.com', 'password': 'Breached@4321'},
+        )
+
+        assert response.status_code == 400
+        assert response.data['password'] == [
+            'This password has appeared in a data breach.'
+        ]
+
+    def test_other_password_is_accepted(self, api_client, breached_file, settings):
+        settings.AUTH_PASSWORD_VALIDATORS = [
+            {
+                'NAME': 'core.validators.BreachedPasswordValidator',
+                'OPTIONS': {'path': breached_file(['Breached@4321'])},
+            }
+        ]
+
+        response = api_client.post(
+            '/api/v1/users/',
+            {'username': 'ali', 'email': 'ali@gmail.com', 'password': 'Test@4321'},
+        )
+
+        assert response.status_code == 201
+
+    def test_missing_file_is_not_opened_until_validation(self, tmp_path, caplog):
+        validator = BreachedPasswordValidator(str(tmp_path / 'missing.bin'))
+
+        assert not caplog.records
+        validator.validate('Breached@4321')
+        assert 'does not exist' in caplog.text
+
+    def test_malformed_file_is_not_checked(self, tmp_path, caplog):
+        path = tmp_path / 'breached.bin'
+        path.write_bytes(b'truncated')
+        validator = BreachedPasswordValidator(str(path))
+
+        validator.validate('Breached@4321')
+        assert 'is not a breached passwords file' in caplog.text
+
+    def test_command_runs_when_configured_file_is_missing(
+        self, tmp_path, settings
+    ):
+        path = tmp_path / 'breached.bin'
+        settings.BREACHED_PASSWORDS_FILE = str(path)
+        settings.AUTH_PASSWORD_VALIDATORS = [
+            {'NAME': 'core.validators.BreachedPasswordValidator'}
+        ]
+        dump = tmp_path / 'dump.txt'
+        dump.write_text(f'{sha1("Breached@4321")}\n')
+
+        # Like CoreConfig.ready() at startup of the command
+        password_policy.load()
+        call_command('build_breached_passwords', str(dump))
+
+        assert 'Breached@4321' in BreachedPasswords(str(path))
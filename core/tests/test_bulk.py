@@ -0,0 +1,98 @@
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+import pytest
+
+from core.bulk import hash_passwords
+from core.models import EmailLog, User
+
+URL = '/api/v1/users/bulk-create/'
+
+
+def make_items(count, start=0):
+    return [
+        {
+            'username': f'user{i}',
+            'email': f'user{i}@gmail.com',
+            'password': 'Test@4321',
+        }
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBulkUserCreate:
+    def test_users_are_created(self, admin_client, eager_celery):
+        response = admin_client.post(URL, make_items(3), format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [result['user']['username'] for result in response.data] == [
+            'user0',
+            'user1',
+            'user2',
+        ]
+        assert User.objects.get(username='user1').check_password('Test@4321')
+        assert len(mail.outbox) == 3
+        assert set(EmailLog.objects.values_list('status', flat=True)) == {
+            EmailLog.SENT
+        }
+
+    def test_invalid_and_taken_items_are_rejected(self, admin_client, eager_celery):
+        items = make_items(2) + [
+            # Taken by admin, repeated in batch and invalid
+            {'username': 'admin', 'email': 'new@gmail.com', 'password': 'Test@4321'},
+            {'username': 'other', 'email': 'user0@gmail.com', 'password': 'Test@4321'},
+            {'username': '%$', 'email': 'bad.com', 'password': '321'},
+            # Taken in another case
+            {'username': 'Admin', 'email': 'new2@gmail.com', 'password': 'Test@4321'},
+            {'username': 'other2', 'email': 'USER1@gmail.com', 'password': 'Test@4321'},
+        ]
+
+        response = admin_client.post(URL, items, format='json')
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert [result['status'] for result in response.data] == [
+            'created',
+            'created',
+            'invalid',
+            'invalid',
+            'invalid',
+            'invalid',
+            'invalid',
+        ]
+        assert 'username' in response.data[2]['errors']
+        assert 'email' in response.data[3]['errors']
+        assert 'username' in response.data[5]['errors']
+        assert 'email' in response.data[6]['errors']
+        assert User.objects.count() == 3
+
+    def test_uniqueness_is_checked_with_one_query_per_field(
+        self, admin_client, eager_celery
+    ):
+        with CaptureQueriesContext(connection) as queries:
+            admin_client.post(URL, make_items(20), format='json')
+
+        sqls = [q['sql'] for q in queries]
+        insert_index = next(
+            i for i, sql in enumerate(sqls) if sql.startswith('INSERT INTO "core_user"')
+        )
+        # Every query before the insert is a lookup of a unique field
+        assert len([sql for sql in sqls[:insert_index] if 'SELECT' in sql]) == 2
+
+    def test_non_staff_users_are_forbidden(self, api_client):
+        user = User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+        api_client.force_authenticate(user=user)
+
+        response = api_client.post(URL, make_items(1), format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_hash_passwords_in_process_pool(settings):
+    settings.PASSWORD_HASHING_PROCESSES = 2
+
+    hashed_passwords = hash_passwords(['Test@4321'] * 4)
+
+    assert len(set(hashed_passwords)) == 4
+    assert all(password.startswith('pbkdf2_sha256$') for password in hashed_passwords)
@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import pytest
+
+from core.cache import LocalLRUCache, UserCache
+from core.models import User
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+@pytest.fixture
+def user_cache():
+    return UserCache()
+
+
+class TestLocalLRUCache:
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LocalLRUCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+
+        cache.set('c', 3)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+
+    def test_expired_entry_is_not_returned(self):
+        cache = LocalLRUCache(max_size=2, ttl=-1)
+        cache.set('a', 1)
+
+        assert cache.get('a') is None
+
+
+@pytest.mark.django_db
+class TestUserCache:
+    def test_second_get_is_served_from_local_cache(self, user, user_cache):
+        user_cache.get(user.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            cached_user = user_cache.get(user.pk)
+
+        assert cached_user == user
+        assert len(queries) == 0
+        assert user_cache.stats()['local_hits'] == 1
+        assert user_cache.stats()['misses'] == 1
+
+    def test_saving_user_invalidates_cache(self, user):
+        from core.cache import user_cache
+
+        user_cache.get(user.pk)
+        user.is_email_activated = True
+        user.save()
+
+        assert user_cache.get(user.pk).is_email_activated is True
+
+    def test_returned_user_is_a_copy(self, user, user_cache):
+        user_cache.get(user.pk).username = 'changed'
+
+        assert user_cache.get(user.pk).username == 'ali'
+
+    def test_password_is_not_cached(self, user, user_cache):
+        user_cache.get(user.pk)
+
+        assert user.password not in cache.get(user_cache.make_key(user.pk))
+        with CaptureQueriesContext(connection) as queries:
+            cached_user = user_cache.get(user.pk)
+            assert cached_user.check_password('Test@4321')
+        # Password is loaded when it is used
+        assert len(queries) == 1
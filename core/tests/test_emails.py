@@ -0,0 +1,66 @@
+from django.core import mail
+import pytest
+
+from core.emails import ActivationEmail, PasswordResetEmail
+from core.models import User, EmailLog
+from core.tasks import send_activation_emails
+from core.utils import encode_uid
+
+
+@pytest.fixture
+def users():
+    return [
+        User.objects.create_user(f'user{i}', f'user{i}@gmail.com', 'Test@4321')
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+class TestUserEmailMessage:
+    def test_user_instance_needs_no_query(self, users, django_assert_num_queries):
+        message = ActivationEmail(context={'user': users[0]})
+
+        with django_assert_num_queries(0):
+            message.render()
+
+        assert message.subject == 'Activate your account'
+        assert 'Hi, user0!' in message.body
+        assert f'/activate/{encode_uid(users[0].pk)}/' in message.body
+
+    def test_pre_resolved_context_needs_no_user(self):
+        message = PasswordResetEmail(
+            context={'username': 'ali', 'uid': 'MQ', 'token': 'some-token'}
+        )
+
+        message.render()
+
+        assert 'Hi, ali!' in message.body
+        assert 'UID: MQ' in message.body
+        assert 'Token: some-token' in message.body
+
+    def test_render_batch_makes_one_query(self, users, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            messages = PasswordResetEmail.render_batch(
+                User.objects.order_by('pk'), token='some-token'
+            )
+
+        assert [message.to for message in messages] == [
+            [user.email] for user in users
+        ]
+        assert all('Token: some-token' in message.body for message in messages)
+
+    def test_send_activation_emails_fetches_users_once(
+        self, users, django_assert_num_queries
+    ):
+        email_logs = EmailLog.objects.bulk_create(
+            EmailLog(user=user, email_type=EmailLog.EMAIL_VERIFICATION)
+            for user in users
+        )
+
+        # Logs with their users and the status update
+        with django_assert_num_queries(2):
+            send_activation_emails([email_log.pk for email_log in email_logs])
+
+        assert sorted(message.to[0] for message in mail.outbox) == sorted(
+            user.email for user in users
+        )
@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from rest_framework import status
+import pytest
+
+from core import routers
+from core.instrumentation import request_timed
+from core.models import EmailLog, EmailLogRollup, User
+
+
+@pytest.fixture
+def users():
+    ali = User.objects.create_user(
+        'ali', 'ali@gmail.com', 'Test@4321', is_email_activated=True
+    )
+    reza = User.objects.create_user(
+        'reza',
+        'reza@gmail.com',
+        'Test@4321',
+        date_joined=timezone.now() - timezone.timedelta(days=10),
+    )
+    EmailLog.objects.create(user=ali, email_type=EmailLog.EMAIL_VERIFICATION)
+    EmailLogRollup.objects.create(
+        user=ali, email_type=EmailLog.EMAIL_VERIFICATION, count=2
+    )
+    return ali, reza
+
+
+def read_ndjson(response):
+    content = b''.join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+class TestUserExport:
+    def test_export_ndjson_with_email_stats(self, admin_client, users):
+        response = admin_client.get('/api/v1/users/export/', {'email_stats': 'true'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        rows = {row['username']: row for row in read_ndjson(response)}
+        assert rows['ali']['activation_emails'] == 3
+        assert rows['reza']['activation_emails'] == 0
+        assert 'password' not in rows['ali']
+
+    def test_export_filters(self, admin_client, users):
+        response = admin_client.get(
+            '/api/v1/users/export/',
+            {
+                'is_email_activated': 'false',
+                'date_joined_before': timezone.now() - timezone.timedelta(days=1),
+            },
+        )
+
+        assert [row['username'] for row in read_ndjson(response)] == ['reza']
+
+    def test_export_csv(self, admin_client, users):
+        response = admin_client.get('/api/v1/users/export/', {'export_format': 'csv'})
+
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        assert response['Content-Type'] == 'text/csv'
+        assert [row['username'] for row in rows] == ['admin', 'ali', 'reza']
+
+    def test_streamed_queries_are_recorded_and_routed(
+        self, admin_client, users, settings
+    ):
+        settings.DATABASE_REPLICAS = ['replica']
+        recorded = []
+        states = []
+
+        def record(sender, timings, **kwargs):
+            recorded.append(timings)
+
+        def db_for_read(model, **hints):
+            states.append(routers._current_state.get())
+            return 'default'
+
+        request_timed.connect(record)
+        try:
+            with mock.patch.object(
+                routers.ReplicaRouter, 'db_for_read', side_effect=db_for_read
+            ):
+                response = admin_client.get('/api/v1/users/export/')
+                assert not recorded
+                rows = read_ndjson(response)
+        finally:
+            request_timed.disconnect(record)
+
+        assert len(rows) == 3
+        # The export query runs in the routing state of the request
+        assert states[-1] is not None and not states[-1].use_primary
+        assert recorded[0].view == 'UserExportView'
+        assert recorded[0].queries == 1
+
+    def test_non_staff_users_are_forbidden(self, api_client, users):
+        api_client.force_authenticate(user=users[0])
+
+        response = api_client.get('/api/v1/users/export/')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_export_command(self, users):
+        output = io.StringIO()
+
+        call_command('export_users', '--is-email-activated', 'true', stdout=output)
+
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [row['username'] for row in rows] == ['ali']
+
+    @pytest.mark.parametrize(
+        'option, value',
+        [
+            ('--is-email-activated', 'maybe'),
+            ('--date-joined-after', 'yesterday'),
+            ('--date-joined-before', '2024-13-01T00:00:00'),
+        ],
+    )
+    def test_export_command_rejects_invalid_options(self, option, value):
+        with pytest.raises(CommandError, match=value):
+            call_command('export_users', option, value, stdout=io.StringIO())
@@ -0,0 +1,97 @@
+import json
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+import pytest
+
+from core.models import User
+
+
+@pytest.fixture
+def write_file(tmp_path):
+    def do_write_file(name, content):
+        path = tmp_path / name
+        path.write_text(content)
+        return str(path)
+
+    return do_write_file
+
+
+def read_rejects(path):
+    with open(f'{path}.rejects.jsonl') as rejects_file:
+        return [json.loads(line) for line in rejects_file]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestImportUsers:
+    def test_csv_import(self, write_file):
+        path = write_file(
+            'users.csv',
+            'username,email,password,password_hash\n'
+            'ali,ali@gmail.com,Test@4321,\n'
+            f'reza,reza@gmail.com,,{make_password("Old@Pass4321")}\n'
+            '%$,bad.com,321,\n'
+            'ali,other@gmail.com,Test@4321,\n',
+        )
+
+        call_command('import_users', path, '--chunk-size', '2')
+
+        assert User.objects.get(username='ali').check_password('Test@4321')
+        assert User.objects.get(username='reza').check_password('Old@Pass4321')
+        rejects = read_rejects(path)
+        assert [reject['line'] for reject in rejects] == [4, 5]
+        assert 'username' in rejects[1]['errors']
+        assert 'password' not in rejects[0]['row']
+
+    def test_jsonl_import_rejects_malformed_rows(self, write_file):
+        path = write_file(
+            'users.jsonl',
+            '{"username": "ali", "email": "ali@gmail.com", "password": "Test@4321"}\n'
+            'not json\n'
+            '{"username": "reza", "email": "reza@gmail.com", "password_hash": "x"}\n',
+        )
+
+        call_command('import_users', path)
+
+        assert list(User.objects.values_list('username', flat=True)) == ['ali']
+        assert [reject['line'] for reject in read_rejects(path)] == [2, 3]
+
+    def test_import_resumes_from_checkpoint(self, write_file):
+        path = write_file(
+            'users.jsonl',
+            ''.join(
+                json.dumps(
+                    {
+                        'username': f'user{i}',
+                        'email': f'user{i}@gmail.com',
+                        'password_hash': make_password('Test@4321'),
+                    }
+                )
+                + '\n'
+                for i in range(5)
+            ),
+        )
+        # An earlier run has imported the first three rows
+        with open(f'{path}.checkpoint', 'w') as checkpoint_file:
+            json.dump({'rows': 3}, checkpoint_file)
+
+        call_command('import_users', path, '--chunk-size', '1')
+
+        assert sorted(User.objects.values_list('username', flat=True)) == [
+            'user3',
+            'user4',
+        ]
+        with open(f'{path}.checkpoint') as checkpoint_file:
+            assert json.load(checkpoint_file) == {'rows': 5}
+
+    def test_non_positive_chunk_size_is_rejected(self, write_file):
+        path = write_file(
+            'users.csv',
+            'username,email,password,password_hash\n'
+            'ali,ali@gmail.com,Test@4321,\n',
+        )
+
+        with pytest.raises(CommandError, match='must be positive'):
+            call_command('import_users', path, '--chunk-size', '0')
+
+        assert not User.objects.exists()
@@ -0,0 +1,181 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.http import HttpResponse
+from django.test import AsyncClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+import pytest
+
+from core.cache import user_cache
+from core.instrumentation import RequestTimingMiddleware, request_timed
+from core.models import User
+from core.revocation import token_revocations
+from core.testing import query_budget
+from core.tokens import email_verification_token_generator, one_time_token_generator
+from core.utils import encode_uid
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+@pytest.fixture
+def timings():
+    """Timings of requests made by the test"""
+    recorded = []
+
+    def record(sender, timings, **kwargs):
+        recorded.append(timings)
+
+    request_timed.connect(record)
+    yield recorded
+    request_timed.disconnect(record)
+
+
+@pytest.mark.django_db
+class TestRequestTimingMiddleware:
+    def test_sampled_response_has_server_timing(self, api_client, user, settings):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 1
+
+        response = api_client.post(
+            '/api/v1/token/', {'username': 'ali', 'password': 'Test@4321'}
+        )
+
+        metrics = response['Server-Timing'].split(', ')
+        assert metrics[0].startswith('db;dur=')
+        assert metrics[0].endswith('desc="1 queries"')
+        assert metrics[1].startswith('hash;dur=')
+        assert metrics[-1].startswith('total;dur=')
+
+    def test_not_sampled_response_has_no_server_timing(
+        self, api_client, user, settings
+    ):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0
+
+        response = api_client.post(
+            '/api/v1/token/', {'username': 'ali', 'password': 'Test@4321'}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'Server-Timing' not in response
+
+    def test_every_request_is_recorded(self, admin_client, user, timings, settings):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0
+
+        admin_client.get('/api/v1/users/')
+        admin_client.get('/api/v1/users/ali/')
+
+        assert [t.view for t in timings] == ['UserViewSet.list', 'UserViewSet.retrieve']
+        assert all(t.queries > 0 and t.durations['db'] > 0 for t in timings)
+        assert 'hash' not in timings[0].durations
+
+    def test_middleware_is_async_in_async_chain(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        assert iscoroutinefunction(RequestTimingMiddleware(get_response))
+        assert not iscoroutinefunction(RequestTimingMiddleware(lambda r: None))
+
+    def test_async_request_is_recorded(self, user, timings, settings):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0
+        url = '/api/v1/async/users/activate/{}/{}'.format(
+            encode_uid(user.pk), email_verification_token_generator.make_token(user)
+        )
+
+        async def get():
+            return await AsyncClient().get(url)
+
+        response = async_to_sync(get)()
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert timings[0].view == 'AsyncUserActivateView'
+        assert timings[0].queries > 0
+
+    def test_async_authentication_and_hashing_are_recorded(
+        self, user, timings, settings
+    ):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0
+        user_cache.reset_stats()
+        token = AccessToken.for_user(user)
+
+        async def post():
+            return await AsyncClient().post(
+                '/api/v1/async/users/set-password/',
+                {
+                    'current_password': 'wrong',
+                    'new_password': 'New@Pass4321',
+                    're_new_password': 'New@Pass4321',
+                },
+                content_type='application/json',
+                headers={'Authorization': f'Bearer {token}'},
+            )
+
+        response = async_to_sync(post)()
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert user_cache.stats()['misses'] == 1
+        assert timings[0].durations['hash'] > 0
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+    def test_exceeded_budget_fails(self, api_client):
+        with pytest.raises(AssertionError, match='ResetPasswordView made'):
+            with query_budget('ResetPasswordView', 0):
+                api_client.post(
+                    '/api/v1/users/reset-password/', {'email': 'ali@gmail.com'}
+                )
+
+    def test_fails_without_request(self):
+        with pytest.raises(AssertionError, match='No request'):
+            with query_budget('ResetPasswordView', 10):
+                pass
+
+
+# Query budgets of endpoints; raising one needs a reason. Transactions of
+# views are savepoints in tests, which are counted too.
+@pytest.mark.django_db
+class TestQueryBudgets:
+    def test_user_create(self, api_client):
+        with query_budget('UserViewSet.create', 4):
+            api_client.post(
+                '/api/v1/users/',
+                {'username': 'ali', 'email': 'ali@gmail.com', 'password': 'Test@4321'},
+            )
+
+    def test_user_list(self, admin_client, user):
+        with query_budget('UserViewSet.list', 2):
+            admin_client.get('/api/v1/users/')
+
+    def test_token_obtain(self, api_client, user):
+        with query_budget('TokenObtainPairView', 2):
+            api_client.post(
+                '/api/v1/token/', {'username': 'ali', 'password': 'Test@4321'}
+            )
+
+    def test_token_refresh(self, api_client, user):
+        refresh = RefreshToken.for_user(user)
+        token_revocations.refresh()
+        with query_budget('TokenRefreshView', 1):
+            api_client.post('/api/v1/token/refresh/', {'refresh': str(refresh)})
+
+    def test_reset_password(self, api_client, user):
+        with query_budget('ResetPasswordView', 10):
+            api_client.post('/api/v1/users/reset-password/', {'email': 'ali@gmail.com'})
+
+    def test_reset_password_confirm(self, api_client, user):
+        with query_budget('ResetPasswordConfirmView', 9):
+            api_client.post(
+                '/api/v1/users/reset-password-confirm/',
+                {
+                    'uid': encode_uid(user.pk),
+                    'token': one_time_token_generator.make_token(user),
+                    'new_password': 'New@Pass4321',
+                    're_new_password': 'New@Pass4321',
+                },
+            )
+
+    def test_activate(self, api_client, user):
+        token = email_verification_token_generator.make_token(user)
+        with query_budget('UserActivateView', 2):
+            api_client.get(f'/api/v1/users/activate/{encode_uid(user.pk)}/{token}')
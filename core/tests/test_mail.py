@@ -0,0 +1,69 @@
+from smtplib import SMTPServerDisconnected
+from unittest import mock
+
+from django.core.mail import EmailMessage
+import pytest
+
+from core import mail
+
+
+@pytest.fixture
+def smtp():
+    with mock.patch('smtplib.SMTP') as smtp_class:
+        smtp_class.return_value.noop.return_value = (250, b'OK')
+        yield smtp_class
+
+
+@pytest.fixture
+def backend():
+    def make_backend(**kwargs):
+        return mail.PooledEmailBackend(host='localhost', port=25, **kwargs)
+
+    # Every test starts with empty pools
+    mail._pools.clear()
+    yield make_backend
+    mail._pools.clear()
+
+
+def make_messages(count):
+    return [
+        EmailMessage('Subject', 'Body', 'info@localhost', ['ali@gmail.com'])
+        for _ in range(count)
+    ]
+
+
+class TestPooledEmailBackend:
+    def test_connection_is_reused_between_sends(self, smtp, backend):
+        email_backend = backend()
+
+        for message in make_messages(3):
+            email_backend.send_messages([message])
+
+        assert smtp.call_count == 1
+        assert smtp.return_value.sendmail.call_count == 3
+        assert email_backend.pool.reused == 2
+        smtp.return_value.quit.assert_not_called()
+
+    def test_stale_connection_is_replaced(self, smtp, backend):
+        email_backend = backend(health_check_interval=0)
+        email_backend.send_messages(make_messages(1))
+        smtp.return_value.noop.side_effect = SMTPServerDisconnected
+
+        email_backend.send_messages(make_messages(1))
+
+        assert smtp.call_count == 2
+        assert email_backend.pool.discarded == 1
+
+    def test_dropped_connection_is_reconnected_while_sending(self, smtp, backend):
+        email_backend = backend()
+        smtp.return_value.sendmail.side_effect = [SMTPServerDisconnected, {}, {}]
+
+        assert email_backend.send_messages(make_messages(2)) == 2
+        assert smtp.call_count == 2
+
+    def test_messages_are_sent_in_batches(self, smtp, backend):
+        email_backend = backend(batch_size=2)
+
+        assert email_backend.send_messages(make_messages(5)) == 5
+        assert smtp.call_count == 1
+        assert email_backend.pool.reused == 2
@@ -0,0 +1,143 @@
+from unittest import mock
+
+import pytest
+
+from core import metrics
+from core.metrics import Registry
+from core.models import User
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return Registry(directory=str(tmp_path), flush_interval=60)
+
+
+class TestRegistry:
+    def test_render_counter_and_histogram(self, registry):
+        counter = registry.counter('emails_total', 'Emails.', ['type'])
+        histogram = registry.histogram(
+            'duration_seconds', 'Duration.', buckets=[0.1, 1]
+        )
+
+        counter.inc(type='reset')
+        counter.inc(2, type='reset')
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        assert registry.render().splitlines() == [
+            '# HELP emails_total Emails.',
+            '# TYPE emails_total counter',
+            'emails_total{type="reset"} 3',
+            '# HELP duration_seconds Duration.',
+            '# TYPE duration_seconds histogram',
+            'duration_seconds_bucket{le="0.1"} 1',
+            'duration_seconds_bucket{le="1.0"} 2',
+            'duration_seconds_bucket{le="+Inf"} 3',
+            'duration_seconds_sum 5.55',
+            'duration_seconds_count 3',
+        ]
+
+    def test_wrong_labels_raise_error(self, registry):
+        counter = registry.counter('emails_total', 'Emails.', ['type'])
+
+        with pytest.raises(ValueError):
+            counter.inc(kind='reset')
+
+    def test_values_of_processes_are_added(self, registry, tmp_path):
+        # Another process writes to the same directory
+        other = Registry(directory=str(tmp_path), flush_interval=60)
+        for each in [registry, other]:
+            each.counter('emails_total', 'Emails.', ['type'])
+            each.histogram('duration_seconds', 'Duration.', buckets=[1])
+
+        registry.metrics['emails_total'].inc(type='reset')
+        other.metrics['emails_total'].inc(type='reset')
+        other.metrics['emails_total'].inc(type='activation')
+        other.metrics['duration_seconds'].observe(0.5)
+        other.flush()
+
+        rendered = registry.render()
+        assert 'emails_total{type="reset"} 2' in rendered
+        assert 'emails_total{type="activation"} 1' in rendered
+        assert 'duration_seconds_bucket{le="1.0"} 1' in rendered
+
+    def test_values_are_written_by_flush(self, registry, tmp_path):
+        counter = registry.counter('emails_total', 'Emails.')
+
+        counter.inc()
+        assert list(tmp_path.iterdir()) == []
+
+        registry.flush()
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_forked_process_starts_empty(self):
+        registry = Registry()
+        counter = registry.counter('emails_total', 'Emails.')
+        counter.inc()
+
+        with mock.patch('os.getpid', return_value=-1):
+            counter.inc()
+            assert registry.collect()['emails_total'] == {'[]': [1]}
+
+
+def sample(name):
+    """Value of first sample of metrics endpoint whose line starts with name"""
+    for line in metrics.registry.render().splitlines():
+        if line.startswith(name):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    def test_metrics_require_token(self, api_client, settings):
+        settings.METRICS_TOKEN = 'secret'
+
+        assert api_client.get('/metrics').status_code == 403
+        assert (
+            api_client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code
+            == 403
+        )
+        assert (
+            api_client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code
+            == 200
+        )
+
+    def test_staff_users_can_read_metrics(self, api_client, settings):
+        settings.METRICS_TOKEN = None
+        admin = User.objects.create_user(
+            'admin', 'admin@gmail.com', 'Test@4321', is_staff=True
+        )
+
+        api_client.force_login(admin)
+
+        assert api_client.get('/metrics').status_code == 200
+
+    def test_login_is_measured(self, api_client, settings):
+        settings.METRICS_TOKEN = 'secret'
+        User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+        names = [
+            'auth_view_duration_seconds_count{view="TokenObtainPairView",'
+            'method="POST",status="200"}',
+            'auth_authenticate_duration_seconds_count{result="success"}',
+            'auth_token_duration_seconds_count{token="jwt",operation="generate"}',
+        ]
+        counts = [sample(name) for name in names]
+
+        api_client.post('/api/v1/token/', {'username': 'ali', 'password': 'Test@4321'})
+        response = api_client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert [sample(name) for name in names] == [count + 1 for count in counts]
+
+    def test_rate_limit_rejection_is_counted(self, api_client):
+        User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+        name = 'auth_rate_limit_rejections_total{email_type="password_reset"}'
+        rejections = sample(name)
+
+        for _ in range(2):
+            api_client.post('/api/v1/users/reset-password/', {'email': 'ali@gmail.com'})
+
+        assert sample(name) == rejections + 1
@@ -0,0 +1,103 @@
+import base64
+
+from django.utils import timezone
+from rest_framework import status
+import pytest
+
+from core.models import User
+
+
+@pytest.fixture
+def users():
+    # Some users join at the same time, so ties are ordered by id
+    date_joined = timezone.now()
+    return User.objects.bulk_create(
+        User(
+            username=f'user{i}',
+            email=f'user{i}@gmail.com',
+            date_joined=date_joined + timezone.timedelta(seconds=i // 3),
+        )
+        for i in range(25)
+    )
+
+
+def get_usernames(response):
+    return [user['username'] for user in response.data['results']]
+
+
+@pytest.fixture(autouse=True)
+def cursor_pagination(settings):
+    settings.USER_LIST_CURSOR_PAGINATION = True
+
+
+@pytest.mark.django_db
+class TestUserCursorPagination:
+    def test_pages_cover_every_user_once_in_order(self, admin_client, users):
+        usernames = []
+        url = '/api/v1/users/'
+        while url is not None:
+            response = admin_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            usernames += get_usernames(response)
+            url = response.data['next']
+
+        # Admin joined before other users
+        assert usernames == ['admin'] + [user.username for user in users]
+
+    def test_previous_link_returns_previous_page(self, admin_client, users):
+        first_page = admin_client.get('/api/v1/users/')
+        second_page = admin_client.get(first_page.data['next'])
+
+        response = admin_client.get(second_page.data['previous'])
+
+        assert first_page.data['previous'] is None
+        assert get_usernames(response) == get_usernames(first_page)
+        assert response.data['previous'] is None
+
+    def test_page_does_not_count_users(
+        self, admin_client, users, django_assert_num_queries
+    ):
+        url = admin_client.get('/api/v1/users/').data['next']
+
+        with django_assert_num_queries(1):
+            response = admin_client.get(url)
+
+        assert 'count' not in response.data
+
+    def test_estimated_count(self, admin_client, users):
+        response = admin_client.get('/api/v1/users/', {'count': 'estimated'})
+
+        assert response.data['count'] == len(users) + 1
+
+    def test_invalid_cursor_returns_404(self, admin_client):
+        response = admin_client.get('/api/v1/users/', {'cursor': 'invalid'})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_cursor_with_huge_id_returns_404(self, admin_client):
+        cursor = base64.urlsafe_b64encode(
+            b'{"d": "2024-01-01T00:00:00+00:00", "i": 1e400, "r": false}'
+        ).decode()
+
+        response = admin_client.get('/api/v1/users/', {'cursor': cursor})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    # user0 to user2 joined at the same time
+    @pytest.mark.parametrize(
+        'pk, expected', [(10**30, ['user3']), (-(10**30), ['user0'])]
+    )
+    def test_cursor_ids_out_of_database_range_are_clamped(
+        self, admin_client, users, pk, expected
+    ):
+        date_joined = users[0].date_joined.isoformat()
+        cursor = base64.urlsafe_b64encode(
+            f'{{"d": "{date_joined}", "i": {pk}, "r": false}}'.encode()
+        ).decode()
+
+        response = admin_client.get(
+            '/api/v1/users/', {'cursor': cursor, 'page_size': 1}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert get_usernames(response) == expected
@@ -0,0 +1,85 @@
+from unittest import mock
+
+import pytest
+from django.contrib.auth import password_validation
+from django.core.exceptions import ValidationError
+
+from core import metrics
+from core.models import User
+from core.password_policy import password_policy
+
+PASSWORDS = [
+    'Test@4321',
+    'short',
+    '12345678',
+    '123',
+    'password',
+    'PASSWORD ',
+    'johnsmith',
+    'john@example',
+    'johnsmith1',
+]
+
+
+def get_errors(validate, password, user):
+    try:
+        validate(password, user)
+    except ValidationError as error:
+        return [(e.code, e.message % (e.params or {})) for e in error.error_list]
+    return []
+
+
+class TestPasswordPolicy:
+    @pytest.mark.parametrize('password', PASSWORDS)
+    def test_same_errors_as_validate_password(self, password):
+        user = User(username='johnsmith', email='john@example.com')
+        expected = get_errors(password_validation.validate_password, password, user)
+        if any(code != 'password_too_similar' for code, _ in expected):
+            # Similarity is skipped once a cheaper validator failed
+            expected = [e for e in expected if e[0] != 'password_too_similar']
+
+        assert get_errors(password_policy.validate, password, user) == expected
+
+    def test_expensive_validators_are_skipped_after_failure(self):
+        user = User(username='johnsmith', email='john@example.com')
+        with mock.patch.object(
+            password_validation.UserAttributeSimilarityValidator, 'validate'
+        ) as similarity:
+            with pytest.raises(ValidationError):
+                password_policy.validate('123', user)
+            assert similarity.call_count == 0
+
+            password_policy.validate('Test@4321', user)
+            assert similarity.call_count == 1
+
+    def test_common_passwords_are_frozen(self):
+        common = [
+            validator
+            for validator in password_policy.validators
+            if isinstance(validator, password_validation.CommonPasswordValidator)
+        ]
+
+        assert isinstance(common[0].passwords, frozenset)
+
+    def test_validator_timings(self):
+        with mock.patch.object(
+            metrics.password_validator_duration, 'observe'
+        ) as observe:
+            password_policy.validate('Test@4321')
+
+        assert [call.kwargs['validator'] for call in observe.call_args_list] == [
+            'MinimumLengthValidator',
+            'NumericPasswordValidator',
+            'CommonPasswordValidator',
+            'BreachedPasswordValidator',
+            'UserAttributeSimilarityValidator',
+        ]
+
+    def test_reloaded_on_setting_change(self, settings):
+        settings.AUTH_PASSWORD_VALIDATORS = [
+            {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'}
+        ]
+
+        password_policy.validate('short')
+        with pytest.raises(ValidationError):
+            password_policy.validate('1234')
@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+import pytest
+
+from core.models import User, EmailLog
+from core.ratelimit import EmailRateLimitExceeded, EmailRateLimiter
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+@pytest.fixture
+def limiter():
+    return EmailRateLimiter(EmailLog.PASSWORD_RESET)
+
+
+def create_email_logs(user, count, age):
+    email_logs = EmailLog.objects.bulk_create(
+        EmailLog(user=user, email_type=EmailLog.PASSWORD_RESET)
+        for _ in range(count)
+    )
+    EmailLog.objects.filter(pk__in=[log.pk for log in email_logs]).update(
+        timestamp=timezone.now() - age
+    )
+
+
+@pytest.mark.django_db
+class TestEmailRateLimiter:
+    def test_usage_is_read_in_one_query(self, user, limiter):
+        create_email_logs(user, 3, timezone.timedelta(hours=1))
+
+        with CaptureQueriesContext(connection) as queries:
+            total, last_sent = limiter.get_usage(user)
+
+        assert len(queries) == 1
+        assert total == 3
+        assert last_sent is not None
+
+    def test_reserve_creates_email_log(self, user, limiter):
+        email_log = limiter.reserve(user)
+
+        assert email_log.email_type == EmailLog.PASSWORD_RESET
+        assert email_log.status == EmailLog.PENDING
+
+    def test_reserve_within_interval_raises_with_wait_time(self, user, limiter):
+        limiter.reserve(user)
+
+        with pytest.raises(EmailRateLimitExceeded) as e:
+            limiter.reserve(user)
+
+        assert e.value.wait_time > timezone.timedelta(0)
+        assert EmailLog.objects.count() == 1
+
+    def test_reserve_after_max_total_raises(self, user, limiter, settings):
+        settings.EMAIL_RATE_LIMITS = {
+            EmailLog.PASSWORD_RESET: {'max_total': 2, 'interval': 60}
+        }
+        create_email_logs(user, 2, timezone.timedelta(hours=1))
+
+        with pytest.raises(EmailRateLimitExceeded) as e:
+            limiter.reserve(user)
+
+        assert e.value.wait_time is None
+
+
+@pytest.mark.django_db
+class TestResetPasswordRateLimit:
+    def test_second_request_returns_400(self, api_client, user):
+        url = '/api/v1/users/reset-password/'
+
+        first = api_client.post(url, {'email': user.email})
+        second = api_client.post(url, {'email': user.email})
+
+        assert first.status_code == status.HTTP_204_NO_CONTENT
+        assert second.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'wait_time' in second.data
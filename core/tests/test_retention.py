@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+import pytest
+
+from core.models import User, EmailLog, EmailLogRollup
+from core.ratelimit import EmailRateLimiter
+from core import retention
+from core.retention import rollup_email_log_chunk, rollup_email_logs
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+def create_email_logs(user, count, age):
+    email_logs = EmailLog.objects.bulk_create(
+        EmailLog(user=user, email_type=EmailLog.PASSWORD_RESET)
+        for _ in range(count)
+    )
+    EmailLog.objects.filter(pk__in=[log.pk for log in email_logs]).update(
+        timestamp=timezone.now() - age
+    )
+
+
+@pytest.mark.django_db
+class TestRollupEmailLogs:
+    def test_old_logs_are_rolled_up_in_chunks(self, user):
+        create_email_logs(user, 5, timezone.timedelta(days=60))
+        create_email_logs(user, 2, timezone.timedelta(days=1))
+
+        total = rollup_email_logs(chunk_size=2)
+
+        rollup = EmailLogRollup.objects.get(user=user)
+        assert total == 5
+        assert rollup.count == 5
+        assert EmailLog.objects.count() == 2
+
+    def test_rollup_is_added_to_existing_counter(self, user):
+        create_email_logs(user, 3, timezone.timedelta(days=60))
+        rollup_email_logs()
+        create_email_logs(user, 2, timezone.timedelta(days=40))
+
+        rollup_email_logs()
+
+        assert EmailLogRollup.objects.get(user=user).count == 5
+
+    def test_overlapping_chunks_are_counted_once(self, user):
+        create_email_logs(user, 3, timezone.timedelta(days=60))
+        cutoff = retention.get_retention_cutoff()
+        lock_users = retention.lock_users
+
+        def roll_up_concurrently(user_pks):
+            # Another run moves the same chunk before this one locks users
+            with mock.patch.object(retention, 'lock_users', lock_users):
+                rollup_email_log_chunk(cutoff, 2)
+            lock_users(user_pks)
+
+        with mock.patch.object(retention, 'lock_users', roll_up_concurrently):
+            rolled_up = rollup_email_log_chunk(cutoff, 2)
+
+        assert rolled_up == 0
+        assert EmailLogRollup.objects.get(user=user).count == 2
+        assert rollup_email_logs(cutoff) == 1
+        assert EmailLogRollup.objects.get(user=user).count == 3
+
+    def test_rate_limiter_counts_rolled_up_logs(self, user):
+        create_email_logs(user, 4, timezone.timedelta(days=60))
+        create_email_logs(user, 1, timezone.timedelta(days=1))
+        limiter = EmailRateLimiter(EmailLog.PASSWORD_RESET)
+        before = limiter.get_usage(user)
+
+        rollup_email_logs()
+
+        assert limiter.get_usage(user) == before
+        assert before[0] == 5
+
+    def test_command_archives_deleted_logs(self, user, tmp_path):
+        create_email_logs(user, 3, timezone.timedelta(days=60))
+        archive = tmp_path / 'email_logs.jsonl'
+
+        call_command('rollup_email_logs', archive=str(archive))
+
+        assert len(archive.read_text().splitlines()) == 3
+        assert EmailLog.objects.count() == 0
+
+    def test_short_chunk_does_not_stop_rollup(self, user):
+        with mock.patch.object(
+            retention, 'rollup_email_log_chunk', side_effect=[2, 1, 2, 0]
+        ):
+            assert rollup_email_logs(chunk_size=2) == 5
+
+    @pytest.mark.parametrize('chunk_size', ['0', '-1'])
+    def test_command_rejects_non_positive_chunk_size(self, user, chunk_size):
+        create_email_logs(user, 3, timezone.timedelta(days=60))
+
+        with pytest.raises(CommandError, match='must be positive'):
+            call_command('rollup_email_logs', '--chunk-size', chunk_size)
+
+        assert EmailLog.objects.count() == 3
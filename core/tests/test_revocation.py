@@ -0,0 +1,106 @@
+from django.utils import timezone
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+import pytest
+
+from core.models import RevokedToken, User
+from core.revocation import BloomFilter, revoke_token, token_revocations
+
+PASSWORD = 'Test@4321'
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', PASSWORD)
+
+
+def issued_earlier(token):
+    """Move iat of token to the past, so a watermark set now revokes it."""
+    token['iat'] -= 5
+    return token
+
+
+class TestBloomFilter:
+    def test_added_keys_are_found(self):
+        bloom_filter = BloomFilter(1000, 0.01)
+        keys = [f'jti-{i}' for i in range(1000)]
+        for key in keys:
+            bloom_filter.add(key)
+
+        assert all(key in bloom_filter for key in keys)
+
+    def test_false_positive_rate(self):
+        bloom_filter = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom_filter.add(f'jti-{i}')
+
+        false_positives = sum(f'other-{i}' in bloom_filter for i in range(10000))
+        assert false_positives < 300
+
+
+@pytest.mark.django_db
+class TestTokenRevocation:
+    def test_set_password_revokes_older_tokens(self, api_client, user):
+        access = issued_earlier(AccessToken.for_user(user))
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        response = api_client.post(
+            '/api/v1/users/set-password/',
+            {
+                'current_password': PASSWORD,
+                'new_password': 'New@Pass4321',
+                're_new_password': 'New@Pass4321',
+            },
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        response = api_client.get('/api/v1/users/ali/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_revoked_tokens_are_loaded_from_database(self, api_client, user):
+        access = AccessToken.for_user(user)
+        RevokedToken.objects.create(
+            jti=access['jti'], expires_at=timezone.now() + timezone.timedelta(days=1)
+        )
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        response = api_client.get('/api/v1/users/ali/')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_revoke_endpoint(self, api_client, user):
+        refresh = RefreshToken.for_user(user)
+        access = refresh.access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        response = api_client.post('/api/v1/token/revoke/', {'refresh': str(refresh)})
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        response = api_client.get('/api/v1/users/ali/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        api_client.credentials()
+        response = api_client.post('/api/v1/token/refresh/', {'refresh': str(refresh)})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_revoke_endpoint_rejects_tokens_of_others(self, api_client, user):
+        other = User.objects.create_user('reza', 'reza@gmail.com', PASSWORD)
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+
+        response = api_client.post(
+            '/api/v1/token/revoke/', {'refresh': str(RefreshToken.for_user(other))}
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not RevokedToken.objects.exists()
+
+    def test_unrevoked_token_needs_no_query(
+        self, api_client, user, django_assert_num_queries
+    ):
+        revoke_token(RefreshToken.for_user(user))
+        token_revocations.refresh()
+
+        with django_assert_num_queries(0):
+            assert not token_revocations.is_revoked(AccessToken.for_user(user))
@@ -0,0 +1,158 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+import pytest
+
+from core import views
+from core.models import User
+from core.routers import (
+    ReplicaRouter,
+    ReplicaRoutingMiddleware,
+    make_pin_key,
+    pin_user,
+    use_primary_for_user,
+    use_replicas,
+)
+
+router = ReplicaRouter()
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+
+
+def get_read_database(method='GET', run=None):
+    """Database which a read is routed to in a request"""
+    databases = []
+
+    def get_response(request):
+        if run is not None:
+            run()
+        databases.append(router.db_for_read(User))
+        return HttpResponse()
+
+    middleware = ReplicaRoutingMiddleware(get_response)
+    middleware(getattr(RequestFactory(), method.lower())('/'))
+    return databases[0]
+
+
+@pytest.mark.usefixtures('replicas')
+class TestReplicaRouter:
+    def test_reads_of_safe_requests_go_to_replica(self):
+        assert get_read_database('GET') == 'replica'
+
+    def test_reads_outside_of_requests_go_to_primary(self):
+        assert router.db_for_read(User) == 'default'
+
+    def test_reads_of_unsafe_requests_go_to_primary(self):
+        assert get_read_database('POST') == 'default'
+
+    def test_views_can_read_from_replica_in_unsafe_requests(self):
+        assert get_read_database('POST', run=use_replicas) == 'replica'
+        assert issubclass(views.TokenObtainPairView, views.ReplicaReadsMixin)
+
+    def test_reads_after_write_go_to_primary(self):
+        assert router.db_for_write(User) == 'default'
+        assert (
+            get_read_database(run=lambda: router.db_for_write(User)) == 'default'
+        )
+
+    def test_pinned_user_reads_from_primary(self):
+        pin_user(1)
+
+        assert get_read_database(run=lambda: use_primary_for_user(1)) == 'default'
+        assert get_read_database(run=lambda: use_primary_for_user(2)) == 'replica'
+
+    def test_pinned_user_reads_from_primary_in_async_request(self):
+        pin_user(1)
+        databases = []
+
+        async def get_response(request):
+            # Authentication of async views runs in a thread
+            await sync_to_async(use_primary_for_user)(1)
+            databases.append(router.db_for_read(User))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+
+        async def get():
+            return await middleware(RequestFactory().get('/'))
+
+        assert iscoroutinefunction(middleware)
+        async_to_sync(get)()
+        assert databases == ['default']
+
+    @pytest.mark.django_db
+    def test_reads_in_transaction_go_to_primary(self):
+        def read_in_transaction():
+            with transaction.atomic():
+                return router.db_for_read(User)
+
+        databases = []
+        get_read_database(run=lambda: databases.append(read_in_transaction()))
+
+        assert databases == ['default']
+
+
+@pytest.mark.skipif(
+    not settings.DATABASE_REPLICAS, reason='No read replicas are configured'
+)
+@pytest.mark.django_db(transaction=True, databases='__all__')
+class TestReplicaReads:
+    def request(self, api_client, method, path, data=None):
+        """Response of a request and number of its queries on replicas"""
+        contexts = [
+            CaptureQueriesContext(connections[alias])
+            for alias in settings.DATABASE_REPLICAS
+        ]
+        for context in contexts:
+            context.__enter__()
+        try:
+            response = getattr(api_client, method)(path, data)
+            if response.streaming:
+                response.streamed = b''.join(response.streaming_content)
+        finally:
+            for context in contexts:
+                context.__exit__(None, None, None)
+        assert response.status_code < 300, response.data
+        return response, sum(len(context) for context in contexts)
+
+    def test_user_reads_own_writes(self, api_client):
+        user = User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+        cache.delete(make_pin_key(user.pk))
+
+        response, replica_queries = self.request(
+            api_client,
+            'post',
+            '/api/v1/token/',
+            {'username': 'ali', 'password': 'Test@4321'},
+        )
+        assert replica_queries > 0
+
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        _, replica_queries = self.request(api_client, 'get', '/api/v1/users/ali/')
+        assert replica_queries > 0
+
+        _, replica_queries = self.request(
+            api_client, 'patch', '/api/v1/users/ali/', {'email': 'ali2@gmail.com'}
+        )
+        assert replica_queries == 0
+
+        response, replica_queries = self.request(api_client, 'get', '/api/v1/users/ali/')
+        assert replica_queries == 0
+        assert response.data['email'] == 'ali2@gmail.com'
+
+    def test_streamed_export_reads_from_replica(self, admin_client):
+        cache.delete(make_pin_key(User.objects.get(username='admin').pk))
+
+        response, replica_queries = self.request(
+            admin_client, 'get', '/api/v1/users/export/'
+        )
+
+        assert replica_queries > 0
+        assert b'admin' in response.streamed
@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+import pytest
+
+from core.models import User, EmailLog
+from core.seeding import SeedOptions, generate_chunk
+
+
+class TestGenerateChunk:
+    def test_same_seed_generates_same_data(self):
+        options = SeedOptions(seed=7, users=50, chunk_size=20)
+
+        assert generate_chunk(options, 'hash', 1, 1) == generate_chunk(
+            options, 'hash', 1, 1
+        )
+        assert generate_chunk(options, 'hash', 1, 1) != generate_chunk(
+            SeedOptions(seed=8, users=50, chunk_size=20), 'hash', 1, 1
+        )
+
+    def test_last_chunk(self):
+        users, email_logs = generate_chunk(
+            SeedOptions(users=50, chunk_size=20), 'hash', 1, 2
+        )
+
+        assert [user[0] for user in users] == list(range(41, 51))
+        assert {log[0] for log in email_logs} <= {user[0] for user in users}
+
+
+@pytest.mark.django_db
+class TestSeedScale:
+    def test_seed_scale(self):
+        User.objects.create_user(
+            username='ali', email='ali@gmail.com', password='Test@4321'
+        )
+
+        call_command(
+            'seed_scale',
+            '--users',
+            '25',
+            '--chunk-size',
+            '10',
+            '--emails-per-user',
+            '3',
+            stdout=StringIO(),
+        )
+
+        assert User.objects.filter(username__startswith='seed').count() == 25
+        seeded = User.objects.get(username='seed0')
+        assert seeded.check_password('Seed@4321')
+        assert EmailLog.objects.filter(user__username__startswith='seed').count() >= 25
+
+        # Sequences are moved after the inserted ids
+        user = User.objects.create_user(
+            username='reza', email='reza@gmail.com', password='Test@4321'
+        )
+        assert user.pk > seeded.pk + 24
+
+    @pytest.mark.parametrize(
+        'option, value', [('--emails-per-user', '0'), ('--max-emails-per-user', '0')]
+    )
+    def test_non_positive_email_counts_are_rejected(self, option, value):
+        with pytest.raises(CommandError, match='must be positive'):
+            call_command('seed_scale', option, value, stdout=StringIO())
+
+        assert not User.objects.exists()
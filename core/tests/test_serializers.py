@@ -0,0 +1,49 @@
+from rest_framework import status
+import pytest
+
+from core.models import User
+from core.serializers import UserDetailSerializer
+
+
+@pytest.mark.django_db
+class TestUserDetailSerializer:
+    def test_values_representation_equals_instance_representation(self):
+        User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+        User.objects.create_user('reza', 'reza@gmail.com', 'Test@4321')
+        serializer = UserDetailSerializer()
+
+        rows = User.objects.order_by('id').values(*serializer.fields)
+
+        assert serializer.to_representation_values(rows) == (
+            UserDetailSerializer(User.objects.order_by('id'), many=True).data
+        )
+
+    def test_fields_argument_narrows_output(self):
+        user = User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+        data = UserDetailSerializer(user, fields=['id', 'username']).data
+
+        assert data == {'id': user.id, 'username': 'ali'}
+
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+    def test_list_returns_requested_fields(self, admin_client):
+        response = admin_client.get('/api/v1/users/', {'fields': 'id,username'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == [
+            {'id': User.objects.get().id, 'username': 'admin'}
+        ]
+
+    def test_retrieve_returns_requested_fields(self, admin_client):
+        response = admin_client.get('/api/v1/users/admin/', {'fields': 'email'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'email': 'admin@gmail.com'}
+
+    def test_unknown_field_returns_400(self, admin_client):
+        response = admin_client.get('/api/v1/users/', {'fields': 'id,password'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'fields' in response.data
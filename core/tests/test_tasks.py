@@ -0,0 +1,57 @@
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+import pytest
+
+from core.models import User, EmailLog
+from core.tasks import queue_activation_email, queue_password_reset_email
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+@pytest.mark.django_db
+class TestEmailTasks:
+    def test_email_is_sent_after_commit(
+        self, eager_celery, user, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            email_log = queue_activation_email(user)
+
+        assert len(mail.outbox) == 0
+        assert email_log.status == EmailLog.PENDING
+
+        for callback in callbacks:
+            callback()
+
+        email_log.refresh_from_db()
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == [user.email]
+        assert email_log.status == EmailLog.SENT
+        assert email_log.attempts == 1
+
+    def test_password_reset_email_contains_token(
+        self, eager_celery, user, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            email_log = queue_password_reset_email(user, 'some-token')
+
+        email_log.refresh_from_db()
+        assert email_log.status == EmailLog.SENT
+        assert 'some-token' in mail.outbox[0].body
+
+    def test_failed_email_is_recorded_after_retries(
+        self, eager_celery, user, django_capture_on_commit_callbacks
+    ):
+        with mock.patch(
+            'core.emails.ActivationEmail.send', side_effect=SMTPException('down')
+        ), mock.patch('core.tasks.send_activation_email.max_retries', 0):
+            with django_capture_on_commit_callbacks(execute=True):
+                email_log = queue_activation_email(user)
+
+        email_log.refresh_from_db()
+        assert email_log.status == EmailLog.FAILED
+        assert 'down' in email_log.error
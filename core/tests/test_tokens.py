@@ -0,0 +1,64 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+import pytest
+
+from core.models import PasswordResetToken, User
+from core.tokens import one_time_token_generator
+from core.utils import encode_uid
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+@pytest.mark.django_db
+class TestOneTimePasswordResetTokenGenerator:
+    def test_token_is_stored_hashed_without_user_update(self, user):
+        with CaptureQueriesContext(connection) as queries:
+            token = one_time_token_generator.make_token(user)
+
+        token_row = PasswordResetToken.objects.get(user=user)
+        assert token_row.token_hash != token
+        assert not any(q['sql'].startswith('UPDATE "core_user"') for q in queries)
+
+    def test_token_is_consumed_with_one_query(self, user, django_assert_num_queries):
+        token = one_time_token_generator.make_token(user)
+
+        with django_assert_num_queries(1):
+            assert one_time_token_generator.check_token(user, token)
+        assert not one_time_token_generator.check_token(user, token)
+
+    def test_new_token_invalidates_older_one(self, user):
+        old_token = one_time_token_generator.make_token(user)
+        new_token = one_time_token_generator.make_token(user)
+
+        assert not one_time_token_generator.check_token(user, old_token)
+        assert one_time_token_generator.check_token(user, new_token)
+
+    def test_expired_token_is_invalid(self, user):
+        token = one_time_token_generator.make_token(user)
+        PasswordResetToken.objects.update(expires_at=timezone.now())
+
+        assert not one_time_token_generator.check_token(user, token)
+
+    def test_reset_password_confirm(self, api_client, user):
+        token = one_time_token_generator.make_token(user)
+        data = {
+            'uid': encode_uid(user.pk),
+            'token': token,
+            'new_password': 'New@Pass4321',
+            're_new_password': 'New@Pass4321',
+        }
+
+        response = api_client.post('/api/v1/users/reset-password-confirm/', data)
+        second_response = api_client.post(
+            '/api/v1/users/reset-password-confirm/', data
+        )
+
+        user.refresh_from_db()
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert second_response.status_code == status.HTTP_400_BAD_REQUEST
+        assert user.check_password('New@Pass4321')
@@ -0,0 +1,158 @@
+import threading
+from unittest import mock
+
+from django.db import connection, connections
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+import pytest
+
+from core.models import User
+from core.tokens import email_verification_token_generator, one_time_token_generator
+from core.transitions import activate_email, save_password
+from core.utils import encode_uid
+
+THREADS = 8
+
+
+@pytest.fixture
+def user(settings):
+    # A fast hasher, so requests of threads overlap
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    return User.objects.create_user('ali', 'ali@gmail.com', 'Test@4321')
+
+
+def in_parallel(send, count=THREADS):
+    """Call send(index) in count threads at once and return the responses"""
+    barrier = threading.Barrier(count)
+    responses = [None] * count
+
+    def run(index):
+        try:
+            barrier.wait()
+            responses[index] = send(index)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [response.status_code for response in responses]
+
+
+@pytest.mark.django_db
+class TestTransitions:
+    def test_activate_email_writes_once(self, user, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert activate_email(user) is True
+        assert activate_email(user) is False
+
+        user.refresh_from_db()
+        assert user.is_email_activated
+
+    def test_save_password_only_writes_password(self, user):
+        stale = User.objects.get(pk=user.pk)
+        User.objects.filter(pk=user.pk).update(is_email_activated=True)
+
+        stale.set_password('New@Pass4321')
+        assert save_password(stale) is True
+
+        user.refresh_from_db()
+        assert user.check_password('New@Pass4321')
+        assert user.is_email_activated
+
+    def test_save_password_with_changed_expected_password(self, user):
+        expected = user.password
+        User.objects.filter(pk=user.pk).update(password='changed')
+
+        user.set_password('New@Pass4321')
+
+        assert save_password(user, expected_password=expected) is False
+
+    def test_repeated_activation_succeeds(self, api_client, user):
+        token = email_verification_token_generator.make_token(user)
+        url = f'/api/v1/users/activate/{encode_uid(user.pk)}/{token}'
+
+        assert api_client.get(url).status_code == status.HTTP_204_NO_CONTENT
+        assert api_client.get(url).status_code == status.HTTP_204_NO_CONTENT
+        assert (
+            api_client.get(f'/api/v1/users/activate/{encode_uid(user.pk)}/bad-token')
+        ).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentTransitions:
+    @pytest.fixture(autouse=True)
+    def skip_sqlite(self):
+        # SQLite fails instead of waiting when transactions write concurrently
+        if connection.vendor == 'sqlite':
+            pytest.skip('SQLite does not support concurrent writing transactions')
+
+    def test_concurrent_activations_write_once(self, user):
+        token = email_verification_token_generator.make_token(user)
+        url = f'/api/v1/users/activate/{encode_uid(user.pk)}/{token}'
+
+        with mock.patch(
+            'core.transitions.user_cache.invalidate_changed'
+        ) as invalidate_changed:
+            codes = in_parallel(lambda i: APIClient().get(url))
+
+        assert codes == [status.HTTP_204_NO_CONTENT] * THREADS
+        # Only the request which activated the email has written
+        assert invalidate_changed.call_count == 1
+        user.refresh_from_db()
+        assert user.is_email_activated
+
+    def test_concurrent_reset_confirms_use_token_once(self, user):
+        data = {
+            'uid': encode_uid(user.pk),
+            'token': one_time_token_generator.make_token(user),
+        }
+
+        codes = in_parallel(
+            lambda i: APIClient().post(
+                '/api/v1/users/reset-password-confirm/',
+                {
+                    **data,
+                    'new_password': f'New@Pass{i}',
+                    're_new_password': f'New@Pass{i}',
+                },
+            )
+        )
+
+        assert codes.count(status.HTTP_204_NO_CONTENT) == 1
+        assert codes.count(status.HTTP_400_BAD_REQUEST) == THREADS - 1
+        user.refresh_from_db()
+        winner = codes.index(status.HTTP_204_NO_CONTENT)
+        assert user.check_password(f'New@Pass{winner}')
+
+    def test_concurrent_password_changes_change_once(self, user):
+        headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'
+        }
+
+        codes = in_parallel(
+            lambda i: APIClient().post(
+                '/api/v1/users/set-password/',
+                {
+                    'current_password': 'Test@4321',
+                    'new_password': f'New@Pass{i}',
+                    're_new_password': f'New@Pass{i}',
+                },
+                **headers,
+            )
+        )
+
+        # Others fail, either on current password or on the conditional UPDATE
+        assert codes.count(status.HTTP_204_NO_CONTENT) == 1
+        assert set(codes) <= {
+            status.HTTP_204_NO_CONTENT,
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_401_UNAUTHORIZED,
+            status.HTTP_409_CONFLICT,
+        }
+        user.refresh_from_db()
+        winner = codes.index(status.HTTP_204_NO_CONTENT)
+        assert user.check_password(f'New@Pass{winner}')
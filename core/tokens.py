@@ -1,40 +1,110 @@
+import copy
+import hashlib
+import secrets
+
+from django.conf import settings
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.utils import timezone
+
+from . import metrics
+from .models import PasswordResetToken
 
 
 class EmailVerificationTokenGenerator(PasswordResetTokenGenerator):
     """Token generator only used for email verification
 
     This token is valid only if user email is not activated. Once email is
-    activated, the token is invalid.
+    activated, the token is invalid (see check_used_token).
     """
 
     def _make_hash_value(self, user, timestamp):
         return str(user.is_email_activated) + str(user.pk) + str(timestamp)
 
+    def make_token(self, user):
+        with metrics.token_duration.time(
+            token='email_verification', operation='generate'
+        ):
+            return super().make_token(user)
+
+    def check_token(self, user, token):
+        with metrics.token_duration.time(
+            token='email_verification', operation='verify'
+        ):
+            return super().check_token(user, token)
+
+    def check_used_token(self, user, token):
+        """Check if token was valid for user before email was activated."""
+        if not user.is_email_activated:
+            return False
+        not_activated = copy.copy(user)
+        not_activated.is_email_activated = False
+        return self.check_token(not_activated, token)
+
 
 email_verification_token_generator = EmailVerificationTokenGenerator()
 
 
-class OneTimePasswordResetTokenGenerator(PasswordResetTokenGenerator):
-    def _make_hash_value(self, user, timestamp):
-        return str(user.pk) + str(timestamp) + str(user.is_active) + user.password
+class OneTimePasswordResetTokenGenerator:
+    """Token generator only used for password reset
+
+    Tokens are random and stored hashed in PasswordResetToken table, so user
+    row is never rewritten. A token is valid until it is used, user requests
+    another one or PASSWORD_RESET_TIMEOUT seconds pass.
+    """
+
+    def hash_token(self, token):
+        return hashlib.sha256(token.encode()).hexdigest()
 
     def make_token(self, user):
-        token = super().make_token(user)
-        # Store the token in the user's model or a separate model/database
-        user.password_reset_token = token
-        user.save()
+        with metrics.token_duration.time(token='password_reset', operation='generate'):
+            return self._make_token(user)
+
+    def _make_token(self, user):
+        # Only the latest token of user is valid
+        PasswordResetToken.objects.filter(user_id=user.pk).delete()
+
+        token = secrets.token_urlsafe(32)
+        PasswordResetToken.objects.create(
+            user_id=user.pk,
+            token_hash=self.hash_token(token),
+            expires_at=timezone.now()
+            + timezone.timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT),
+        )
         return token
 
     def check_token(self, user, token):
-        # Retrieve the stored token from the user's model or database
-        stored_token = user.password_reset_token
-        if token == stored_token:
-            # Reset the stored token after it has been used
-            user.password_reset_token = None
-            user.save()
-            return True
-        return False
+        """Consume token of user with a single conditional DELETE.
+
+        Token is looked up by its hash, so comparison time doesn't depend on
+        how much of the token is correct, and only one of concurrent checks
+        can delete the row and succeed.
+        """
+        if not token:
+            return False
+
+        with metrics.token_duration.time(token='password_reset', operation='verify'):
+            deleted, _ = PasswordResetToken.objects.filter(
+                user_id=user.pk,
+                token_hash=self.hash_token(token),
+                expires_at__gt=timezone.now(),
+            ).delete()
+        return deleted > 0
+
+
+def delete_expired_password_reset_tokens():
+    return PasswordResetToken.objects.filter(expires_at__lte=timezone.now()).delete()
 
 
 one_time_token_generator = OneTimePasswordResetTokenGenerator()
+
+
+# User fields which are copied to JWT claims, so authenticated requests can be
+# handled without loading the user (see core.authentication)
+USER_TOKEN_CLAIMS = ['username', 'is_staff', 'is_superuser', 'is_email_activated']
+
+
+def set_user_claims(token, user):
+    """Copy USER_TOKEN_CLAIMS fields of user to given JWT token."""
+    for claim in USER_TOKEN_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
@@ -0,0 +1,78 @@
+"""
+User state transitions (email activation and password changes) written as
+single conditional UPDATE statements.
+
+Views get users from core.cache.user_cache, so a full save() could write
+stale values of other columns back. An UPDATE only writes the changed column
+and its WHERE clause makes concurrent transitions safe. update() doesn't send
+post_save, so changed users are invalidated in user cache and pinned to the
+primary database (see core.routers) here.
+"""
+from django.contrib.auth import password_validation
+
+from . import routers
+from .cache import user_cache
+from .models import User
+from .tokens import email_verification_token_generator
+
+
+def activate_email(user):
+    """Activate email of user, only writing if it is not activated yet.
+
+    Returns:
+        bool: True if this call activated the email, False if it was already
+        activated (e.g. by a concurrent request)
+    """
+    activated = (
+        User.objects.filter(pk=user.pk, is_email_activated=False).update(
+            is_email_activated=True
+        )
+        > 0
+    )
+    user.is_email_activated = True
+    if activated:
+        user_cache.invalidate_changed(user.pk)
+        routers.pin_user(user.pk)
+    return activated
+
+
+def activate_email_with_token(user, token):
+    """Activate email of user if token is valid.
+
+    Activation is idempotent: a token which has already activated the email
+    is still accepted, but nothing is written.
+
+    Returns:
+        bool: True if token is valid
+    """
+    if email_verification_token_generator.check_token(user, token):
+        activate_email(user)
+        return True
+    return email_verification_token_generator.check_used_token(user, token)
+
+
+def save_password(user, expected_password=None):
+    """Write password of user, which is set with user.set_password().
+
+    Args:
+        user (core.models.User): user with the new password
+        expected_password (str): if given, password is only changed if this is
+            still the stored password hash, so concurrent changes cannot both
+            succeed
+
+    Returns:
+        bool: True if password is changed
+    """
+    queryset = User.objects.filter(pk=user.pk)
+    if expected_password is not None:
+        queryset = queryset.filter(password=expected_password)
+    if not queryset.update(password=user.password):
+        return False
+
+    user_cache.invalidate_changed(user.pk)
+    routers.pin_user(user.pk)
+    # Same as Model.save() after set_password()
+    if user._password is not None:
+        password_validation.password_changed(user._password, user)
+        user._password = None
+    return True
@@ -1,13 +1,24 @@
 from django.urls import path, include
 from rest_framework import routers
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from . import views
+from . import async_views, views
 
 router = routers.DefaultRouter()
 router.register('users', views.UserViewSet)
 
 urlpatterns = [
+    path(
+        'users/bulk-create/',
+        views.BulkUserCreateView.as_view(),
+        name='user-bulk-create',
+    ),
+    path('users/export/', views.UserExportView.as_view(), name='user-export'),
+    path(
+        'users/availability/',
+        views.UserAvailabilityView.as_view(),
+        name='user-availability',
+    ),
     path(
         'users/set-password/',
         views.UserSetPasswordView.as_view(),
@@ -29,11 +40,43 @@ urlpatterns = [
         name='user-activate',
     ),
     path(
-        'users/request-activation-email/',
+        'users/request-activation-email/<username>/',
         views.UserRequestActivationEmailView.as_view(),
         name='user-request-activation-email',
     ),
+    path(
+        'users/cache-stats/',
+        views.UserCacheStatsView.as_view(),
+        name='user-cache-stats',
+    ),
+    # Async versions of the views above for ASGI deployments
+    path(
+        'async/users/set-password/',
+        async_views.AsyncUserSetPasswordView.as_view(),
+        name='async-user-set-password',
+    ),
+    path(
+        'async/users/reset-password/',
+        async_views.AsyncResetPasswordView.as_view(),
+        name='async-user-reset-password',
+    ),
+    path(
+        'async/users/reset-password-confirm/',
+        async_views.AsyncResetPasswordConfirmView.as_view(),
+        name='async-user-reset-password-confirm',
+    ),
+    path(
+        'async/users/activate/<uid>/<token>',
+        async_views.AsyncUserActivateView.as_view(),
+        name='async-user-activate',
+    ),
+    path(
+        'async/users/request-activation-email/<username>/',
+        async_views.AsyncUserRequestActivationEmailView.as_view(),
+        name='async-user-request-activation-email',
+    ),
     path('', include(router.urls)),
-    path('token/', TokenObtainPairView.as_view(), name='token-obtain-pair'),
+    path('token/', views.TokenObtainPairView.as_view(), name='token-obtain-pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('token/revoke/', views.TokenRevokeView.as_view(), name='token-revoke'),
 ]
@@ -1,6 +1,8 @@
+from asgiref.sync import sync_to_async
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
+from .cache import user_cache
 from .models import User
 
 
@@ -12,6 +14,14 @@ def decode_uid(pk):
     return force_str(urlsafe_base64_decode(pk))
 
 
+def get_user_from_uid(uid):
+    """Get user of a base64-encoded user id, or None if there is no such user"""
+    try:
+        return user_cache.get(decode_uid(uid))
+    except (User.DoesNotExist, ValueError):
+        return None
+
+
 def get_user_from_token(uid, token, token_generator):
     """Get user from uid and check if token is valid for that user
 
@@ -22,15 +32,34 @@ def get_user_from_token(uid, token, token_generator):
     Returns:
         core.models.User: If token is valid for the user, returns user, otherwise None
     """
+    user = get_user_from_uid(uid)
+
+    if user is not None and token_generator.check_token(user, token):
+        return user
+
+    return None
 
-    user_pk = decode_uid(uid)
 
+async def aget_user_from_uid(uid):
+    """Async version of get_user_from_uid, which reads from database"""
     try:
-        user = User.objects.get(pk=user_pk)
-    except User.DoesNotExist:
+        return await User.objects.aget(pk=decode_uid(uid))
+    except (User.DoesNotExist, ValueError):
         return None
 
-    if user is not None and token_generator.check_token(user, token):
+
+async def aget_user_from_token(uid, token, token_generator):
+    """Async version of get_user_from_token
+
+    Returns:
+        core.models.User: If token is valid for the user, returns user, otherwise None
+    """
+    user = await aget_user_from_uid(uid)
+    if user is None:
+        return None
+
+    # Some token generators query database, so token is checked in a thread
+    if await sync_to_async(token_generator.check_token)(user, token):
         return user
 
     return None
@@ -1,7 +1,67 @@
+import logging
+import threading
+
+from django.conf import settings
 from django.core import validators
+from django.core.exceptions import ValidationError
+
+from .breached_passwords import BreachedPasswords
+
+logger = logging.getLogger(__name__)
 
 
 class UsernameValidator(validators.RegexValidator):
     regex = r'^[\w](?!.*?\.{2})[\w.]{1,28}[\w]$'
     flags = 0
     message = 'Enter a valid username. Only a-z, 0-9, _, and . is allowd.'
+
+
+class BreachedPasswordValidator:
+    """
+    Validate that the password is not in the breached passwords file (path,
+    by default BREACHED_PASSWORDS_FILE). Without a file nothing is checked.
+
+    The file is opened at the first validation, so commands (including
+    build_breached_passwords) run when it doesn't exist yet. A missing or
+    malformed file is logged and nothing is checked until the process is
+    restarted.
+    """
+
+    # A hash and a binary search, after the common passwords lookup
+    cost = 1
+
+    def __init__(self, path=None):
+        self.path = path or settings.BREACHED_PASSWORDS_FILE
+        self._passwords = None
+        self._opened = not self.path
+        self._lock = threading.Lock()
+
+    @property
+    def passwords(self):
+        """BreachedPasswords of the file, None without a file"""
+        if not self._opened:
+            with self._lock:
+                if not self._opened:
+                    try:
+                        self._passwords = BreachedPasswords(self.path)
+                    except FileNotFoundError:
+                        logger.warning(
+                            'Breached passwords file %s does not exist, '
+                            'breached passwords are not checked.',
+                            self.path,
+                        )
+                    except ValueError as e:
+                        logger.warning('%s, breached passwords are not checked.', e)
+                    self._opened = True
+        return self._passwords
+
+    def validate(self, password, user=None):
+        passwords = self.passwords
+        if passwords is not None and password in passwords:
+            raise ValidationError(
+                'This password has appeared in a data breach.',
+                code='password_breached',
+            )
+
+    def get_help_text(self):
+        return 'Your password can’t be a password which has appeared in a data breach.'
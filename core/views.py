@@ -1,29 +1,111 @@
-from django.db import transaction
-from django.utils import timezone
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.views import View
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (
+    AllowAny,
+    BasePermission,
+    IsAdminUser,
+    IsAuthenticated,
+)
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-
-from .emails import ActivationEmail, PasswordResetEmail
-from .models import User, EmailLog
-from .pagination import UserDefaultPagination
+from rest_framework_simplejwt import views as jwt_views
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import metrics, routers
+from .availability import taken_identifiers
+from .bulk import create_users
+from .cache import user_cache
+from .exports import CONTENT_TYPES, get_export_queryset, iter_export
+from .instrumentation import iter_in_context
+from .models import User
+from .pagination import UserCursorPagination, UserDefaultPagination
+from .ratelimit import EmailRateLimitExceeded
+from .revocation import revoke_token, revoke_user_tokens
 from .serializers import (
     UserCreateSerializer,
     UserDetailSerializer,
     PasswordChangeSerializer,
     EmailSerializer,
     ResetPasswordConfirmSerializer,
+    TokenRevokeSerializer,
+    UserAvailabilitySerializer,
+    UserExportSerializer,
+)
+from .tasks import (
+    queue_activation_email,
+    request_activation_email,
+    request_password_reset_email,
 )
-from .tokens import email_verification_token_generator, one_time_token_generator
+from .tokens import one_time_token_generator
+from .transitions import activate_email_with_token, save_password
 from . import utils
 
 
+ACTIVATION_EMAIL_LIMIT_ERROR = (
+    'Too many requests. You have reached max number of allowed verification email.'
+)
+PASSWORD_RESET_EMAIL_LIMIT_ERROR = (
+    'Too many requests. You have reached max number of allowed password reset email.'
+)
+PASSWORD_CHANGED_ERROR = 'Password is changed by another request. Try again.'
+
+
+def rate_limit_errors(exc, max_total_error):
+    """Build the error data for an EmailRateLimitExceeded exception."""
+    if exc.wait_time is None:
+        return {'error': max_total_error}
+
+    return {
+        'error': 'Too many requests. Wait a little bit.',
+        'wait_time': f'{exc.wait_time.total_seconds()}',
+    }
+
+
+class IsSelfOrAdminUser(BasePermission):
+    """Allow admin users, and users to access their own user.
+
+    Users are compared by pk, because the username claim of a token stays
+    the same until it expires although the username can be changed.
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated)
+
+    def has_object_permission(self, request, view, obj):
+        return request.user.is_staff or obj.pk == request.user.pk
+
+
+class ReplicaReadsMixin:
+    """Read from replicas in unsafe requests (see core.routers).
+
+    For views which only read before they write.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        routers.use_replicas()
+        super().initial(request, *args, **kwargs)
+
+
 class UserViewSet(ModelViewSet):
     lookup_field = 'username'
     queryset = User.objects.all()
-    pagination_class = UserDefaultPagination
+
+    fields_query_param = 'fields'
+
+    @property
+    def pagination_class(self):
+        return (
+            UserCursorPagination
+            if settings.USER_LIST_CURSOR_PAGINATION
+            else UserDefaultPagination
+        )
 
     def get_serializer_class(self):
         return (
@@ -32,14 +114,64 @@ class UserViewSet(ModelViewSet):
             else UserDetailSerializer
         )
 
+    def get_requested_fields(self):
+        """Get fields of `?fields=id,username` for GET requests or None
+
+        Raises:
+            ValidationError: if there is an unknown field
+        """
+        value = self.request.query_params.get(self.fields_query_param)
+        if self.request.method != 'GET' or not value:
+            return None
+
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown_fields = set(fields) - set(UserDetailSerializer.Meta.fields)
+        if unknown_fields:
+            raise ValidationError(
+                {
+                    self.fields_query_param: [
+                        f'Unknown fields: {", ".join(sorted(unknown_fields))}.'
+                    ]
+                }
+            )
+        return fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields is not None:
+            # Only GET requests are narrowed, so deferred fields are never saved
+            queryset = queryset.only(*fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        """List users from queryset.values(), so no model instance is created."""
+        serializer = self.get_serializer()
+        columns = list(serializer.fields)
+        for name in getattr(self.paginator, 'ordering_fields', []):
+            if name not in columns:
+                columns.append(name)
+
+        rows = self.filter_queryset(self.get_queryset()).values(*columns)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation_values(page)
+            )
+
+        return Response(serializer.to_representation_values(rows))
+
     def perform_create(self, serializer):
         # Here, we are sure that user can be created with no error
         instance = serializer.save()
 
-        # So, we send an verification email
-        ActivationEmail(context={'user_pk': instance.pk}).send(to=[instance.email])
-        email_log = EmailLog(user=instance, email_type=EmailLog.EMAIL_VERIFICATION)
-        email_log.save()
+        # So, we queue a verification email
+        queue_activation_email(instance)
 
     def get_permissions(self):
         if self.action == 'list':
@@ -49,18 +181,94 @@ class UserViewSet(ModelViewSet):
         elif self.action in {'retrieve', 'update', 'partial_update'}:
             # Admin users can retrieve/update anyone
             # Normal users can only retrieve/update themselves
-            if self.request.user.username == self.kwargs['username']:
-                permission_classes = [AllowAny]
-            else:
-                permission_classes = [IsAdminUser]
+            permission_classes = [IsSelfOrAdminUser]
         else:
             permission_classes = [IsAdminUser]
 
         return [permission() for permission in permission_classes]
 
 
+class BulkUserCreateView(APIView):
+    """Create many users at once (e.g. when onboarding an organization)
+
+    Request body is a list of users with the fields of UserCreateSerializer.
+    Each item is created or rejected on its own, so the response lists the
+    result of every item in the same order.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        items = request.data
+        max_items = settings.BULK_USER_CREATE_MAX_ITEMS
+        if not isinstance(items, list) or not items or len(items) > max_items:
+            return Response(
+                {'error': f'Expected a list of 1 to {max_items} users.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = create_users(items)
+        if all(result['status'] == 'created' for result in results):
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response(results, status=response_status)
+
+
+class UserExportView(APIView):
+    """Stream users as NDJSON or CSV
+
+    Query parameters: export_format (ndjson or csv), is_email_activated,
+    date_joined_after, date_joined_before and email_stats (adds number of
+    sent emails of each type).
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # A dict is given, since missing booleans of a QueryDict are False
+        serializer = UserExportSerializer(data=request.query_params.dict())
+        serializer.is_valid(raise_exception=True)
+        options = dict(serializer.validated_data)
+        file_format = options.pop('export_format')
+
+        # Users are read from a replica while the response is streamed
+        response = StreamingHttpResponse(
+            iter_in_context(iter_export(get_export_queryset(**options), file_format)),
+            content_type=CONTENT_TYPES[file_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="users.{file_format}"'
+        )
+        return response
+
+
+class UserAvailabilityView(APIView):
+    """Check if a username and/or email is free for signup.
+
+    Answers come from an in-memory filter of taken identifiers (see
+    core.availability). Requests are throttled by the `user_availability`
+    rate, so taken emails cannot be enumerated quickly.
+    """
+
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'user_availability'
+
+    def get(self, request):
+        serializer = UserAvailabilitySerializer(data=request.query_params.dict())
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            {
+                field: not taken_identifiers.is_taken(field, value)
+                for field, value in serializer.validated_data.items()
+            }
+        )
+
+
 class UserSetPasswordView(APIView):
     permission_classes = [IsAuthenticated]
+    # Password of the real user is checked and changed
+    requires_db_user = True
 
     def post(self, request):
         """Change current user password."""
@@ -69,8 +277,14 @@ class UserSetPasswordView(APIView):
         )
         if serializer.is_valid():
             user = request.user
+            # The password which is checked by serializer
+            current_password = user.password
             user.set_password(serializer.data['new_password'])
-            user.save()
+            if not save_password(user, expected_password=current_password):
+                return Response(
+                    {'error': PASSWORD_CHANGED_ERROR}, status=status.HTTP_409_CONFLICT
+                )
+            revoke_user_tokens(user)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -78,10 +292,8 @@ class UserSetPasswordView(APIView):
 
 class UserActivateView(APIView):
     def get(self, request, uid, token):
-        user = utils.get_user_from_token(uid, token, email_verification_token_generator)
-        if user:
-            user.is_email_activated = True
-            user.save()
+        user = utils.get_user_from_uid(uid)
+        if user is not None and activate_email_with_token(user, token):
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         errors = {'error': 'Token is invalid.'}
@@ -91,8 +303,8 @@ class UserActivateView(APIView):
 class UserRequestActivationEmailView(APIView):
     """Send user an activation email
 
-    Each user can request 20 email verification email in total.
-    Each user can request one single email every 15 minutes.
+    By default each user can request 20 email verification email in total
+    and one single email every 15 minutes (see EMAIL_RATE_LIMITS setting).
     """
 
     permission_classes = [IsAuthenticated]
@@ -120,42 +332,22 @@ class UserRequestActivationEmailView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        queryset = EmailLog.objects.filter(
-            user=user, email_type=EmailLog.EMAIL_VERIFICATION
-        )
-
-        if queryset.count() > 20:
+        try:
+            request_activation_email(user)
+        except EmailRateLimitExceeded as e:
             return Response(
-                {
-                    'error': 'Too many requests. You have reached max number of allowed verification email.'
-                },
+                rate_limit_errors(e, ACTIVATION_EMAIL_LIMIT_ERROR),
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if queryset.count() != 0:
-            delta = timezone.now() - queryset.order_by('timestamp').last().timestamp
-            period = timezone.timedelta(minutes=15)
-            if delta < period:
-                return Response(
-                    {
-                        'error': 'Too many requests. Wait a little bit.',
-                        'wait_time': f'{(period - delta).total_seconds()}',
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-        ActivationEmail(context={'user_pk': user.pk}).send(to=[user.email])
-        email_log = EmailLog(user=user, email_type=EmailLog.EMAIL_VERIFICATION)
-        email_log.save()
-
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ResetPasswordView(APIView):
+class ResetPasswordView(ReplicaReadsMixin, APIView):
     """Send user a password reset email
 
-    Each user can request 20 password reset email in total.
-    Each user can request one single email every 15 minutes.
+    By default each user can request 20 password reset email in total and
+    one single email every 15 minutes (see EMAIL_RATE_LIMITS setting).
     """
 
     def post(self, request):
@@ -163,52 +355,21 @@ class ResetPasswordView(APIView):
         serializer = EmailSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
+        # User is looked up on a replica, limits are checked in a transaction
+        # of primary database
         try:
             user = User.objects.get(email=serializer.data['email'])
         except User.DoesNotExist:
             return Response(status=status.HTTP_204_NO_CONTENT)
-        
-        queryset = EmailLog.objects.filter(
-            user=user, email_type=EmailLog.PASSWORD_RESET
-        )
 
-        if queryset.count() > 20:
+        try:
+            request_password_reset_email(user)
+        except EmailRateLimitExceeded as e:
             return Response(
-                {
-                    'error': 'Too many requests. You have reached max number of allowed password reset email.'
-                },
+                rate_limit_errors(e, PASSWORD_RESET_EMAIL_LIMIT_ERROR),
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if queryset.count() != 0:
-            delta = timezone.now() - queryset.order_by('timestamp').last().timestamp
-            period = timezone.timedelta(minutes=15)
-            if delta < period:
-                return Response(
-                    {
-                        'error': 'Too many requests. Wait a little bit.',
-                        'wait_time': f'{(period - delta).total_seconds()}',
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-        # Here, everything is fine to generate a toekn, save the token in user
-        # table and send the email
-        token = one_time_token_generator.make_token(user)
-        with transaction.atomic():
-            user.password_reset_token = token
-            user.save()
-
-            PasswordResetEmail(
-                context={
-                    'user_pk': user.pk,
-                    'token': token,
-                }
-            ).send(to=[user.email])
-
-            email_log = EmailLog(user=user, email_type=EmailLog.PASSWORD_RESET)
-            email_log.save()
-
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -225,14 +386,75 @@ class ResetPasswordConfirmView(APIView):
         token = serializer.data['token']
         new_password = serializer.data['new_password']
 
+        # Token is consumed by one conditional DELETE, so only one of
+        # concurrent requests gets the user
         user = utils.get_user_from_token(uid, token, one_time_token_generator)
 
-        print(user)
-
         if user:
             user.set_password(new_password)
-            user.save()
+            save_password(user)
+            revoke_user_tokens(user)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         errors = {'error': 'Token is invalid.'}
         return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TokenObtainPairView(ReplicaReadsMixin, jwt_views.TokenObtainPairView):
+    """Login, which only reads the user before updating last_login"""
+
+
+class TokenRevokeView(APIView):
+    """Revoke given refresh token and the access token of request (logout)."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = TokenRevokeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        refresh = serializer.validated_data['refresh']
+        if refresh.get(jwt_settings.USER_ID_CLAIM) != request.user.pk:
+            return Response(
+                {'error': 'Token does not belong to current user.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        revoke_token(refresh)
+        if request.auth is not None:
+            revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserCacheStatsView(APIView):
+    """Hit/miss counters of the user cache of the process serving request."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(user_cache.stats())
+
+
+class MetricsView(View):
+    """Metrics of all processes in Prometheus text format (see core.metrics).
+
+    Only staff users and requests with the METRICS_TOKEN bearer token can read
+    them.
+    """
+
+    def has_permission(self, request):
+        if request.user.is_staff:
+            return True
+        token = settings.METRICS_TOKEN
+        header = request.headers.get('Authorization', '')
+        return token is not None and hmac.compare_digest(
+            header.encode(), f'Bearer {token}'.encode()
+        )
+
+    def get(self, request):
+        if not self.has_permission(request):
+            return HttpResponseForbidden()
+        return HttpResponse(
+            metrics.registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
@@ -1 +1,4 @@
-from .celery import celery
+# Load celery app when Django starts so shared_task uses it
+from .celery import celery as celery_app
+
+__all__ = ('celery_app',)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from datetime import timedelta
 from pathlib import Path
+from celery.schedules import crontab
 import environ
 import os
 
@@ -50,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.RequestTimingMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,6 +97,20 @@ DATABASES = {
     }
 }
 
+# Read replicas (see core.routers). Each host of DATABASE_REPLICA_HOSTS is
+# added as replica<N> with the settings of default; in tests replicas mirror
+# the default test database. Users who were changed read from default for
+# DATABASE_PRIMARY_PIN_SECONDS, which should be longer than replication lag.
+for index, host in enumerate(env.list('DATABASE_REPLICA_HOSTS', default=[])):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_PRIMARY_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -110,14 +127,58 @@ AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
+    {
+        'NAME': 'core.validators.BreachedPasswordValidator',
+    },
 ]
 
+# Sorted SHA-1 hashes of breached passwords, built with the
+# build_breached_passwords command; None disables the check.
+BREACHED_PASSWORDS_FILE = env('BREACHED_PASSWORDS_FILE', default=None)
+
 # Authentication configuration
 AUTH_USER_MODEL = 'core.User'
 AUTHENTICATION_BACKENDS = [
     'core.backends.AuthenticationBackend',
 ]
 
+# Django's default hashers, the PBKDF2 ones add hashing time to request timings
+PASSWORD_HASHERS = [
+    'core.hashers.PBKDF2PasswordHasher',
+    'core.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Share of requests (0 to 1) which get a Server-Timing header with query count,
+# database time, password hashing time and email sending time
+REQUEST_TIMING_SAMPLE_RATE = env.float('REQUEST_TIMING_SAMPLE_RATE', default=0.01)
+
+# Metrics configuration. With several server processes (e.g. gunicorn workers)
+# METRICS_DIR must be a directory shared by them, which is emptied on start.
+# Each process writes its metrics there every FLUSH_INTERVAL seconds.
+METRICS_DIR = env('METRICS_DIR', default=None)
+METRICS_FLUSH_INTERVAL = 1
+# /metrics is served to requests with `Authorization: Bearer <METRICS_TOKEN>`
+# and to staff users; None only allows staff users.
+METRICS_TOKEN = env('METRICS_TOKEN', default=None)
+
+# Number of threads used by async views for password hashing
+PASSWORD_HASHING_THREADS = 4
+
+# Number of processes used for password hashing of bulk user creation
+PASSWORD_HASHING_PROCESSES = env.int(
+    'PASSWORD_HASHING_PROCESSES', default=os.cpu_count() or 1
+)
+
+# Bulk user creation limits: users of a request and users of an INSERT
+BULK_USER_CREATE_MAX_ITEMS = 1000
+BULK_USER_CREATE_CHUNK_SIZE = 500
+
+# Number of users fetched from the server-side cursor at once by user export
+USER_EXPORT_CHUNK_SIZE = 2000
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 LANGUAGE_CODE = 'en-us'
@@ -134,18 +195,51 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Rest framework configuration
+# Stateless JWT authentication reads user from token claims and loads user
+# only for views which change it.
+STATELESS_JWT_AUTHENTICATION = env.bool('STATELESS_JWT_AUTHENTICATION', default=False)
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ]
+        'core.authentication.StatelessJWTAuthentication'
+        if STATELESS_JWT_AUTHENTICATION
+        else 'core.authentication.CachedJWTAuthentication',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user_availability': env(
+            'USER_AVAILABILITY_THROTTLE_RATE', default='30/minute'
+        ),
+    },
 }
 
+# User list is paginated by page number with exact counts. Set it to True for
+# keyset (cursor) pagination, which stays fast on deep pages.
+USER_LIST_CURSOR_PAGINATION = env.bool('USER_LIST_CURSOR_PAGINATION', default=False)
+
 # SimpleJWT configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(seconds=env.int('SIMPLE_JWT_ACCESS_TOKEN_LIFETIME')),
     'REFRESH_TOKEN_LIFETIME': timedelta(seconds=env.int('SIMPLE_JWT_REFRESH_TOKEN_LIFETIME')),
+    'TOKEN_OBTAIN_SERIALIZER': 'core.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'core.serializers.TokenRefreshSerializer',
+    'TOKEN_USER_CLASS': 'core.authentication.ClaimsUser',
 }
 
+# Token revocation configuration (time values are in seconds). Revoked jtis
+# are kept in a Bloom filter sized for CAPACITY entries with ERROR_RATE false
+# positives, which are confirmed with database.
+TOKEN_REVOCATION_REFRESH_INTERVAL = 10
+TOKEN_REVOCATION_REBUILD_INTERVAL = 3600
+TOKEN_REVOCATION_CAPACITY = 1_000_000
+TOKEN_REVOCATION_ERROR_RATE = 0.001
+
+# Username and email availability configuration (time values are in seconds).
+# Taken identifiers are kept in a Bloom filter sized for CAPACITY users with
+# ERROR_RATE false positives, which are confirmed with database.
+USER_AVAILABILITY_REFRESH_INTERVAL = 10
+USER_AVAILABILITY_REBUILD_INTERVAL = 3600
+USER_AVAILABILITY_CAPACITY = 1_000_000
+USER_AVAILABILITY_ERROR_RATE = 0.01
+
 # Internal IPs is used for django debug toolbar
 if DEBUG:
     import socket
@@ -156,11 +250,54 @@ if DEBUG:
         '10.0.2.2',
     ]
 
+# Cache configuration
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://redis:6379/1',
+    }
+}
+
+# User cache configuration (ttl values are in seconds). Changed users are
+# published on USER_CACHE_INVALIDATION_URL redis; None disables publishing.
+USER_CACHE_LOCAL_SIZE = 1024
+USER_CACHE_LOCAL_TTL = 60
+USER_CACHE_SHARED_TTL = 300
+USER_CACHE_INVALIDATION_URL = 'redis://redis:6379/1'
+
 # Celery configuration
 CELERY_BROKER_URL = 'redis://redis:6379/0'
+CELERY_TASK_ROUTES = {
+    'core.tasks.send_activation_email': {'queue': 'activation'},
+    'core.tasks.send_activation_emails': {'queue': 'activation'},
+    'core.tasks.send_password_reset_email': {'queue': 'password_reset'},
+}
+# Eager mode runs tasks in-process, so emails can be tested without a broker
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=False)
+CELERY_TASK_EAGER_PROPAGATES = CELERY_TASK_ALWAYS_EAGER
+CELERY_TASK_ACKS_LATE = True
+CELERY_BEAT_SCHEDULE = {
+    'rollup-email-logs': {
+        'task': 'core.tasks.rollup_email_logs',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'prune-token-revocations': {
+        'task': 'core.tasks.prune_token_revocations',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'prune-password-reset-tokens': {
+        'task': 'core.tasks.prune_password_reset_tokens',
+        'schedule': crontab(hour=4, minute=30),
+    },
+}
+
+# Email tasks configuration (retry backoff values are in seconds)
+EMAIL_TASK_MAX_RETRIES = 5
+EMAIL_TASK_RETRY_BACKOFF = 10
+EMAIL_TASK_RETRY_BACKOFF_MAX = 600
 
 # Email conifiguration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = 'core.mail.PooledEmailBackend'
 EMAIL_HOST = 'smtp4dev'
 EMAIL_HOST_USER = ''
 EMAIL_HOST_PASSWORD = ''
@@ -168,3 +305,20 @@ EMAIL_PORT = 25
 EMAIL_USE_SSL = False
 EMAIL_USE_TLS = False
 DEFAULT_FROM_EMAIL = 'info@localhost'
+
+# Email rate limits per email type (interval is in seconds)
+EMAIL_RATE_LIMITS = {
+    'email_verification': {'max_total': 20, 'interval': 15 * 60},
+    'password_reset': {'max_total': 20, 'interval': 15 * 60},
+}
+
+# Email logs older than retention days are rolled up into counters and
+# deleted. It must be longer than every interval in EMAIL_RATE_LIMITS.
+EMAIL_LOG_RETENTION_DAYS = 30
+EMAIL_LOG_ROLLUP_CHUNK_SIZE = 1000
+
+# Pooled SMTP connections configuration (time values are in seconds)
+EMAIL_POOL_SIZE = 4
+EMAIL_POOL_HEALTH_CHECK_INTERVAL = 30
+EMAIL_POOL_MAX_IDLE = 300
+EMAIL_POOL_BATCH_SIZE = 100
@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('core.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('__debug__/', include('debug_toolbar.urls')),
 ]